@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import re
+import urllib.parse
+
+from manifest import write_atomic
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+ASSET_MANIFEST_NAME = "assets.json"
+HEADERS_NAME = "_headers"
+
+# href/src attributes in template HTML, quoted or not
+URL_ATTR_PATTERN = re.compile(
+    r"""(\b(?:href|src)\s*=\s*)(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))""",
+    re.IGNORECASE,
+)
+
+
+class AssetMap:
+    """Maps the site paths of static files to their fingerprinted copies.
+
+    Built from the state returned by ``fingerprint_tree``. ``url_for``
+    rewrites site-absolute URLs such as ``/index.css?v=1`` to
+    ``/index.3f9a1c2b.css?v=1``; relative and external URLs are left to
+    the browser.
+    """
+
+    def __init__(self, state):
+        self.urls = {
+            _site_path(rel_path): _site_path(entry["name"])
+            for rel_path, entry in state.items()
+        }
+        digest = hashlib.sha256()
+        for url, fingerprinted in sorted(self.urls.items()):
+            digest.update(f"{url}\0{fingerprinted}\0".encode())
+        # identifies the mapping in keys of caches holding pages
+        self.fingerprint = digest.hexdigest()[:16]
+
+    def url_for(self, url):
+        """The fingerprinted form of ``url``, or None if it has none."""
+        if not url.startswith("/") or url.startswith("//"):
+            return None
+
+        parts = urllib.parse.urlsplit(url)
+        fingerprinted = self.urls.get(urllib.parse.unquote(parts.path))
+        if fingerprinted is None:
+            return None
+        return urllib.parse.urlunsplit(
+            parts._replace(path=urllib.parse.quote(fingerprinted))
+        )
+
+    def rewrite(self, url):
+        return self.url_for(url) or url
+
+    def rewrite_html(self, html, used=None):
+        """Rewrite the href and src attributes of an HTML fragment.
+
+        The rewritten URLs are added to the ``used`` dict when given.
+        """
+
+        def replace(match):
+            url = next(group for group in match.groups()[1:] if group is not None)
+            fingerprinted = self.url_for(url)
+            if fingerprinted is None:
+                return match.group(0)
+            if used is not None:
+                used[url] = fingerprinted
+            return f'{match.group(1)}"{fingerprinted}"'
+
+        return URL_ATTR_PATTERN.sub(replace, html)
+
+    def write(self, out_dir, dry_run=False):
+        """Write the asset manifest and the ``_headers`` caching rules.
+
+        Fingerprinted files get a year-long immutable ``Cache-Control``, so
+        returning visitors load them without revalidating. Everything else
+        keeps the host's default. Returns the names of the files written.
+        """
+        names = [ASSET_MANIFEST_NAME, HEADERS_NAME]
+        if dry_run:
+            return names
+
+        os.makedirs(out_dir, exist_ok=True)
+        write_atomic(
+            os.path.join(out_dir, ASSET_MANIFEST_NAME),
+            json.dumps(dict(sorted(self.urls.items())), indent=2) + "\n",
+        )
+        write_atomic(
+            os.path.join(out_dir, HEADERS_NAME),
+            "".join(
+                f"{urllib.parse.quote(url)}\n"
+                f"  Cache-Control: {IMMUTABLE_CACHE_CONTROL}\n"
+                for url in sorted(self.urls.values())
+            ),
+        )
+        return names
+
+
+def _site_path(rel_path):
+    return "/" + rel_path.replace(os.sep, "/")
@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from blocks import BlockType, classify_lines, split_block_lines
+from generator import markdown_to_html_node
+from htmlnode import LeafNode
+from template import Template
+from textnode import TextNode, TextType
+from utils import extract_title, text_to_textnodes
+
+RESULTS_PATH = "./.bench/results.jsonl"
+
+BENCH_TEMPLATE = (
+    "<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>"
+)
+
+WORDS = (
+    "the ring was forged in the fires of mount doom and only there could it be "
+    "unmade so the fellowship set out from rivendell across the misty mountains"
+).split()
+
+
+class _DictTextNode:
+    """TextNode layout before __slots__, kept as a baseline for comparison."""
+
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class _DictLeafNode:
+    """LeafNode layout before __slots__, kept as a baseline for comparison."""
+
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+def _bytes_per_object(factory, count):
+    texts = [f"fragment {i}" for i in range(count)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(text) for text in texts]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # the list holding the objects is not part of the per-node cost
+    list_overhead = 8 * len(objects)
+    return (after - before - list_overhead) / count
+
+
+def bench_memory(count):
+    """Measure per-node memory of the node classes against dict-backed ones."""
+    cases = [
+        (
+            "TextNode",
+            lambda text: _DictTextNode(text, TextType.PLAIN),
+            lambda text: TextNode(text, TextType.PLAIN),
+        ),
+        (
+            "LeafNode",
+            lambda text: _DictLeafNode("b", text, {}),
+            lambda text: LeafNode("b", text, {}),
+        ),
+    ]
+
+    results = []
+    for name, before, after in cases:
+        results.append(
+            {
+                "node": name,
+                "before": _bytes_per_object(before, count),
+                "after": _bytes_per_object(after, count),
+            }
+        )
+    return results
+
+
+def _sentence(rng, words, link_density, image_density):
+    out = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < link_density:
+            word = f"[{word}](/blog/{word})"
+        elif roll < link_density + image_density:
+            word = f"![{word}](/images/{word}.png)"
+        elif roll < link_density + image_density + 0.05:
+            word = f"**{word}**"
+        elif roll < link_density + image_density + 0.08:
+            word = f"_{word}_"
+        elif roll < link_density + image_density + 0.1:
+            word = f"`{word}`"
+        out.append(word)
+    return " ".join(out)
+
+
+def generate_page_markdown(rng, shape):
+    """Build one synthetic markdown page following ``shape``."""
+    density = (shape["link_density"], shape["image_density"])
+    parts = [f"# {_sentence(rng, 4, 0, 0)}"]
+    for i in range(shape["paragraphs"]):
+        parts.append(f"## {_sentence(rng, 3, 0, 0)}")
+        parts.append(_sentence(rng, shape["paragraph_words"], *density))
+        if shape["list_items"] and i % 2 == 0:
+            parts.append(
+                "\n".join(
+                    f"- {_sentence(rng, 6, *density)}"
+                    for _ in range(shape["list_items"])
+                )
+            )
+        if shape["list_items"] and i % 2 == 1:
+            parts.append(
+                "\n".join(
+                    f"{n}. {_sentence(rng, 6, *density)}"
+                    for n in range(1, shape["list_items"] + 1)
+                )
+            )
+        if shape["code_lines"] and i % 3 == 0:
+            code = "\n".join(
+                f"x{n} = compute({n}) * 2" for n in range(shape["code_lines"])
+            )
+            parts.append(f"```\n{code}\n```")
+        if i % 4 == 3:
+            parts.append(f"> {_sentence(rng, 12, *density)}")
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(dest_dir, shape, seed=0):
+    """Write ``shape["pages"]`` synthetic markdown pages under ``dest_dir``.
+
+    Pages are spread over nested sections like a real content tree. The
+    same seed always produces the same corpus. Returns the page paths.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for n in range(shape["pages"]):
+        section = os.path.join(dest_dir, f"section{n % 10}", f"part{n % 7}")
+        os.makedirs(section, exist_ok=True)
+        path = os.path.join(section, f"page{n}.md")
+        with open(path, "w") as f:
+            f.write(generate_page_markdown(rng, shape))
+        paths.append(path)
+    return paths
+
+
+def _timed(timings, stage, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+    return result
+
+
+def bench_stages(shape, seed=0):
+    """Time each stage of the page pipeline over a synthetic corpus.
+
+    Returns a dict with the corpus size and, per stage, the seconds spent
+    plus page and input-byte throughput.
+    """
+    template = Template(BENCH_TEMPLATE)
+    timings = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate_corpus(os.path.join(tmp, "content"), shape, seed)
+        out_dir = os.path.join(tmp, "public")
+        os.makedirs(out_dir)
+
+        total_bytes = 0
+        for n, path in enumerate(paths):
+            with open(path, "r") as f:
+                md = _timed(timings, "read", f.read)
+            total_bytes += len(md.encode())
+
+            blocks = _timed(timings, "markdown_to_blocks", list, split_block_lines(md))
+            types = _timed(
+                timings,
+                "block_to_block_type",
+                lambda: [classify_lines(lines) for lines in blocks],
+            )
+            texts = [
+                " ".join(lines)
+                for block_type, lines in zip(types, blocks)
+                if block_type is not BlockType.CODE
+            ]
+            _timed(
+                timings,
+                "text_to_textnodes",
+                lambda: [text_to_textnodes(text) for text in texts],
+            )
+
+            node = _timed(timings, "build_tree", markdown_to_html_node, md)
+            html = _timed(timings, "to_html", node.to_html)
+            page = _timed(
+                timings,
+                "template_fill",
+                lambda: template.render(Content=html, Title=extract_title(md) or ""),
+            )
+
+            def write():
+                with open(os.path.join(out_dir, f"page{n}.html"), "w") as f:
+                    f.write(page)
+
+            _timed(timings, "write", write)
+
+    pages = len(paths)
+    megabytes = total_bytes / 1e6
+    return {
+        "pages": pages,
+        "bytes": total_bytes,
+        "stages": {
+            stage: {
+                "seconds": seconds,
+                "pages_per_s": pages / seconds if seconds else None,
+                "mb_per_s": megabytes / seconds if seconds else None,
+            }
+            for stage, seconds in timings.items()
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_result(result, path=RESULTS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+def previous_result(results, shape):
+    """Return the most recent saved run over the same corpus shape."""
+    for result in reversed(results):
+        if result.get("shape") == shape:
+            return result
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static site generator benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    memory = commands.add_parser("memory", help="per-node memory overhead")
+    memory.add_argument("--count", type=int, default=100_000)
+
+    stages = commands.add_parser("stages", help="time each pipeline stage")
+    stages.add_argument("--pages", type=int, default=200)
+    stages.add_argument("--paragraphs", type=int, default=8)
+    stages.add_argument("--paragraph-words", type=int, default=80)
+    stages.add_argument("--list-items", type=int, default=10)
+    stages.add_argument("--code-lines", type=int, default=15)
+    stages.add_argument("--link-density", type=float, default=0.03)
+    stages.add_argument("--image-density", type=float, default=0.01)
+    stages.add_argument("--seed", type=int, default=0)
+    stages.add_argument(
+        "--no-save", action="store_true", help=f"don't append to {RESULTS_PATH}"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "stages":
+        shape = {
+            "pages": args.pages,
+            "paragraphs": args.paragraphs,
+            "paragraph_words": args.paragraph_words,
+            "list_items": args.list_items,
+            "code_lines": args.code_lines,
+            "link_density": args.link_density,
+            "image_density": args.image_density,
+            "seed": args.seed,
+        }
+        result = bench_stages(shape, args.seed)
+        result.update(shape=shape, commit=_git_commit(), timestamp=time.time())
+        previous = previous_result(load_results(), shape)
+
+        print(f"⏱️  {result['pages']} pages, {result['bytes'] / 1e6:.1f} MB of markdown")
+        for stage, stats in result["stages"].items():
+            line = (
+                f" -- {stage:<20} {stats['seconds'] * 1000:9.1f} ms "
+                f"{stats['pages_per_s']:10.0f} pages/s {stats['mb_per_s']:8.1f} MB/s"
+            )
+            if previous and stage in previous["stages"]:
+                before = previous["stages"][stage]["seconds"]
+                line += f"  ({stats['seconds'] / before - 1:+.0%} vs {previous['commit']})"
+            print(line)
+
+        if not args.no_save:
+            save_result(result)
+
+    if args.command == "memory":
+        print(f"🧠 Per-node memory over {args.count} nodes")
+        for result in bench_memory(args.count):
+            saved = 1 - result["after"] / result["before"]
+            print(
+                f" -- {result['node']}: {result['before']:.0f} B -> "
+                f"{result['after']:.0f} B ({saved:.0%} smaller)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,100 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 
+HEADING_PATTERN = re.compile(r"#{1,6} ")
+
+
+def split_block_lines(markdown):
+    """Yield each block of ``markdown`` as a list of stripped, non-empty lines.
+
+    Blocks are separated by empty lines; whitespace-only lines are dropped
+    without ending the block. ``markdown`` may be a string or any iterable
+    of lines (such as an open file), so blocks can be produced without
+    holding the whole document.
+    """
+    if isinstance(markdown, str):
+        markdown = markdown.split("\n")
+
+    lines = []
+    for raw_line in markdown:
+        raw_line = raw_line.rstrip("\n").rstrip("\r")
+        if raw_line == "":
+            if lines:
+                yield lines
+                lines = []
+            continue
+
+        for line in raw_line.splitlines():
+            line = line.strip()
+            if line != "":
+                lines.append(line)
+
+    if lines:
+        yield lines
+
+
+class MarkdownFile:
+    """The lines of a markdown file, read from disk on each iteration.
+
+    Can be passed wherever markdown is accepted as an iterable of lines,
+    and iterated any number of times without the file ever being held in
+    memory as a whole.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, "r") as f:
+            yield from f
+
+    def __repr__(self):
+        return f"MarkdownFile({self.path!r})"
+
+
+def classify_lines(lines):
+    """Return the BlockType of a block given as stripped, non-empty lines.
+
+    Each line is inspected once, tracking every candidate type together.
+    """
+    if HEADING_PATTERN.match(lines[0]):
+        return BlockType.HEADING
+
+    quote = unordered = ordered = True
+    for idx, line in enumerate(lines, start=1):
+        if quote and not line.startswith(">"):
+            quote = False
+        if unordered and not line.startswith("- "):
+            unordered = False
+        # the prefix is only formatted for lines that could carry it
+        if ordered and not (line[:1].isdigit() and line.startswith(f"{idx}. ")):
+            ordered = False
+        if not (quote or unordered or ordered):
+            break
+
+    if (
+        len(lines) >= 2
+        and lines[0].startswith("```")
+        and lines[-1].startswith("```")
+        and lines[-1].endswith("```")
+    ):
+        return BlockType.CODE
+
+    if quote:
+        return BlockType.QUOTE
+    if unordered:
+        return BlockType.UNORDERED_LIST
+    if ordered:
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def scan_blocks(markdown):
+    """Yield ``(BlockType, lines)`` pairs for each block in ``markdown``."""
+    for lines in split_block_lines(markdown):
+        yield classify_lines(lines), lines
+
+
 def block_to_block_type(block):
     lines = block.splitlines()
     non_empty_lines = [line for line in lines if line.strip() != ""]
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+
+class ParseCache:
+    """On-disk cache of rendered page bodies keyed by content hash.
+
+    Entries live in ``directory`` as one file per key, sharded by the first
+    two hex digits. Writes go to a temporary file that is atomically
+    renamed into place, so concurrent builds (or pool workers) never see a
+    partial entry; the worst case is two processes rendering the same page.
+
+    A hit refreshes the entry's mtime, which ``evict`` uses as the LRU
+    order when trimming the cache back under ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, source, *options):
+        """Hash ``source`` together with everything else affecting the output.
+
+        ``options`` should include the parser version and any render
+        settings, so changing either never serves a stale body.
+        """
+        digest = hashlib.sha256()
+        for part in map(str, options):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by another process after we read it
+            pass
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        dir = os.path.dirname(path)
+        os.makedirs(dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def entries(self):
+        """Return (mtime_ns, size, path) for every entry in the cache."""
+        found = []
+        if not os.path.isdir(self.directory):
+            return found
+
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((st.st_mtime_ns, st.st_size, entry.path))
+        return found
+
+    def evict(self):
+        """Remove least recently used entries until under ``max_bytes``.
+
+        Returns the number of entries removed.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+class BlockCache:
+    """In-memory LRU memo of rendered blocks keyed by (block type, text).
+
+    Sites repeat the same disclaimers, callouts and lists on many pages;
+    each distinct block is then parsed and rendered once per build. The
+    cached values are node trees, which serialization never mutates, so
+    they can be shared between pages.
+
+    Blocks longer than ``max_block_size`` characters are not cached: they
+    are rarely repeated and would pin a lot of memory.
+    """
+
+    def __init__(self, max_entries=4096, max_block_size=4096):
+        self.max_entries = max_entries
+        self.max_block_size = max_block_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        node = self.entries.get(key)
+        if node is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return node
+
+    def put(self, key, node):
+        self.entries[key] = node
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def save(self, path, version):
+        """Persist the entries, tagged with the parser ``version``."""
+        dir = os.path.dirname(path)
+        if dir:
+            os.makedirs(dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=dir or ".", prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"version": version, "entries": list(self.entries.items())}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path, version):
+        """Load entries saved by ``save``; ignored if the version differs."""
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return
+
+        if data.get("version") != version:
+            return
+
+        for key, node in data["entries"][-self.max_entries :]:
+            self.entries[key] = node
@@ -0,0 +1,123 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from file_manage import iter_files
+from manifest import hash_file
+
+COMPRESSIBLE = ["*.html", "*.css", "*.js", "*.mjs", "*.json", "*.svg", "*.xml", "*.txt"]
+
+# Below this size the gzip header and a request round trip dominate
+MIN_SIZE = 256
+
+
+def compress_tree(
+    root, previous=None, level=6, jobs=None, min_ratio=0.9, dry_run=False
+):
+    """Write ``.gz`` siblings for the compressible files under ``root``.
+
+    ``previous`` maps relative paths to the state recorded by the last run
+    (see the returned ``state``); a file whose content hash and level match
+    is left alone, and files are hashed only when their size or mtime
+    differ from it. Files are compressed on a pool of ``jobs`` threads,
+    one per CPU by default, as zlib releases the GIL while it works. A
+    compressed copy is only kept when it is smaller than ``min_ratio``
+    times the original; otherwise any existing sibling is removed so a
+    stale one is never served.
+
+    Siblings of files that disappeared since the last run are removed.
+
+    Returns (compressed, unchanged, skipped, removed, state) where the
+    first four are sorted lists of relative paths and ``state`` maps each
+    relative path to {"hash", "size", "mtime_ns", "level", "gzip"}.
+    """
+    previous = previous or {}
+    state = {}
+    unchanged = []
+    pending = []
+
+    if os.path.isdir(root):
+        for entry in iter_files(root, include=COMPRESSIBLE):
+            rel_path = os.path.relpath(entry.path, root)
+            st = entry.stat()
+            if st.st_size < MIN_SIZE:
+                continue
+
+            old = previous.get(rel_path)
+            if (
+                old is not None
+                and old.get("size") == st.st_size
+                and old.get("mtime_ns") == st.st_mtime_ns
+            ):
+                digest = old["hash"]
+            else:
+                digest = hash_file(entry.path)
+            if (
+                old is not None
+                and old["hash"] == digest
+                and old["level"] == level
+                and (not old["gzip"] or os.path.exists(entry.path + ".gz"))
+            ):
+                state[rel_path] = dict(
+                    old, size=st.st_size, mtime_ns=st.st_mtime_ns
+                )
+                unchanged.append(rel_path)
+                continue
+            pending.append((rel_path, digest, st))
+
+    def compress(item):
+        rel_path, digest, st = item
+        path = os.path.join(root, rel_path)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        # a fixed mtime keeps the output byte-identical across builds
+        compressed = gzip.compress(data, compresslevel=level, mtime=0)
+        worth_it = len(compressed) < len(data) * min_ratio
+        if not dry_run:
+            if worth_it:
+                _write_sibling(path, compressed)
+            else:
+                _remove_sibling(path)
+        return rel_path, {
+            "hash": digest,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "level": level,
+            "gzip": worth_it,
+        }
+
+    compressed = []
+    skipped = []
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        for rel_path, file_state in executor.map(compress, pending):
+            state[rel_path] = file_state
+            (compressed if file_state["gzip"] else skipped).append(rel_path)
+
+    removed = []
+    for rel_path in sorted(set(previous) - set(state)):
+        if previous[rel_path]["gzip"]:
+            if not dry_run:
+                _remove_sibling(os.path.join(root, rel_path))
+            removed.append(rel_path + ".gz")
+
+    return sorted(compressed), sorted(unchanged), sorted(skipped), removed, state
+
+
+def _write_sibling(path, data):
+    gz_path = path + ".gz"
+    tmp_path = gz_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+
+    # nginx's gzip_static reports the compressed file's mtime, match the original
+    st = os.stat(path)
+    os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(tmp_path, gz_path)
+
+
+def _remove_sibling(path):
+    try:
+        os.remove(path + ".gz")
+    except FileNotFoundError:
+        pass
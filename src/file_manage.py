@@ -1,21 +1,313 @@
+import fnmatch
 import os
+import shutil
+
+from manifest import hash_file
+
+SYMLINK_POLICIES = ("files", "follow", "skip")
+
+
+def iter_files(root, include=None, exclude=None, symlinks="files"):
+    """Lazily yield an ``os.DirEntry`` for every file below ``root``.
+
+    Directories are read with ``os.scandir`` one at a time, so callers can
+    start working on the first files before the walk is finished, and the
+    entries' cached type and stat information saves extra syscalls.
+    Each directory's entries are sorted by name and its files are yielded
+    before its subdirectories are walked, so the order is deterministic.
+
+    Args:
+        root: Directory to walk
+        include: Glob patterns; only files whose path relative to ``root``
+            matches one of them are yielded
+        exclude: Glob patterns; matching files are skipped and matching
+            directories are not descended into
+        symlinks: "files" yields symlinked files but doesn't descend into
+            symlinked directories, "follow" descends into them too (each
+            directory is visited at most once) and "skip" ignores all
+            symlinks
+    """
+    if symlinks not in SYMLINK_POLICIES:
+        raise ValueError(f"Unknown symlink policy {symlinks}")
+
+    visited = set()
+    if symlinks == "follow":
+        st = os.stat(root)
+        visited.add((st.st_dev, st.st_ino))
+
+    stack = [(root, "")]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}{entry.name}"
+            if entry.is_symlink() and symlinks == "skip":
+                continue
+            if exclude and _matches(rel_path, exclude):
+                continue
+
+            # is_dir() follows links, so symlinked directories are never
+            # mistaken for files
+            if entry.is_dir():
+                if symlinks == "follow":
+                    st = entry.stat()
+                    if (st.st_dev, st.st_ino) in visited:
+                        continue
+                    visited.add((st.st_dev, st.st_ino))
+                elif entry.is_symlink():
+                    continue
+                subdirs.append((entry.path, f"{rel_path}/"))
+            elif not include or _matches(rel_path, include):
+                yield entry
+
+        stack.extend(reversed(subdirs))
+
+
+def _matches(rel_path, patterns):
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(
+        fnmatch.fnmatchcase(rel_path, pattern) or fnmatch.fnmatchcase(name, pattern)
+        for pattern in patterns
+    )
 
 
 def discover_files(static_dir):
     if not os.path.exists(static_dir):
         raise Exception(f"{static_dir} doesn't exist")
 
-    return __discover_internal(static_dir, [])
+    return [entry.path for entry in iter_files(static_dir)]
+
+
+COPY_MODES = ("copy", "hardlink", "reflink")
+
+# ioctl request number for FICLONE on Linux (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+
+def sync_tree(
+    src_dir, dest_dir, previous=(), checksum=False, mode="copy", dry_run=False
+):
+    """Mirror the files of ``src_dir`` into ``dest_dir``, copying only changes.
+
+    A file is up to date when the destination has the same size and
+    mtime (or, with ``checksum``, the same content). Unchanged files cost
+    one ``stat`` on each side.
+
+    Args:
+        src_dir: Directory to copy from
+        dest_dir: Directory to copy into
+        previous: Relative paths synced by the last run; any of them that no
+            longer exist in ``src_dir`` are removed from ``dest_dir``. Files
+            in ``dest_dir`` that were never synced (e.g. generated pages)
+            are left alone.
+        checksum: Compare content hashes instead of trusting size/mtime
+        mode: "copy", "hardlink" or "reflink"; links fall back to copying
+            when the filesystem doesn't support them
+        dry_run: Only report what would change
+
+    Returns:
+        A tuple of (copied, unchanged, removed, synced) where the first
+        three are relative paths and ``synced`` is the set to pass as
+        ``previous`` next time
+    """
+    if mode not in COPY_MODES:
+        raise ValueError(f"Unknown copy mode {mode}")
+
+    copied = []
+    unchanged = []
+    synced = set()
+
+    if not os.path.exists(src_dir):
+        raise Exception(f"{src_dir} doesn't exist")
+
+    for entry in iter_files(src_dir):
+        path = entry.path
+        rel_path = os.path.relpath(path, src_dir)
+        dest_path = os.path.join(dest_dir, rel_path)
+        synced.add(rel_path)
+
+        if _is_up_to_date(path, dest_path, checksum, entry.stat()):
+            unchanged.append(rel_path)
+            continue
+
+        if not dry_run:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            _copy_file(path, dest_path, mode)
+        copied.append(rel_path)
+
+    removed = sorted(set(previous) - synced)
+    if not dry_run:
+        for rel_path in removed:
+            _remove_file(os.path.join(dest_dir, rel_path), dest_dir)
+
+    return sorted(copied), sorted(unchanged), removed, synced
+
+
+# Files that are linked to by name from outside the site, or looked up by
+# crawlers and browsers at fixed paths, keep only their plain name
+FINGERPRINT_EXCLUDE = ["*.html", "*.txt", "*.xml", "*.ico", "*.webmanifest", "_*"]
+
+FINGERPRINT_LENGTH = 8
 
 
-def __discover_internal(file_path, found=[]):
-    contents = os.listdir(file_path)
-    for path in contents:
-        full_path = os.path.join(file_path, path)
+def fingerprinted_name(rel_path, digest):
+    """``css/index.css`` -> ``css/index.<hash>.css``."""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
 
-        if os.path.isdir(full_path):
-            __discover_internal(full_path, found)
+
+def fingerprint_tree(src_dir, dest_dir, previous=None, mode="copy", dry_run=False):
+    """Copy the files of ``src_dir`` into ``dest_dir`` under content-hashed names.
+
+    A fingerprinted file never changes once written, so it can be cached
+    forever; a file whose content changes gets a new name instead. Files
+    are hashed only when their size or mtime differ from ``previous``.
+
+    Args:
+        src_dir: Directory to copy from
+        dest_dir: Directory to copy into
+        previous: State returned by the last run; fingerprinted copies it
+            lists that are no longer current are removed
+        mode: "copy", "hardlink" or "reflink", as for ``sync_tree``
+        dry_run: Only report what would change
+
+    Returns:
+        A tuple of (written, unchanged, removed, state) where the first
+        three are fingerprinted relative paths and ``state`` maps each
+        source's relative path to its hash, size, mtime and fingerprinted
+        name, to pass as ``previous`` next time
+    """
+    if mode not in COPY_MODES:
+        raise ValueError(f"Unknown copy mode {mode}")
+    previous = previous or {}
+
+    written = []
+    unchanged = []
+    state = {}
+
+    for entry in iter_files(src_dir, exclude=FINGERPRINT_EXCLUDE):
+        rel_path = os.path.relpath(entry.path, src_dir)
+        st = entry.stat()
+        known = previous.get(rel_path)
+        if (
+            known is not None
+            and known["size"] == st.st_size
+            and known["mtime_ns"] == st.st_mtime_ns
+        ):
+            digest = known["hash"]
         else:
-            found.append(full_path)
+            digest = hash_file(entry.path)
+
+        name = fingerprinted_name(rel_path, digest)
+        state[rel_path] = {
+            "hash": digest,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "name": name,
+        }
+
+        dest_path = os.path.join(dest_dir, name)
+        if os.path.exists(dest_path):
+            unchanged.append(name)
+            continue
+
+        if not dry_run:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            _copy_file(entry.path, dest_path, mode)
+        written.append(name)
+
+    current = {entry["name"] for entry in state.values()}
+    removed = sorted({entry["name"] for entry in previous.values()} - current)
+    if not dry_run:
+        for name in removed:
+            _remove_file(os.path.join(dest_dir, name), dest_dir)
+
+    return sorted(written), sorted(unchanged), removed, state
+
+
+def _is_up_to_date(src_path, dest_path, checksum, src_stat):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+
+    if not checksum:
+        return src_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+    if src_stat.st_ino == dest_stat.st_ino and src_stat.st_dev == dest_stat.st_dev:
+        return True
+
+    if hash_file(src_path) != hash_file(dest_path):
+        return False
+
+    # same content, just bring the mtime in line so the next run is a stat
+    shutil.copystat(src_path, dest_path)
+    return True
+
+
+def _copy_file(src_path, dest_path, mode):
+    # never write through an existing file: it may be a hardlink to the source
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+
+    if mode == "hardlink":
+        try:
+            os.link(src_path, dest_path)
+            return
+        except OSError:
+            pass
+    elif mode == "reflink":
+        try:
+            _reflink(src_path, dest_path)
+            shutil.copystat(src_path, dest_path)
+            return
+        except OSError:
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+
+    _copy_contents(src_path, dest_path)
+    shutil.copystat(src_path, dest_path)
+
+
+def _reflink(src_path, dest_path):
+    import fcntl
+
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+
+
+def _copy_contents(src_path, dest_path):
+    """Copy file data, in-kernel via copy_file_range where available."""
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src_path, dest_path)
+        return
+
+    try:
+        with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dest.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except OSError:
+        # e.g. EXDEV on older kernels or filesystems without support
+        shutil.copyfile(src_path, dest_path)
+
+
+def _remove_file(path, root):
+    """Remove ``path`` and any directories it leaves empty below ``root``."""
+    if os.path.lexists(path):
+        os.remove(path)
 
-    return found
+    root = os.path.normpath(root)
+    dir = os.path.dirname(os.path.normpath(path))
+    while dir != root and os.path.isdir(dir) and not os.listdir(dir):
+        os.rmdir(dir)
+        dir = os.path.dirname(dir)
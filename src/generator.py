@@ -1,49 +1,407 @@
+import hashlib
+import json
 import os
-from blocks import BlockType, block_to_block_type
-from htmlnode import HTMLNode, LeafNode, ParentNode
-from utils import (
-    extract_title,
-    markdown_to_blocks,
-    text_node_to_html_node,
-    text_to_textnodes,
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from blocks import (
+    BlockType,
+    MarkdownFile,
+    classify_lines,
+    scan_blocks,
+    split_block_lines,
 )
+from file_manage import iter_files
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from linkgraph import page_references, page_url
+from manifest import hash_file, open_atomic
+from profiler import StageTimer
+from search import page_terms
+from template import load_template
+from utils import extract_title, text_node_to_html_node, text_to_textnodes
 import re
 
 
-def generate_page(from_path, template_path, dest_path):
-    print(f"📜 Generating from {from_path} to {dest_path} using {template_path}")
+# Bump whenever rendering output changes so cached page bodies are discarded
+PARSER_VERSION = "1"
+
+
+class BuildError(Exception):
+    """Raised after a build in which one or more pages failed to render.
+
+    ``failures`` is a list of (source path, formatted traceback) tuples in
+    build order.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(f"{len(failures)} page(s) failed to generate")
+
+    def report(self):
+        return "\n".join(f"{path}:\n{error}" for path, error in self.failures)
+
+
+# Pages at least this large are streamed block by block instead of being
+# read and rendered as a whole
+STREAM_THRESHOLD = 16 * 2**20
+
+
+def generate_page(
+    from_path,
+    template,
+    dest_path,
+    timings=None,
+    cache=None,
+    block_cache=None,
+    images=None,
+    extract=None,
+    assets=None,
+    stream_threshold=STREAM_THRESHOLD,
+):
+    """Render one markdown file into ``dest_path``.
+
+    ``template`` is either a template path or a compiled Template; callers
+    rendering many pages should compile it once and pass the Template.
+
+    When ``timings`` is a list, the page is rendered stage by stage and a
+    (stage, start, seconds) tuple is appended for each stage.
+
+    With a ParseCache, the rendered body is looked up by the hash of the
+    markdown and only parsed on a miss. A BlockCache memoizes individual
+    blocks that repeat across pages. An ImageIndex adds dimensions and
+    lazy-loading attributes to images, and an AssetMap points links and
+    images at fingerprinted static files.
+
+    When ``extract`` is a dict of name -> function, each function is
+    called with the page's markdown (a MarkdownFile when streamed) and its
+    rendered node tree when there is one, and its result replaces it in
+    the dict; see ``_extract``. Site-wide indexes collect their data from
+    pool workers this way.
+
+    Sources of ``stream_threshold`` bytes or more are streamed, see
+    ``_generate_page_streamed``.
+
+    Returns "hit" or "miss" when a cache is used, otherwise None.
+    """
+    template = load_template(template)
+    print(f"📜 Generating from {from_path} to {dest_path} using {template.path}")
+
+    if os.path.getsize(from_path) >= stream_threshold:
+        return _generate_page_streamed(
+            from_path,
+            template,
+            dest_path,
+            StageTimer(timings if timings is not None else []),
+            block_cache,
+            images,
+            extract,
+            assets,
+        )
+
+    if timings is not None:
+        return _generate_page_staged(
+            from_path,
+            template,
+            dest_path,
+            StageTimer(timings),
+            cache,
+            block_cache,
+            images,
+            extract,
+            assets,
+        )
 
     md_content = None
-    tempalte_content = None
     with open(from_path, "r") as f:
         md_content = f.read()
 
-    with open(template_path, "r") as f:
-        tempalte_content = f.read()
-
-    node = markdown_to_html_node(md_content)
+    content, status = _page_body(
+        md_content, cache, block_cache, template.minify, images, assets, extract
+    )
     title = extract_title(md_content) or ""
 
-    template_content = tempalte_content.replace(
-        r"{{ Content }}", node.to_html()
-    ).replace(r"{{ Title }}", title)
+    with open_atomic(dest_path) as f:
+        template.write(f.write, Content=content, Title=title)
+
+    return status
+
+
+def _generate_page_streamed(
+    from_path,
+    template,
+    dest_path,
+    timer,
+    block_cache=None,
+    images=None,
+    extract=None,
+    assets=None,
+):
+    """Generate a page without holding its markdown or HTML in memory.
+
+    The source is read line by line: up to its title first, which the
+    template places before the body, then once more while each block is
+    rendered and written between the template's prefix and suffix. Peak
+    memory follows the largest block rather than the file. The parse
+    cache, which stores whole page bodies, is not used.
+    """
+    md_file = MarkdownFile(from_path)
+    if extract is not None:
+        _extract(extract, md_file)
+        timer.lap("extract")
+
+    title = extract_title(md_file) or ""
+    timer.lap("title scan")
 
-    dir = os.path.dirname(dest_path)
+    body = StreamedBody(md_file, block_cache, images, assets)
+    # a failure halfway through leaves the previous page in place
+    with open_atomic(dest_path) as f:
+        template.write(f.write, Content=body, Title=title)
+    timer.lap("stream")
 
-    if dir:
-        os.makedirs(dir, exist_ok=True)
 
-    with open(dest_path, "w") as f:
-        f.write(template_content)
+class StreamedBody:
+    """A page body rendered block by block as it is written.
 
+    Stands in for the node tree ``markdown_to_html_node`` would build, in
+    ``Template.write``, and produces the same HTML.
+    """
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
+    def __init__(self, markdown, block_cache=None, images=None, assets=None):
+        self.markdown = markdown
+        self.block_cache = block_cache
+        self.images = images
+        self.assets = assets
+
+    def write_html(self, write, minify=False):
+        write("<div>")
+        for block_type, lines in scan_blocks(self.markdown):
+            html = _render_block(
+                block_type, lines, self.block_cache, self.images, self.assets
+            )
+            if html:
+                html.write_html(write, minify=minify)
+        write("</div>")
+
+
+def _extract(extract, md_content, body=None, cache=None):
+    """Replace each function of ``extract`` with its value for the page.
+
+    Functions are called with the markdown and, when the page was just
+    parsed, its rendered node tree as ``body`` (otherwise None) so they
+    can reuse it. With a ParseCache their JSON values are cached by the
+    markdown's hash, so an unchanged page is never scanned again.
+    """
+    for name, function in extract.items():
+        key = None
+        if cache is not None:
+            key = cache.key(md_content, PARSER_VERSION, f"extract:{name}")
+            cached = cache.get(key)
+            if cached is not None:
+                extract[name] = json.loads(cached)
+                continue
+
+        extract[name] = function(md_content, body)
+        if key is not None:
+            cache.put(key, json.dumps(extract[name]))
+
+
+def _page_body(
+    md_content,
+    cache=None,
+    block_cache=None,
+    minify=False,
+    images=None,
+    assets=None,
+    extract=None,
+):
+    """Return (body, cache status) for a page's markdown.
+
+    Without a cache the body is the node tree, so it can be streamed; with
+    one it is the rendered HTML string that was cached. ``extract`` is
+    filled in along the way, see ``_extract``.
+    """
+    if cache is None:
+        node = markdown_to_html_node(md_content, block_cache, images, assets)
+        if extract:
+            _extract(extract, md_content, node)
+        return node, None
+
+    key = cache.key(md_content, *_cache_options(minify, images, assets))
+    content = cache.get(key)
+    if content is not None:
+        if extract:
+            _extract(extract, md_content, cache=cache)
+        return content, "hit"
+
+    node = markdown_to_html_node(md_content, block_cache, images, assets)
+    content = node.to_html(minify)
+    cache.put(key, content)
+    if extract:
+        _extract(extract, md_content, node, cache)
+    return content, "miss"
+
+
+def _cache_options(minify, images, assets=None):
+    options = [PARSER_VERSION]
+    if minify:
+        options.append("minify")
+    if images is not None:
+        options.append(images.fingerprint)
+    if assets is not None:
+        options.append(f"assets:{assets.fingerprint}")
+    return options
+
+
+def render_page(
+    md_content,
+    template,
+    cache=None,
+    block_cache=None,
+    images=None,
+    assets=None,
+    extract=None,
+):
+    """Render markdown into a complete page string.
+
+    Returns (page HTML, cache status) for callers that handle the file I/O
+    themselves, such as the asyncio pipeline. ``extract`` is filled in as
+    by ``generate_page``.
+    """
+    content, status = _page_body(
+        md_content, cache, block_cache, template.minify, images, assets, extract
+    )
+    if not isinstance(content, str):
+        content = content.to_html(template.minify)
+
+    title = extract_title(md_content) or ""
+    return template.render(Content=content, Title=title), status
+
+
+def _generate_page_staged(
+    from_path,
+    template,
+    dest_path,
+    timer,
+    cache=None,
+    block_cache=None,
+    images=None,
+    extract=None,
+    assets=None,
+):
+    """Same output as generate_page, with each pipeline stage run separately.
+
+    Stages are materialized one after another so they can be timed, which
+    gives up the streaming of the regular path.
+    """
+    with open(from_path, "r") as f:
+        md_content = f.read()
+    timer.lap("read")
+
+    status = None
+    content = None
+    node = None
+    if cache is not None:
+        key = cache.key(md_content, *_cache_options(template.minify, images, assets))
+        content = cache.get(key)
+        status = "hit" if content is not None else "miss"
+        timer.lap("cache lookup")
+
+    if content is None:
+        blocks = list(split_block_lines(md_content))
+        timer.lap("block split")
+
+        block_types = [classify_lines(lines) for lines in blocks]
+        timer.lap("block classify")
+
+        children = []
+        for block_type, lines in zip(block_types, blocks):
+            html = _render_block(block_type, lines, block_cache, images, assets)
+            if html:
+                children.append(html)
+        node = ParentNode("div", children)
+        timer.lap("inline parse")
+
+        content = node.to_html(template.minify)
+        timer.lap("serialize")
+
+        if cache is not None:
+            cache.put(key, content)
+            timer.lap("cache store")
+
+    if extract:
+        _extract(extract, md_content, node, cache)
+        timer.lap("extract")
+
+    page = template.render(Content=content, Title=extract_title(md_content) or "")
+    timer.lap("template fill")
+
+    with open_atomic(dest_path) as f:
+        f.write(page)
+    timer.lap("write")
+
+    return status
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    manifest=None,
+    dry_run=False,
+    jobs=1,
+    profiler=None,
+    cache=None,
+    io_workers=0,
+    block_cache=None,
+    minify=False,
+    images=None,
+    links=None,
+    search=None,
+    sitemap=None,
+    feed=None,
+    assets=None,
+):
     """Recursively generate HTML pages from markdown files in the content directory.
 
     Args:
         dir_path_content: Path to the content directory containing markdown files
         template_path: Path to the HTML template file
         dest_dir_path: Path to the destination directory where HTML files will be written
+        manifest: Optional BuildManifest; pages whose source and template are
+            unchanged since the last build are skipped, and outputs of
+            sources that disappeared are removed
+        dry_run: Only report what would be generated
+        jobs: Number of worker processes used to render pages
+        profiler: Optional BuildProfiler receiving per-page stage timings
+            and manifest hit/miss counts
+        cache: Optional ParseCache holding rendered page bodies
+        io_workers: When set, run the asyncio pipeline that overlaps file
+            reads and writes (on this many threads) with rendering
+        block_cache: Optional BlockCache memoizing rendered blocks; each
+            pool worker gets its own copy, seeded with its entries, and
+            their hit and miss counts are added back to it
+        minify: Strip insignificant whitespace and attribute quotes while
+            serializing the pages and the template
+        images: Optional scanned ImageIndex used to add dimensions and
+            lazy-loading attributes to images
+        links: Optional LinkGraph updated with the references of every
+            rendered page; with an image index, a page is then only
+            re-rendered when the dimensions of its own images change
+        search: Optional SearchIndex updated with the terms of every
+            rendered page; pages it has no terms for are never skipped
+        sitemap: Optional SitemapWriter receiving the URL and source mtime
+            of every page, skipped or generated, as it is produced
+        feed: Optional FeedWriter offered every page the same way
+        assets: Optional AssetMap pointing static file URLs in the template
+            and the pages at their fingerprinted copies; with the link
+            graph, a page is only re-rendered when assets it references
+            get a new fingerprint
+
+    Returns:
+        A tuple of (generated, skipped, removed) destination paths
+
+    Raises:
+        BuildError: if any page failed; every other page is still generated
     """
     if not os.path.exists(dir_path_content):
         raise Exception(f"Content directory {dir_path_content} doesn't exist")
@@ -52,33 +410,261 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
     dir_path_content = os.path.normpath(dir_path_content)
     dest_dir_path = os.path.normpath(dest_dir_path)
 
-    # Walk through the content directory recursively
-    for root, dirs, files in os.walk(dir_path_content):
-        for file in files:
-            if file.endswith(".md"):
-                # Get the full path to the markdown file
-                md_path = os.path.join(root, file)
-
-                # Calculate relative path from content directory
-                rel_path = os.path.relpath(md_path, dir_path_content)
-
-                # Change extension from .md to .html
-                rel_html_path = os.path.splitext(rel_path)[0] + ".html"
+    template = load_template(template_path, minify=minify, assets=assets)
+    template_hash = None
+    if manifest is not None:
+        # changing any of these must regenerate every page
+        template_hash = f"{hash_file(template_path)}+parser:{PARSER_VERSION}"
+        if minify:
+            template_hash += "+minify"
+        if images is not None and links is None:
+            # without the graph, any image change must rebuild everything
+            template_hash += f"+images:{images.fingerprint}"
+        if assets is not None and links is None:
+            template_hash += f"+assets:{assets.fingerprint}"
+        elif assets is not None:
+            # only the assets the template itself references
+            used = repr(sorted(template.asset_urls.items())).encode()
+            template_hash += f"+assets:{hashlib.sha256(used).hexdigest()}"
+    generated = []
+    skipped = []
+    sources = []
+
+    def pending_pages():
+        # Walk lazily so rendering starts while the rest of the tree is
+        # still being listed; iter_files yields in a deterministic order
+        for entry in iter_files(dir_path_content, include=["*.md"]):
+            # Get the full path to the markdown file
+            md_path = entry.path
+
+            # Calculate relative path from content directory
+            rel_path = os.path.relpath(md_path, dir_path_content)
+
+            # Change extension from .md to .html
+            rel_html_path = os.path.splitext(rel_path)[0] + ".html"
+
+            # Build destination path
+            dest_path = os.path.join(dest_dir_path, rel_html_path)
+            sources.append(rel_path)
+            st = entry.stat()
+
+            if (
+                manifest is not None
+                and manifest.is_fresh(
+                    rel_path, md_path, template_hash, dest_path, st
+                )
+                and (
+                    links is None
+                    or (images is None and assets is None)
+                    or not links.assets_changed(rel_path, images, assets)
+                )
+                and (search is None or rel_path in search.pages)
+            ):
+                skipped.append(dest_path)
+                add_to_listings(rel_path, md_path, st.st_mtime)
+                if profiler is not None:
+                    profiler.count("manifest hit")
+                continue
+
+            if profiler is not None and manifest is not None:
+                profiler.count("manifest miss")
+
+            yield rel_path, md_path, dest_path
+
+    def add_to_listings(rel_path, md_path, mtime):
+        if sitemap is not None:
+            sitemap.add(page_url(rel_path), mtime)
+        if feed is not None:
+            feed.add(page_url(rel_path), mtime, md_path)
+
+    failures = []
+    if dry_run:
+        generated = [dest_path for _, _, dest_path in pending_pages()]
+    else:
+        extract = {}
+        if links is not None:
+            extract["references"] = page_references
+        if search is not None:
+            extract["search"] = page_terms
+        settings = {
+            "template": template,
+            "cache": cache,
+            "block_cache": block_cache,
+            "images": images,
+            "assets": assets,
+            "extract": extract,
+            "profile": profiler is not None,
+        }
+        if io_workers > 0:
+            # imported here because the pipeline module imports this one
+            from pipeline import run_pipeline
+
+            results = run_pipeline(pending_pages(), settings, jobs, io_workers)
+        else:
+            results = _run_page_tasks(pending_pages(), settings, jobs)
+
+        for (rel_path, md_path, dest_path), result in results:
+            if profiler is not None:
+                profiler.add_page(md_path, result["timings"], pid=result["pid"])
+                if result["cache"] is not None:
+                    profiler.count(f"parse cache {result['cache']}")
+
+            if result["blocks"] is not None:
+                hits, misses = result["blocks"]
+                if result["pid"] != os.getpid():
+                    # rendered on a worker's copy; fold into the build totals
+                    block_cache.hits += hits
+                    block_cache.misses += misses
+                if profiler is not None:
+                    profiler.count("block cache hit", hits)
+                    profiler.count("block cache miss", misses)
+
+            if result["error"] is not None:
+                failures.append((md_path, result["error"]))
+                continue
+
+            if manifest is not None:
+                manifest.record(rel_path, md_path, template_hash, dest_path)
+            if links is not None:
+                page_links, page_images = result["extracted"]["references"]
+                links.update(rel_path, page_links, page_images, images, assets)
+            if search is not None:
+                terms = result["extracted"]["search"]
+                search.update(rel_path, page_url(rel_path), terms)
+            if sitemap is not None or feed is not None:
+                add_to_listings(rel_path, md_path, os.path.getmtime(md_path))
+            generated.append(dest_path)
+
+        if links is not None:
+            links.retain(sources)
+        if search is not None:
+            search.retain(sources)
+
+    removed = []
+    if manifest is not None:
+        removed = manifest.prune(dest_dir_path, dry_run=dry_run)
+    for path in removed:
+        print(f"🗑️  Removing stale page {path}")
+
+    if failures:
+        raise BuildError(failures)
+
+    return generated, skipped, removed
+
+
+# Settings shared by every page of a build, installed once per pool worker
+_worker_settings = None
+
+
+def _init_worker(settings):
+    global _worker_settings
+    _worker_settings = settings
+
+
+def _generate_page_task(args, settings=None):
+    """Render one page, capturing errors instead of raising.
+
+    Returns a dict with the formatted ``error`` (or None), the worker
+    ``pid``, the stage ``timings`` when profiling, the ``cache`` status,
+    the page's block cache (hits, misses) as ``blocks`` and, when asked
+    for, the values ``extracted`` from the page's markdown.
+    """
+    if settings is None:
+        settings = _worker_settings
+
+    _, md_path, dest_path = args
+    timings = [] if settings["profile"] else None
+    block_cache = settings["block_cache"]
+    result = {
+        "error": None,
+        "pid": os.getpid(),
+        "timings": timings,
+        "cache": None,
+        "blocks": None,
+        "extracted": dict(settings["extract"]) if settings["extract"] else None,
+    }
+    before = block_stats(block_cache)
+    try:
+        result["cache"] = generate_page(
+            md_path,
+            settings["template"],
+            dest_path,
+            timings=timings,
+            cache=settings["cache"],
+            block_cache=block_cache,
+            images=settings["images"],
+            extract=result["extracted"],
+            assets=settings["assets"],
+        )
+    except Exception:
+        result["error"] = traceback.format_exc()
+    result["blocks"] = block_stats(block_cache, before)
+    return result
+
+
+def block_stats(block_cache, before=None):
+    """Return a BlockCache's (hits, misses), relative to ``before`` if given.
+
+    Pool workers each hold their own copy of the cache, so pages report
+    their own deltas for the parent to total.
+    """
+    if block_cache is None:
+        return None
 
-                # Build destination path
-                dest_path = os.path.join(dest_dir_path, rel_html_path)
+    hits, misses = block_cache.hits, block_cache.misses
+    if before is not None:
+        hits, misses = hits - before[0], misses - before[1]
+    return hits, misses
 
-                # Generate the page
-                generate_page(md_path, template_path, dest_path)
 
+def _run_page_tasks(page_args, settings, jobs):
+    """Render pages serially or on a process pool.
 
-def markdown_to_html_node(markdown) -> HTMLNode:
-    """Convert full markdown string into an HTML node tree."""
-    blocks = markdown_to_blocks(markdown)
+    ``page_args`` is consumed lazily and (args, result) pairs are yielded in
+    input order. The pool keeps a bounded number of pages in flight, so
+    memory stays flat however many pages the walk produces.
+    """
+    if jobs <= 1:
+        for args in page_args:
+            yield args, _generate_page_task(args, settings)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(settings,)
+    ) as executor:
+        pending = deque()
+        for args in page_args:
+            pending.append((args, executor.submit(_generate_page_task, args)))
+            if len(pending) >= jobs * 4:
+                args, future = pending.popleft()
+                yield args, future.result()
+
+        while pending:
+            args, future = pending.popleft()
+            yield args, future.result()
+
+
+HEADING_CONTENT_PATTERN = re.compile(r"^(#{1,6})\s+(.*)")
+# Constant tag names are interned once, instead of being built and looked
+# up in the interned strings table for every heading
+HEADING_TAGS = (None, "h1", "h2", "h3", "h4", "h5", "h6")
+UNORDERED_ITEM_PATTERN = re.compile(r"^-+\s*")
+ORDERED_ITEM_PATTERN = re.compile(r"^\d+\.\s*")
+
+
+def markdown_to_html_node(
+    markdown, block_cache=None, images=None, assets=None
+) -> HTMLNode:
+    """Convert full markdown string into an HTML node tree.
+
+    With a BlockCache, blocks already rendered on an earlier page are
+    reused instead of parsed again. With an ImageIndex, images get their
+    dimensions and lazy-loading attributes; with an AssetMap, links and
+    images to static files point at their fingerprinted copies.
+    """
     children = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        html = block_type_to_html(block_type, block)
+    for block_type, lines in scan_blocks(markdown):
+        html = _render_block(block_type, lines, block_cache, images, assets)
 
         if html:
             children.append(html)
@@ -86,51 +672,79 @@ def markdown_to_html_node(markdown) -> HTMLNode:
     return ParentNode("div", children)
 
 
-def block_type_to_html(block_type, block):
-    """Dispatch block rendering based on detected block type."""
+def _render_block(block_type, lines, block_cache=None, images=None, assets=None):
+    if block_cache is None:
+        return block_type_to_html(block_type, lines, images, assets)
+
+    text = "\n".join(lines)
+    if len(text) > block_cache.max_block_size:
+        return block_type_to_html(block_type, lines, images, assets)
+
+    key = (block_type, text)
+    html = block_cache.get(key)
+    if html is None:
+        html = block_type_to_html(block_type, lines, images, assets)
+        if html is not None:
+            block_cache.put(key, html)
+    return html
+
+
+def block_type_to_html(block_type, lines, images=None, assets=None):
+    """Dispatch block rendering based on detected block type.
+
+    ``lines`` are the block's stripped lines as produced by ``scan_blocks``;
+    a raw block string is also accepted and split into lines. ``images`` is
+    an optional ImageIndex used to annotate images and ``assets`` an
+    optional AssetMap used to rewrite static file URLs.
+    """
+    if isinstance(lines, str):
+        lines = [line.strip() for line in lines.splitlines() if line.strip()]
+
     match block_type:
         case BlockType.HEADING:
-            return heading_to_html(block)
+            return heading_to_html(lines, images, assets)
         case BlockType.PARAGRAPH:
-            return paragraph_to_html(block)
+            return paragraph_to_html(lines, images, assets)
         case BlockType.CODE:
-            return codeblock_to_html(block)
+            return codeblock_to_html(lines)
         case BlockType.QUOTE:
-            return quote_to_html(block)
+            return quote_to_html(lines, images, assets)
         case BlockType.UNORDERED_LIST:
-            return unordered_list_to_html(block)
+            return unordered_list_to_html(lines, images, assets)
         case BlockType.ORDERED_LIST:
-            return ordered_list_to_html(block)
+            return ordered_list_to_html(lines, images, assets)
         case _:
             return None
 
 
-def _inline_children_from_text(text):
+def _inline_children_from_text(text, images=None, assets=None):
     """Parse inline markdown inside a line and return HTML child nodes."""
-    return [text_node_to_html_node(node) for node in text_to_textnodes(text)]
+    return [
+        text_node_to_html_node(node, images, assets)
+        for node in text_to_textnodes(text)
+    ]
 
 
-def paragraph_to_html(block):
-    normalized = block.replace("\n", " ")
-    children = _inline_children_from_text(normalized)
+def paragraph_to_html(lines, images=None, assets=None):
+    normalized = " ".join(lines)
+    children = _inline_children_from_text(normalized, images, assets)
     return ParentNode("p", children)
 
 
-def heading_to_html(block):
+def heading_to_html(lines, images=None, assets=None):
     """Render heading (# .. ######) into an h1-h6 node with inline children."""
-    match = re.match(r"^(#{1,6})\s+(.*)", block.strip())
+    match = HEADING_CONTENT_PATTERN.match(lines[0]) if lines else None
     if not match:
         # fallback to paragraph if the heading is malformed
-        return paragraph_to_html(block)
+        return paragraph_to_html(lines, images, assets)
 
     hashes, content = match.groups()
-    children = _inline_children_from_text(content.strip())
-    return ParentNode(f"h{len(hashes)}", children)
+    children = _inline_children_from_text(content.strip(), images, assets)
+    return ParentNode(HEADING_TAGS[len(hashes)], children)
 
 
-def codeblock_to_html(block):
+def codeblock_to_html(lines):
     """Render fenced code block."""
-    lines = block.splitlines()
     if len(lines) >= 2 and lines[0].startswith("```") and lines[-1].startswith("```"):
         content_lines = lines[1:-1]
     else:
@@ -145,36 +759,34 @@ def codeblock_to_html(block):
     return ParentNode("pre", [code_node])
 
 
-def quote_to_html(block):
-    lines = []
-    for line in block.splitlines():
-        stripped = line.lstrip()
-        if stripped.startswith(">"):
-            lines.append(stripped[1:].lstrip())
+def quote_to_html(lines, images=None, assets=None):
+    cleaned = []
+    for line in lines:
+        if line.startswith(">"):
+            cleaned.append(line[1:].lstrip())
         else:
-            lines.append(stripped)
+            cleaned.append(line)
 
-    text = " ".join(lines)
-    children = _inline_children_from_text(text)
+    text = " ".join(cleaned)
+    children = _inline_children_from_text(text, images, assets)
     return ParentNode("blockquote", children)
 
 
-def _list_items_to_html(lines):
+def _list_items_to_html(lines, images=None, assets=None):
     """Convert a list of raw lines into <li> nodes with inline children."""
     items = []
     for line in lines:
         text = line.strip()
-        items.append(ParentNode("li", _inline_children_from_text(text)))
+        children = _inline_children_from_text(text, images, assets)
+        items.append(ParentNode("li", children))
     return items
 
 
-def unordered_list_to_html(block):
-    lines = block.splitlines()
-    cleaned = [re.sub(r"^-+\s*", "", line.strip(), count=1) for line in lines]
-    return ParentNode("ul", _list_items_to_html(cleaned))
+def unordered_list_to_html(lines, images=None, assets=None):
+    cleaned = [UNORDERED_ITEM_PATTERN.sub("", line, count=1) for line in lines]
+    return ParentNode("ul", _list_items_to_html(cleaned, images, assets))
 
 
-def ordered_list_to_html(block):
-    lines = block.splitlines()
-    cleaned = [re.sub(r"^\d+\.\s*", "", line.strip(), count=1) for line in lines]
-    return ParentNode("ol", _list_items_to_html(cleaned))
+def ordered_list_to_html(lines, images=None, assets=None):
+    cleaned = [ORDERED_ITEM_PATTERN.sub("", line, count=1) for line in lines]
+    return ParentNode("ol", _list_items_to_html(cleaned, images, assets))
@@ -1,23 +1,86 @@
+import sys
 from multiprocessing import Value
 
+from minify import PRESERVE_TAGS, collapse_whitespace, format_attribute
+
+# Marks the end of a PRESERVE_TAGS element on the serialization stack
+_END_PRESERVE = object()
+
 
 class HTMLNode:
+    # Pages hold hundreds of thousands of nodes, so skip the per-instance
+    # __dict__. Tag names are interned and empty props are stored as None,
+    # which avoids one empty dict per node.
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        self.tag = sys.intern(tag) if type(tag) is str else tag
         self.value = value
         self.children = children
-        self.props = props
+        self.props = props or None
 
-    def to_html(self):
+    def to_html(self, minify=False):
         raise NotImplementedError()
 
-    def props_to_html(self):
+    def iter_html(self, minify=False):
+        """Yield this node's HTML in chunks.
+
+        The tree is walked with an explicit stack instead of recursion, so
+        deep trees can't hit the recursion limit and no intermediate
+        subtree strings are built.
+
+        With ``minify``, text whitespace is collapsed and attribute quotes
+        are dropped where possible, except within ``PRESERVE_TAGS``.
+        """
+        stack = [self]
+        preserved = 0
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+            elif item is _END_PRESERVE:
+                preserved -= 1
+            elif minify and item.tag in PRESERVE_TAGS:
+                stack.append(_END_PRESERVE)
+                preserved += 1
+                yield item._open_html(stack, False)
+            else:
+                yield item._open_html(stack, minify and not preserved)
+
+    def write_html(self, write, buffer_size=1 << 16, minify=False):
+        """Stream this node's HTML to ``write`` (e.g. a file's ``write``).
+
+        Chunks are batched so at most ~``buffer_size`` characters are held
+        in memory at once.
+        """
+        buffer = []
+        size = 0
+        for chunk in self.iter_html(minify):
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= buffer_size:
+                write("".join(buffer))
+                buffer = []
+                size = 0
+
+        if buffer:
+            write("".join(buffer))
+
+    def _open_html(self, stack, minify=False):
+        """Return the HTML emitted before this node's children.
+
+        Nodes with children push their closing markup and then the children
+        (in reverse) onto ``stack``; leaves return their complete HTML.
+        """
+        return self.to_html(minify)
+
+    def props_to_html(self, minify=False):
         if not self.props:
             return ""
 
         arr = []
         for k, v in self.props.items():
-            arr.append(f'{k}="{v}"')
+            arr.append(format_attribute(k, v, minify))
 
         arr[0] = f" {arr[0]}"
         return " ".join(arr)
@@ -27,34 +90,41 @@ class HTMLNode:
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
-    def to_html(self):
+    def to_html(self, minify=False):
+        return "".join(self.iter_html(minify))
+
+    def _open_html(self, stack, minify=False):
         if not self.tag:
             raise ValueError("tag is required for ParentNode")
 
         if self.children is None:
             raise ValueError("children are required for ParentNode")
 
-        buffer = f"<{self.tag}{self.props_to_html()}>"
-
-        for child in self.children:
-            buffer += child.to_html()
-
-        buffer += f"</{self.tag}>"
-        return buffer
+        stack.append(f"</{self.tag}>")
+        stack.extend(reversed(self.children))
+        return f"<{self.tag}{self.props_to_html(minify)}>"
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, props=props)
 
-    def to_html(self):
+    def to_html(self, minify=False):
         if self.value is None:
             raise ValueError()
 
+        value = str(self.value)
+        if minify and self.tag not in PRESERVE_TAGS:
+            value = collapse_whitespace(value)
+
         if not self.tag:
-            return str(self.value)
+            return value
 
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(minify)}>{value}</{self.tag}>"
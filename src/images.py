@@ -0,0 +1,162 @@
+import hashlib
+import os
+import struct
+
+from file_manage import iter_files
+from manifest import hash_file, load_state, save_state
+
+IMAGE_FILES = ["*.png", "*.gif", "*.jpg", "*.jpeg"]
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# JPEG start-of-frame markers carry the dimensions; C4, C8 and CC share
+# the range but are Huffman/arithmetic tables
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_image_size(path):
+    """Return (width, height) of a PNG, GIF or JPEG file, or None.
+
+    Only the header is read: 24 bytes for PNG, 10 for GIF and, for JPEG,
+    the few bytes of each segment header up to the frame header, seeking
+    over the segment bodies (EXIF thumbnails and the like).
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+
+        if head[:2] == b"\xff\xd8":
+            return _read_jpeg_size(f)
+
+    return None
+
+
+def _read_jpeg_size(f):
+    f.seek(2)
+    while True:
+        if f.read(1) != b"\xff":
+            return None
+
+        marker = f.read(1)
+        # markers may be preceded by any number of 0xFF fill bytes
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+
+        code = marker[0]
+        if code == 0xD8 or 0xD0 <= code <= 0xD7 or code == 0x01:
+            # standalone markers have no length
+            continue
+        if code == 0xD9:
+            return None
+
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        (length,) = struct.unpack(">H", header)
+
+        if code in SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+class ImageIndex:
+    """Intrinsic dimensions of the images under the static directory.
+
+    ``scan`` reads the header of every image that changed since the last
+    scan. Dimensions are cached by content hash, and each file's size and
+    mtime are kept alongside so an unchanged file is recognised with a
+    ``stat``; a touched or copied file is hashed but its header not parsed
+    again.
+
+    ``lookup`` maps a site-absolute URL such as ``/images/a.png`` to its
+    (width, height).
+    """
+
+    VERSION = 1
+
+    def __init__(self, static_dir, path=None):
+        self.static_dir = static_dir
+        self.path = path
+        self.files = {}
+        self.sizes = {}
+        self.dimensions = {}
+        self.fingerprint = self._fingerprint()
+        self.load()
+
+    def load(self):
+        data = load_state(self.path, self.VERSION)
+        if data is not None:
+            self.files = data.get("files", {})
+            self.sizes = data.get("sizes", {})
+
+    def save(self):
+        save_state(
+            self.path, self.VERSION, {"files": self.files, "sizes": self.sizes}
+        )
+
+    def scan(self):
+        """Index every image under the static directory.
+
+        Returns the number of image headers that had to be read.
+        """
+        files = {}
+        dimensions = {}
+        read = 0
+
+        if os.path.isdir(self.static_dir):
+            for entry in iter_files(self.static_dir, include=IMAGE_FILES):
+                rel_path = os.path.relpath(entry.path, self.static_dir)
+                st = entry.stat()
+                known = self.files.get(rel_path)
+                if (
+                    known is not None
+                    and known["size"] == st.st_size
+                    and known["mtime_ns"] == st.st_mtime_ns
+                ):
+                    digest = known["hash"]
+                else:
+                    digest = hash_file(entry.path)
+
+                if digest not in self.sizes:
+                    self.sizes[digest] = read_image_size(entry.path)
+                    read += 1
+
+                files[rel_path] = {
+                    "hash": digest,
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                }
+                if self.sizes[digest] is not None:
+                    url = "/" + rel_path.replace(os.sep, "/")
+                    dimensions[url] = tuple(self.sizes[digest])
+
+        self.files = files
+        # forget sizes of images that are gone
+        live = {entry["hash"] for entry in files.values()}
+        self.sizes = {
+            digest: size for digest, size in self.sizes.items() if digest in live
+        }
+        self.dimensions = dimensions
+        self.fingerprint = self._fingerprint()
+        return read
+
+    def lookup(self, url):
+        return self.dimensions.get(url)
+
+    def _fingerprint(self):
+        # identifies the indexed dimensions in keys of caches holding pages
+        digest = hashlib.sha256()
+        for url, (width, height) in sorted(self.dimensions.items()):
+            digest.update(f"{url}\0{width}\0{height}\0".encode())
+        return digest.hexdigest()[:16]
@@ -0,0 +1,178 @@
+import os
+import posixpath
+import urllib.parse
+
+from blocks import BlockType, scan_blocks
+from manifest import load_state, save_state
+from utils import extract_markdown_images, extract_markdown_links
+
+
+def page_references(md_content, body=None):
+    """Return the (links, images) targets of a page, as written.
+
+    Code blocks are skipped since nothing inside them is rendered as a link
+    or image, and so are links and images with empty text, which the
+    inline parser drops. The rendered ``body`` is not used: its URLs may
+    already point at fingerprinted assets.
+    """
+    links = []
+    images = []
+    for block_type, lines in scan_blocks(md_content):
+        if block_type is BlockType.CODE:
+            continue
+        text = " ".join(lines)
+        images.extend(url for alt, url in extract_markdown_images(text) if alt)
+        links.extend(url for label, url in extract_markdown_links(text) if label)
+    return links, images
+
+
+def page_url(rel_path):
+    """The URL path a content source is published at."""
+    url = "/" + os.path.splitext(rel_path)[0].replace(os.sep, "/")
+    if posixpath.basename(url) == "index":
+        return url[: -len("index")]
+    return url + ".html"
+
+
+def resolve_url(base_url, target):
+    """Resolve ``target`` against the page at ``base_url`` to a site path.
+
+    Returns None for links leaving the site (other schemes or hosts) and
+    for links within the same page.
+    """
+    parts = urllib.parse.urlsplit(target)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+
+    path = urllib.parse.urljoin(base_url, urllib.parse.unquote(parts.path))
+    normalized = posixpath.normpath(path)
+    if path.endswith("/") and normalized != "/":
+        normalized += "/"
+    return normalized
+
+
+def url_aliases(url):
+    """Every request path that serves the page published at ``url``."""
+    if url.endswith("/"):
+        aliases = {url, url + "index.html"}
+        if url != "/":
+            aliases.add(url[:-1])
+        return aliases
+    return {url, url[: -len(".html")]}
+
+
+class LinkGraph:
+    """Site-wide graph of page->page links and page->image references.
+
+    Keyed by source path relative to the content directory, each page
+    records the site paths it links to and, for every site-absolute image
+    it embeds, the dimensions it was rendered with. Relative images are
+    rendered without dimensions (see ``text_node_to_html_node``), so pages
+    don't depend on them. A page whose images changed size can
+    then be re-rendered alone, and links left dangling by a removed or
+    renamed page are found without re-reading any source.
+
+    With fingerprinted assets, each page also records the fingerprinted
+    URL its site-absolute links and images were rewritten to (or None), so
+    an asset whose content changes only re-renders the pages using it.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path=None):
+        self.path = path
+        self.pages = {}
+        self.load()
+
+    def load(self):
+        data = load_state(self.path, self.VERSION)
+        if data is not None:
+            self.pages = data.get("pages", {})
+
+    def save(self):
+        save_state(self.path, self.VERSION, {"pages": self.pages})
+
+    def clear(self):
+        self.pages = {}
+
+    def update(self, rel_path, links, images, index=None, assets=None):
+        """Record the references of a freshly rendered page.
+
+        ``index`` and ``assets`` are the ImageIndex and AssetMap the page
+        was rendered with, if any.
+        """
+        base = page_url(rel_path)
+        resolved_links = sorted(
+            {url for url in (resolve_url(base, link) for link in links) if url}
+        )
+        sizes = {}
+        for image in images:
+            if not image.startswith("/"):
+                continue
+            url = resolve_url(base, image)
+            if url is not None:
+                size = index.lookup(url) if index is not None else None
+                sizes[url] = list(size) if size is not None else None
+        fingerprints = {}
+        if assets is not None:
+            fingerprints = _fingerprints(links + images, assets)
+        self.pages[rel_path] = {
+            "links": resolved_links,
+            "assets": sizes,
+            "fingerprints": fingerprints,
+        }
+
+    def retain(self, rel_paths):
+        """Forget pages that are no longer in the content tree."""
+        for rel_path in set(self.pages) - set(rel_paths):
+            del self.pages[rel_path]
+
+    def dependents(self, url):
+        """Pages that link to or embed the site path ``url``."""
+        return sorted(
+            rel_path
+            for rel_path, page in self.pages.items()
+            if url in page["links"] or url in page["assets"]
+        )
+
+    def assets_changed(self, rel_path, index=None, assets=None):
+        """Whether any image of a recorded page now has other dimensions,
+        or, given an AssetMap, any of its references another fingerprint.
+        """
+        page = self.pages.get(rel_path)
+        if page is None:
+            return True
+
+        if index is not None:
+            for url, size in page["assets"].items():
+                current = index.lookup(url)
+                if (list(current) if current is not None else None) != size:
+                    return True
+
+        if assets is not None:
+            recorded = page["fingerprints"]
+            if _fingerprints(recorded, assets) != recorded:
+                return True
+        return False
+
+    def broken_links(self, files=()):
+        """Return (page, target) for links to paths that no page serves.
+
+        ``files`` are the site paths of other published files, such as
+        static assets, which links may also point to.
+        """
+        served = set(files)
+        for rel_path in self.pages:
+            served |= url_aliases(page_url(rel_path))
+
+        return [
+            (rel_path, url)
+            for rel_path, page in sorted(self.pages.items())
+            for url in page["links"]
+            if url not in served
+        ]
+
+
+def _fingerprints(urls, assets):
+    # relative URLs are never rewritten, see AssetMap.url_for
+    return {url: assets.url_for(url) for url in urls if url.startswith("/")}
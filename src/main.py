@@ -1,55 +1,449 @@
 import argparse
 import os
 import shutil
+import sys
+from contextlib import nullcontext
 
-from file_manage import discover_files
-from generator import generate_pages_recursive
+from assets import AssetMap
+from cache import BlockCache, ParseCache
+from compress import compress_tree
+from file_manage import COPY_MODES, fingerprint_tree, sync_tree
+from generator import PARSER_VERSION, BuildError, generate_pages_recursive
+from images import ImageIndex
+from linkgraph import LinkGraph
+from manifest import BuildManifest
+from search import SearchIndex
+from sitemap import FeedWriter, SitemapWriter
+from utils import extract_title
+from profiler import BuildProfiler
+from server import LiveReloadServer, PageRenderer, PreviewServer
+from watch import PollingWatcher
 
 PUBLIC_PATH = "./public"
+STATIC_PATH = "./static"
+CONTENT_PATH = "./content"
+TEMPLATE_PATH = "template.html"
+MANIFEST_PATH = "./.cache/manifest.json"
+TRACE_PATH = "./.cache/trace.json"
+PARSE_CACHE_PATH = "./.cache/parse"
+BLOCK_CACHE_PATH = "./.cache/blocks.pickle"
+IMAGE_INDEX_PATH = "./.cache/images.json"
+LINK_GRAPH_PATH = "./.cache/links.json"
+SEARCH_INDEX_PATH = "./.cache/search.json"
+SEARCH_PATH = os.path.join(PUBLIC_PATH, "search")
 
 
-def main():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="A simple static web server generator")
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("-v", "--verbose", action="store_true")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep the public folder and only regenerate pages whose source or template changed",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes used to render pages (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--link",
+        choices=COPY_MODES,
+        default="copy",
+        help="how static files are placed into the public folder",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="serve the site, rebuild on changes and live-reload open browsers",
+    )
+    parser.add_argument(
+        "--async-io",
+        type=int,
+        default=0,
+        metavar="THREADS",
+        help="overlap file reads and writes with rendering using this many I/O threads",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve the built site with the threaded preview server",
+    )
+    parser.add_argument(
+        "--on-demand",
+        action="store_true",
+        help="skip the build and serve pages rendered from markdown on request",
+    )
+    parser.add_argument(
+        "--page-cache",
+        type=int,
+        default=256,
+        metavar="PAGES",
+        help="rendered pages kept in memory by --on-demand",
+    )
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=16,
+        help="worker threads of the preview server",
+    )
+    parser.add_argument(
+        "--file-cache",
+        type=int,
+        default=32,
+        metavar="MB",
+        help="memory for small files cached by the preview server (0 = off)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"don't use the parsed page cache in {PARSE_CACHE_PATH}",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="size limit of the parsed page cache",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=4096,
+        metavar="BLOCKS",
+        help="number of rendered blocks memoized across pages (0 = disabled)",
+    )
+    parser.add_argument(
+        "--persist-block-cache",
+        action="store_true",
+        help=f"keep memoized blocks between builds in {BLOCK_CACHE_PATH}",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip insignificant whitespace and attribute quotes from pages",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="also publish static files under content-hashed names, referenced "
+        "by the template and pages, with immutable caching rules in _headers",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help=f"write a sharded search index and its client to {SEARCH_PATH}",
+    )
+    parser.add_argument(
+        "--base-url",
+        metavar="URL",
+        help="absolute URL the site is served from; enables sitemap.xml and feed.xml",
+    )
+    parser.add_argument(
+        "--feed-size",
+        type=int,
+        default=20,
+        metavar="PAGES",
+        help="number of most recently modified pages listed in feed.xml",
+    )
+    parser.add_argument(
+        "--feed-author",
+        metavar="NAME",
+        help="author named in feed.xml (default: the home page's title)",
+    )
+    parser.add_argument(
+        "--gzip",
+        nargs="?",
+        type=int,
+        const=6,
+        choices=range(1, 10),
+        metavar="LEVEL",
+        help="write precompressed .gz siblings of text outputs (level 1-9, default 6)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=TRACE_PATH,
+        metavar="TRACE",
+        help=f"record per-page stage timings as a Chrome trace (default {TRACE_PATH})",
+    )
+    return parser.parse_args(argv)
 
-    print(f"❌ Deleting {PUBLIC_PATH} folder")
-    if not args.dry_run:
-        shutil.rmtree(PUBLIC_PATH)
 
-    print("📁 Discovering static files")
-    files = discover_files("./static")
-    if args.verbose:
-        for f in files:
-            print(f" -- discovered path: {f}")
+def site_title(default):
+    """Title of the home page, used as the feed title."""
+    index_path = os.path.join(CONTENT_PATH, "index.md")
+    if os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            return extract_title(f.read()) or default
+    return default
+
+
+def build(args):
+    """Run one build; returns False if any page failed to generate."""
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    profiler = BuildProfiler() if args.profile else None
+    cache = None
+    if not args.no_cache:
+        cache = ParseCache(PARSE_CACHE_PATH, max_bytes=args.cache_size * 2**20)
+
+    images = ImageIndex(STATIC_PATH, IMAGE_INDEX_PATH)
+    with profiler.span("image index") if profiler else nullcontext():
+        headers_read = images.scan()
+    if profiler:
+        profiler.count("image headers read", headers_read)
+    manifest = BuildManifest(MANIFEST_PATH)
+    links = LinkGraph(LINK_GRAPH_PATH)
+    search = SearchIndex(SEARCH_INDEX_PATH) if args.search else None
+    if not args.incremental:
+        manifest.clear()
+        links.clear()
+        if search is not None:
+            search.clear()
+        print(f"❌ Deleting {PUBLIC_PATH} folder")
+        if not args.dry_run and os.path.exists(PUBLIC_PATH):
+            shutil.rmtree(PUBLIC_PATH)
+
+    if search is not None and not manifest.search_indexed:
+        # pages rendered while the index was off have stale or no terms
+        search.clear()
+    manifest.search_indexed = search is not None
 
     print("⚡️ Creating directories")
     if not args.dry_run:
-        os.mkdir(PUBLIC_PATH)
+        os.makedirs(PUBLIC_PATH, exist_ok=True)
 
-    for path in files:
-        if path.startswith("./static"):
-            dest_path = path[len("./static") :].lstrip("/")
-            dest_path = os.path.join(PUBLIC_PATH, dest_path)
+    print("📁 Syncing static files")
+    with profiler.span("asset copy") if profiler else nullcontext():
+        copied, unchanged, removed_assets, synced = sync_tree(
+            STATIC_PATH,
+            PUBLIC_PATH,
+            previous=manifest.assets,
+            checksum=args.checksum,
+            mode=args.link,
+            dry_run=args.dry_run,
+        )
+    if profiler:
+        profiler.count("asset copied", len(copied))
+        profiler.count("asset unchanged", len(unchanged))
+    if args.verbose:
+        for path in copied:
+            print(f"💾 Copy {os.path.join(STATIC_PATH, path)}")
+        for path in removed_assets:
+            print(f"🗑️  Removing stale asset {os.path.join(PUBLIC_PATH, path)}")
+    print(
+        f"✅ {len(copied)} copied, {len(unchanged)} up to date, {len(removed_assets)} removed"
+    )
+    manifest.assets = synced
 
-            dest_dir = os.path.dirname(dest_path)
-            if args.verbose:
-                print(f" -- creating dir {dest_dir}")
+    assets = None
+    if args.fingerprint:
+        print("🔖 Fingerprinting static files")
+        with profiler.span("fingerprint") if profiler else nullcontext():
+            written, unchanged, removed_fp, state = fingerprint_tree(
+                STATIC_PATH,
+                PUBLIC_PATH,
+                previous=manifest.fingerprints,
+                mode=args.link,
+                dry_run=args.dry_run,
+            )
+        if args.verbose:
+            for path in written:
+                print(f"🔖 Write {os.path.join(PUBLIC_PATH, path)}")
+        print(
+            f"✅ {len(written)} written, {len(unchanged)} up to date, "
+            f"{len(removed_fp)} removed"
+        )
+        manifest.fingerprints = state
+        assets = AssetMap(state)
+        assets.write(PUBLIC_PATH, dry_run=args.dry_run)
 
-            if not args.dry_run:
-                if not os.path.exists(dest_dir):
-                    os.makedirs(dest_dir, exist_ok=True)
+    # persisted blocks embed image dimensions and asset URLs
+    block_cache_version = f"{PARSER_VERSION}-{images.fingerprint}"
+    if assets is not None:
+        block_cache_version += f"-{assets.fingerprint}"
 
-            if args.verbose:
-                print(f"💾 Copy from {path} to {dest_path}")
+    block_cache = None
+    if args.block_cache_size > 0:
+        block_cache = BlockCache(max_entries=args.block_cache_size)
+        if args.persist_block_cache:
+            block_cache.load(BLOCK_CACHE_PATH, block_cache_version)
 
-            if not args.dry_run:
-                shutil.copy2(path, dest_path)
+    sitemap_writer = feed_writer = nullcontext()
+    if args.base_url and not args.dry_run:
+        sitemap_writer = SitemapWriter(PUBLIC_PATH, args.base_url)
+        feed_writer = FeedWriter(
+            PUBLIC_PATH,
+            args.base_url,
+            site_title(args.base_url),
+            size=args.feed_size,
+            author=args.feed_author,
+        )
 
     print("📜 Generating pages...")
+    try:
+        with (
+            profiler.span("generate pages") if profiler else nullcontext(),
+            sitemap_writer as sitemap,
+            feed_writer as feed,
+        ):
+            generated, skipped, removed = generate_pages_recursive(
+                CONTENT_PATH,
+                TEMPLATE_PATH,
+                PUBLIC_PATH,
+                manifest=manifest,
+                dry_run=args.dry_run,
+                jobs=jobs,
+                profiler=profiler,
+                cache=cache,
+                io_workers=args.async_io,
+                block_cache=block_cache,
+                minify=args.minify,
+                images=images,
+                links=links,
+                search=search,
+                sitemap=sitemap,
+                feed=feed,
+                assets=assets,
+            )
+        print(
+            f"✅ {len(generated)} generated, {len(skipped)} up to date, {len(removed)} removed"
+        )
+
+        if sitemap is not None:
+            print(f"🗺️  {sitemap.count} pages listed in the sitemap and feed")
+
+        if search is not None:
+            with profiler.span("search index") if profiler else nullcontext():
+                written = search.write(SEARCH_PATH, dry_run=args.dry_run)
+            print(f"🔎 {len(written)} search index files updated")
+
+        published = {"/" + path.replace(os.sep, "/") for path in synced}
+        for page, url in links.broken_links(files=published):
+            print(f"🔗 Broken link in {os.path.join(CONTENT_PATH, page)}: {url}")
+
+        if args.gzip:
+            print("🗜️  Compressing outputs")
+            with profiler.span("compress") if profiler else nullcontext():
+                compressed, unchanged, not_worth, removed_gz, state = compress_tree(
+                    PUBLIC_PATH,
+                    previous=manifest.compressed,
+                    level=args.gzip,
+                    dry_run=args.dry_run,
+                )
+            if args.verbose:
+                for path in compressed:
+                    print(f"🗜️  Compress {os.path.join(PUBLIC_PATH, path)}")
+            print(
+                f"✅ {len(compressed)} compressed, {len(unchanged)} up to date, "
+                f"{len(not_worth)} not worth it, {len(removed_gz)} removed"
+            )
+            manifest.compressed = state
+    except BuildError as e:
+        # keep the pages that did render so the next incremental run skips them
+        if not args.dry_run:
+            manifest.save()
+            links.save()
+            if search is not None:
+                search.save()
+        print(f"💥 {e}", file=sys.stderr)
+        print(e.report(), file=sys.stderr)
+        return False
+    finally:
+        if cache is not None and not args.dry_run:
+            cache.evict()
+        if block_cache is not None:
+            if args.verbose:
+                print(
+                    f"🧱 Block cache: {block_cache.hits} hits, {block_cache.misses} "
+                    f"misses ({block_cache.hit_rate():.0%})"
+                )
+            if args.persist_block_cache and not args.dry_run:
+                block_cache.save(BLOCK_CACHE_PATH, block_cache_version)
+        if profiler:
+            profiler.write_trace(args.profile)
+            print(profiler.summary())
+            print(f"🧭 Trace written to {args.profile}")
+
     if not args.dry_run:
-        generate_pages_recursive("./content", "template.html", "./public")
+        manifest.save()
+        images.save()
+        links.save()
+        if search is not None:
+            search.save()
+    return True
+
+
+def watch(args):
+    server = LiveReloadServer(PUBLIC_PATH, args.port)
+    server.start()
+    print(f"👀 Watching for changes, serving on http://localhost:{args.port}")
+
+    # everything after the first build only touches what changed
+    args.incremental = True
+    watcher = PollingWatcher([CONTENT_PATH, STATIC_PATH, TEMPLATE_PATH])
+    try:
+        for changed in watcher.changes():
+            for path in sorted(changed)[:10]:
+                print(f" -- changed: {path}")
+            if build(args):
+                server.reload()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+def serve(args):
+    directory = PUBLIC_PATH
+    renderer = None
+    if args.on_demand:
+        # static files come straight from their source folder
+        directory = STATIC_PATH
+        renderer = PageRenderer(
+            CONTENT_PATH, TEMPLATE_PATH, max_pages=args.page_cache, minify=args.minify
+        )
+
+    server = PreviewServer(
+        directory,
+        args.port,
+        threads=args.threads,
+        cache_bytes=args.file_cache * 2**20,
+        renderer=renderer,
+    )
+    server.start()
+    print(f"🌍 Serving on http://localhost:{args.port}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+def main():
+    args = parse_args()
+    if args.on_demand:
+        serve(args)
+        return
+
+    ok = build(args)
+
+    if args.watch:
+        watch(args)
+    elif args.serve:
+        serve(args)
+    elif not ok:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+# mkstemp creates files readable by their owner only; published files get
+# the permissions a plain open() would have given them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def hash_file(path):
+    """Return the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state(path, version):
+    """Return the dict saved at ``path`` by ``save_state``, or None.
+
+    A missing or corrupt file, or one saved with another ``version``,
+    reads as None: losing cached state only costs recomputing it.
+    """
+    if path is None or not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data
+
+
+def save_state(path, version, data):
+    """Save the dict ``data`` to ``path`` as JSON, tagged with ``version``."""
+    write_atomic(path, json.dumps({"version": version, **data}))
+
+
+def write_atomic(path, text):
+    """Write ``text`` to ``path`` through a temporary file of its own, so
+    readers, interrupted builds and concurrent writers (a build and the
+    watcher) never see or clobber a partial file."""
+    with open_atomic(path) as f:
+        f.write(text)
+
+
+@contextlib.contextmanager
+def open_atomic(path, mode="w"):
+    """Open a temporary file that replaces ``path`` once closed.
+
+    The file is created next to ``path`` and only renamed over it when the
+    block exits cleanly; on an exception it is removed and ``path`` keeps
+    its previous contents.
+    """
+    dir = os.path.dirname(path)
+    if dir:
+        os.makedirs(dir, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=dir or ".", prefix=".tmp-")
+    try:
+        os.fchmod(fd, 0o666 & ~_UMASK)
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class BuildManifest:
+    """Persisted record of which source produced which output.
+
+    Each entry is keyed by the source path relative to the content
+    directory and stores the source hash, the template hash it was rendered
+    with, the output path and the source's size/mtime. The size/mtime pair
+    lets unchanged sources be recognised with a single ``stat`` instead of
+    re-hashing their contents.
+
+    ``assets`` holds the relative paths of the static files copied by the
+    last build, so assets removed from the source tree can be pruned.
+    ``compressed`` holds the per-file state of the gzip stage and
+    ``fingerprints`` that of the asset fingerprinting stage.
+    ``search_indexed`` tells whether the last build kept the search index
+    up to date; pages it rendered without doing so have stale terms.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.assets = set()
+        self.compressed = {}
+        self.fingerprints = {}
+        self.search_indexed = False
+        self.seen = set()
+        self.load()
+
+    def load(self):
+        # a missing or corrupt manifest only costs us a full rebuild
+        data = load_state(self.path, self.VERSION)
+        if data is not None:
+            self.entries = data.get("entries", {})
+            self.assets = set(data.get("assets", []))
+            self.compressed = data.get("compressed", {})
+            self.fingerprints = data.get("fingerprints", {})
+            self.search_indexed = data.get("search_indexed", False)
+
+    def save(self):
+        save_state(
+            self.path,
+            self.VERSION,
+            {
+                "entries": self.entries,
+                "assets": sorted(self.assets),
+                "compressed": self.compressed,
+                "fingerprints": self.fingerprints,
+                "search_indexed": self.search_indexed,
+            },
+        )
+
+    def clear(self):
+        self.entries = {}
+        self.assets = set()
+        self.compressed = {}
+        self.fingerprints = {}
+        self.search_indexed = False
+        self.seen = set()
+
+    def outputs(self):
+        return {entry["output"] for entry in self.entries.values()}
+
+    def is_fresh(self, key, source_path, template_hash, dest_path, stat=None):
+        """Check whether ``dest_path`` is up to date for ``source_path``.
+
+        ``stat`` may be passed when the caller already has the source's
+        stat result. Marks ``key`` as seen so that ``prune`` keeps it.
+        """
+        self.seen.add(key)
+
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+
+        if entry["template_hash"] != template_hash or entry["output"] != dest_path:
+            return False
+
+        if not os.path.exists(dest_path):
+            return False
+
+        st = stat or os.stat(source_path)
+        if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return True
+
+        if entry["source_hash"] != hash_file(source_path):
+            return False
+
+        # content is unchanged (e.g. the file was touched), refresh the stat
+        entry["size"] = st.st_size
+        entry["mtime_ns"] = st.st_mtime_ns
+        return True
+
+    def record(self, key, source_path, template_hash, dest_path):
+        st = os.stat(source_path)
+        self.seen.add(key)
+        self.entries[key] = {
+            "source_hash": hash_file(source_path),
+            "template_hash": template_hash,
+            "output": dest_path,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+
+    def prune(self, root, dry_run=False):
+        """Drop entries whose source was not seen and delete their outputs.
+
+        Directories under the output ``root`` left empty are removed too.
+        Returns the list of removed output paths.
+        """
+        # imported here because file_manage imports this module
+        from file_manage import _remove_file
+
+        removed = []
+        for key in sorted(set(self.entries) - self.seen):
+            output = self.entries.pop(key)["output"]
+            if not dry_run:
+                _remove_file(output, root)
+            removed.append(output)
+        return removed
@@ -0,0 +1,93 @@
+import re
+
+# Whitespace inside these elements is significant and is never touched
+PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+
+# Whitespace next to these tags doesn't render, so it can be dropped
+# entirely; elsewhere a run of whitespace is collapsed to one space
+BLOCK_TAGS = frozenset(
+    """
+    !doctype html head body title meta link base script style noscript
+    div p ul ol li dl dt dd h1 h2 h3 h4 h5 h6 pre blockquote header footer
+    nav main section article aside figure figcaption table thead tbody
+    tfoot tr td th form fieldset hr
+    """.split()
+)
+
+# HTML's ASCII whitespace only: \s would also take non-breaking and other
+# Unicode spaces, which render and must survive minification
+HTML_WHITESPACE = " \t\n\r\f"
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+TOKEN_PATTERN = re.compile(r"<!--.*?-->|<[^>]*>", re.DOTALL)
+TAG_NAME_PATTERN = re.compile(r"</?\s*([!\w-]+)")
+# an unquoted value running into "/>" would swallow the slash
+QUOTED_ATTR_PATTERN = re.compile(r"""(\s[^\s"'=<>/]+)="([^\s"'=<>`]+)"(?!/)""")
+UNQUOTED_VALUE_PATTERN = re.compile(r"""[^\s"'=<>`]+""")
+
+
+def collapse_whitespace(text):
+    return WHITESPACE_PATTERN.sub(" ", text)
+
+
+def format_attribute(name, value, minify=False):
+    """Render ``name="value"``, dropping the quotes when minifying allows it."""
+    value = str(value)
+    if minify and UNQUOTED_VALUE_PATTERN.fullmatch(value):
+        return f"{name}={value}"
+    return f'{name}="{value}"'
+
+
+def _tag_name(tag):
+    match = TAG_NAME_PATTERN.match(tag)
+    return match.group(1).lower() if match else None
+
+
+def minify_html(text, strip_start=True, strip_end=True):
+    """Strip insignificant whitespace and attribute quotes from HTML text.
+
+    Meant for template literals, which are minified once when the template
+    is compiled. Whitespace is dropped next to block-level tags and
+    collapsed to a single space elsewhere; the contents of ``PRESERVE_TAGS``
+    are copied verbatim. ``strip_start`` and ``strip_end`` say whether the
+    text's edges are the edges of the document rather than of a fragment
+    that continues with a slot value.
+    """
+    out = []
+    pos = 0
+    # whether the previous token allows dropping the following whitespace
+    after_block = strip_start
+
+    while pos < len(text):
+        match = TOKEN_PATTERN.search(text, pos)
+        end = match.start() if match else len(text)
+
+        if end > pos:
+            chunk = collapse_whitespace(text[pos:end])
+            if after_block:
+                chunk = chunk.lstrip(HTML_WHITESPACE)
+            if match is not None and _tag_name(match.group(0)) in BLOCK_TAGS:
+                chunk = chunk.rstrip(HTML_WHITESPACE)
+            elif match is None and strip_end:
+                chunk = chunk.rstrip(HTML_WHITESPACE)
+            out.append(chunk)
+
+        if match is None:
+            break
+
+        token = match.group(0)
+        pos = match.end()
+        if token.startswith("<!--"):
+            out.append(token)
+            continue
+
+        name = _tag_name(token)
+        out.append(QUOTED_ATTR_PATTERN.sub(r"\1=\2", token))
+        after_block = name in BLOCK_TAGS
+
+        if name in PRESERVE_TAGS and not token.startswith("</"):
+            close = re.compile(rf"</\s*{name}\s*>", re.IGNORECASE).search(text, pos)
+            raw_end = close.start() if close else len(text)
+            out.append(text[pos:raw_end])
+            pos = raw_end
+
+    return "".join(out)
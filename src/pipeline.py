@@ -0,0 +1,253 @@
+import asyncio
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import generator
+from generator import STREAM_THRESHOLD, block_stats, generate_page, render_page
+from manifest import open_atomic
+
+
+def _render(md_content, settings=None):
+    """Return (page, cache status, block cache stats, extracted, pid) for a page.
+
+    ``pid`` is that of the process that rendered the page, whose copy of
+    the block cache the stats refer to.
+    """
+    if settings is None:
+        settings = generator._worker_settings
+
+    block_cache = settings["block_cache"]
+    before = block_stats(block_cache)
+    extracted = dict(settings["extract"]) if settings["extract"] else None
+    page, status = render_page(
+        md_content,
+        settings["template"],
+        settings["cache"],
+        block_cache,
+        settings["images"],
+        settings["assets"],
+        extracted,
+    )
+    return page, status, block_stats(block_cache, before), extracted, os.getpid()
+
+
+def _stream(args, settings=None):
+    """Generate a page too large to read whole straight to its destination.
+
+    Returns (cache status, block cache stats, extracted, pid) like ``_render``.
+    """
+    if settings is None:
+        settings = generator._worker_settings
+
+    _, md_path, dest_path = args
+    block_cache = settings["block_cache"]
+    before = block_stats(block_cache)
+    extracted = dict(settings["extract"]) if settings["extract"] else None
+    status = generate_page(
+        md_path,
+        settings["template"],
+        dest_path,
+        cache=settings["cache"],
+        block_cache=block_cache,
+        images=settings["images"],
+        extract=extracted,
+        assets=settings["assets"],
+        stream_threshold=0,
+    )
+    return status, block_stats(block_cache, before), extracted, os.getpid()
+
+
+def _read(path):
+    with open(path, "r") as f:
+        return f.read()
+
+
+def _write(path, text):
+    with open_atomic(path) as f:
+        f.write(text)
+
+
+def run_pipeline(page_args, settings, jobs=1, io_workers=8, queue_size=64):
+    """Render pages with reads and writes overlapped with rendering.
+
+    Up to ``io_workers`` reads and writes run at once on a thread pool while
+    pages are rendered on a thread of their own, or on a pool of ``jobs``
+    processes.
+    The stages are connected by queues holding at most ``queue_size``
+    pages each, so a slow stage applies backpressure and memory stays
+    flat regardless of site size.
+
+    ``page_args`` are (rel_path, md_path, dest_path) tuples, consumed
+    lazily. (args, result) pairs are yielded in input order as each page
+    finishes, with results shaped like those of the process pool path.
+    The event loop runs while the generator waits for the next page.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        yield from _run(loop, page_args, settings, jobs, io_workers, queue_size)
+    finally:
+        loop.close()
+
+
+def _run(loop, page_args, settings, jobs, io_workers, queue_size):
+    to_render = asyncio.Queue(queue_size)
+    to_write = asyncio.Queue(queue_size)
+    # every page in flight is on here, in input order, with a future set
+    # once it is done; bounding it bounds the stages between
+    in_order = asyncio.Queue(2 * queue_size)
+    profile = settings["profile"]
+
+    io_pool = ThreadPoolExecutor(max_workers=io_workers)
+    if jobs > 1:
+        cpu_pool = ProcessPoolExecutor(
+            max_workers=jobs, initializer=generator._init_worker, initargs=(settings,)
+        )
+        # workers have the settings installed by the initializer
+        render_args = ()
+    else:
+        # off the event loop thread, so reads and writes keep going
+        cpu_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+        render_args = (settings,)
+    renderers = max(jobs, 1)
+    # reads in flight at once
+    reading = asyncio.Semaphore(io_workers)
+
+    def lap(result, stage, start):
+        if profile:
+            result["timings"].append((stage, start, time.perf_counter() - start))
+
+    async def read(args, result, done):
+        start = time.perf_counter()
+        try:
+            if os.path.getsize(args[1]) >= STREAM_THRESHOLD:
+                # rendered and written in one go, without reading it whole
+                md_content = None
+            else:
+                md_content = await loop.run_in_executor(io_pool, _read, args[1])
+                lap(result, "read", start)
+        except Exception:
+            result["error"] = traceback.format_exc()
+            done.set_result(None)
+            return
+        finally:
+            reading.release()
+        await to_render.put((args, result, done, md_content))
+
+    async def reader():
+        reads = set()
+        try:
+            for args in page_args:
+                result = {
+                    "error": None,
+                    "pid": os.getpid(),
+                    "timings": [] if profile else None,
+                    "cache": None,
+                    "blocks": None,
+                    "extracted": None,
+                }
+                done = loop.create_future()
+                await in_order.put((args, result, done))
+
+                # pages may reach the renderers out of order; in_order
+                # restores it for the results
+                await reading.acquire()
+                task = asyncio.create_task(read(args, result, done))
+                reads.add(task)
+                task.add_done_callback(reads.discard)
+
+            await in_order.put(None)
+            await asyncio.gather(*reads)
+        finally:
+            for task in reads:
+                task.cancel()
+        for _ in range(renderers):
+            await to_render.put(None)
+
+    async def renderer():
+        while (item := await to_render.get()) is not None:
+            args, result, done, md_content = item
+            start = time.perf_counter()
+            if md_content is None:
+                try:
+                    streamed = await loop.run_in_executor(
+                        cpu_pool, _stream, args, *render_args
+                    )
+                except Exception:
+                    result["error"] = traceback.format_exc()
+                    done.set_result(None)
+                    continue
+                (
+                    result["cache"],
+                    result["blocks"],
+                    result["extracted"],
+                    result["pid"],
+                ) = streamed
+                lap(result, "stream", start)
+                done.set_result(None)
+                continue
+
+            try:
+                page, status, blocks, extracted, pid = await loop.run_in_executor(
+                    cpu_pool, _render, md_content, *render_args
+                )
+            except Exception:
+                result["error"] = traceback.format_exc()
+                done.set_result(None)
+                continue
+            result["cache"] = status
+            result["blocks"] = blocks
+            result["extracted"] = extracted
+            result["pid"] = pid
+            lap(result, "render", start)
+            await to_write.put((args, result, done, page))
+
+    async def writer():
+        while (item := await to_write.get()) is not None:
+            (_, md_path, dest_path), result, done, page = item
+            print(f"📜 Generating from {md_path} to {dest_path}")
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(io_pool, _write, dest_path, page)
+            except Exception:
+                result["error"] = traceback.format_exc()
+            else:
+                lap(result, "write", start)
+            done.set_result(None)
+
+    async def stages():
+        writers = [asyncio.create_task(writer()) for _ in range(io_workers)]
+        try:
+            await asyncio.gather(reader(), *(renderer() for _ in range(renderers)))
+            for _ in writers:
+                await to_write.put(None)
+            await asyncio.gather(*writers)
+        finally:
+            for task in writers:
+                task.cancel()
+
+    def wait(awaitable):
+        """Run the loop until ``awaitable`` is done, or a stage fails."""
+        future = asyncio.ensure_future(awaitable, loop=loop)
+        loop.run_until_complete(
+            asyncio.wait([future, running], return_when=asyncio.FIRST_COMPLETED)
+        )
+        if not future.done():
+            future.cancel()
+            running.result()
+        return future.result()
+
+    running = loop.create_task(stages())
+    try:
+        while (item := wait(in_order.get())) is not None:
+            args, result, done = item
+            wait(done)
+            yield args, result
+        loop.run_until_complete(running)
+    finally:
+        if not running.done():
+            running.cancel()
+            loop.run_until_complete(asyncio.wait([running]))
+        io_pool.shutdown()
+        cpu_pool.shutdown(cancel_futures=True)
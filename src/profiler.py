@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class StageTimer:
+    """Record consecutive stages of one unit of work as (stage, start, seconds).
+
+    Start times come from ``time.perf_counter``, which is system-wide
+    monotonic on Linux, so timings taken in pool workers line up with the
+    parent's.
+    """
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings.append((stage, self.last, now - self.last))
+        self.last = now
+
+
+class BuildProfiler:
+    """Collect build timings and counters and export them as a Chrome trace.
+
+    The trace can be loaded in ``chrome://tracing`` or Perfetto. Each page
+    gets one complete ("X") event per pipeline stage, grouped by the process
+    that rendered it.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.counters = {}
+        self.pages = []
+        self.lock = threading.Lock()
+
+    def _us(self, seconds):
+        return round(seconds * 1e6, 3)
+
+    def _event(self, name, cat, start, duration, pid=None, tid=None, args=None):
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": self._us(start - self.origin),
+            "dur": self._us(duration),
+            "pid": pid if pid is not None else os.getpid(),
+            "tid": tid if tid is not None else threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, cat="build", **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._event(name, cat, start, time.perf_counter() - start, args=args)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_page(self, path, timings, pid=None):
+        """Record the stage timings of one rendered page."""
+        if not timings:
+            return
+
+        for stage, start, duration in timings:
+            self._event(
+                stage, "page", start, duration, pid=pid, tid=pid, args={"page": path}
+            )
+
+        total = sum(duration for _, _, duration in timings)
+        with self.lock:
+            self.pages.append((total, path, timings))
+
+    def peak_memory(self):
+        """Peak resident set size in bytes for this process and its workers."""
+        if resource is None:
+            return None
+
+        # ru_maxrss is in kilobytes on Linux
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return max(own, children) * 1024
+
+    def slowest_pages(self, limit=10):
+        return sorted(self.pages, key=lambda page: page[0], reverse=True)[:limit]
+
+    def stage_totals(self):
+        totals = {}
+        for _, _, timings in self.pages:
+            for stage, _, duration in timings:
+                totals[stage] = totals.get(stage, 0.0) + duration
+        return totals
+
+    def write_trace(self, path):
+        now = self._us(time.perf_counter() - self.origin)
+        events = list(self.events)
+        for name, value in sorted(self.counters.items()):
+            events.append(
+                {
+                    "name": name,
+                    "ph": "C",
+                    "ts": now,
+                    "pid": os.getpid(),
+                    "args": {"value": value},
+                }
+            )
+
+        dir = os.path.dirname(path)
+        if dir:
+            os.makedirs(dir, exist_ok=True)
+
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": events,
+                    "displayTimeUnit": "ms",
+                    "otherData": {
+                        "counters": self.counters,
+                        "peak_memory_bytes": self.peak_memory(),
+                    },
+                },
+                f,
+            )
+
+    def summary(self, limit=10):
+        lines = ["⏱️  Build profile"]
+        for stage, seconds in sorted(
+            self.stage_totals().items(), key=lambda item: item[1], reverse=True
+        ):
+            lines.append(f" -- {stage:<16} {seconds * 1000:10.1f} ms")
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f" -- {name:<16} {value:10}")
+
+        peak = self.peak_memory()
+        if peak is not None:
+            lines.append(f" -- peak memory    {peak / 2**20:10.1f} MB")
+
+        if self.pages:
+            lines.append(f"🐢 Slowest {min(limit, len(self.pages))} pages")
+            for total, path, _ in self.slowest_pages(limit):
+                lines.append(f" -- {total * 1000:8.1f} ms {path}")
+        return "\n".join(lines)
@@ -0,0 +1,257 @@
+import json
+import os
+import re
+from collections import Counter
+
+from blocks import BlockType, scan_blocks
+from manifest import load_state, save_state
+from textnode import TextType
+from utils import extract_title, text_to_textnodes
+
+TERM_PATTERN = re.compile(r"\w+")
+MIN_TERM_LENGTH = 2
+STOP_WORDS = frozenset(
+    """
+    an and are as at be but by for from has have he her his in is it its
+    of on or she that the their they this to was were which with you
+    """.split()
+)
+
+# Loaded by pages as /search/search.js. Every query term is looked up in
+# the shard named by its first two characters, the last one as a prefix
+# so results show up while typing; pages must contain all terms.
+SEARCH_SCRIPT = """\
+(() => {
+  const base = new URL(".", document.currentScript.src);
+  const cache = new Map();
+  const fetchJson = (name) => {
+    if (!cache.has(name)) {
+      cache.set(name, fetch(new URL(name, base)).then((r) => (r.ok ? r.json() : {})));
+    }
+    return cache.get(name);
+  };
+  const shardName = (term) => {
+    const prefix = Array.from(term).slice(0, 2).join("");
+    if (/^[\\x00-\\x7f]*$/.test(prefix)) return prefix;
+    return Array.from(new TextEncoder().encode(prefix), (b) => b.toString(16).padStart(2, "0")).join("");
+  };
+  window.siteSearch = async (query) => {
+    const terms = (query.toLowerCase().match(/[\\p{L}\\p{N}_]+/gu) || []).filter((t) => t.length >= 2);
+    if (!terms.length) return [];
+    const docs = await fetchJson("docs.json");
+    let scores = null;
+    for (const [i, term] of terms.entries()) {
+      const shard = await fetchJson(shardName(term) + ".json");
+      const found = new Map();
+      for (const [key, postings] of Object.entries(shard)) {
+        if (key !== term && !(i === terms.length - 1 && key.startsWith(term))) continue;
+        for (let j = 0; j < postings.length; j += 2) {
+          found.set(postings[j], (found.get(postings[j]) || 0) + postings[j + 1]);
+        }
+      }
+      if (scores) {
+        for (const [doc, score] of scores) {
+          if (found.has(doc)) found.set(doc, found.get(doc) + score);
+        }
+        for (const doc of found.keys()) if (!scores.has(doc)) found.delete(doc);
+      }
+      scores = found;
+    }
+    return [...scores]
+      .sort((a, b) => b[1] - a[1])
+      .map(([doc, score]) => ({ url: docs[doc][0], title: docs[doc][1], score }));
+  };
+})();
+"""
+
+
+def tokenize(text):
+    return [
+        term
+        for term in TERM_PATTERN.findall(text.lower())
+        if len(term) >= MIN_TERM_LENGTH and term not in STOP_WORDS
+    ]
+
+
+def page_terms(md_content, body=None):
+    """Return {"title", "terms"} for a page, ``terms`` mapping term -> count.
+
+    Terms come from the inline text nodes of every block; code blocks and
+    code spans are skipped, link labels and image alt texts are included.
+    Given the page's rendered node tree as ``body``, the text is read from
+    it instead of parsing the markdown again.
+    """
+    counts = Counter()
+    if body is not None:
+        for text in _node_texts(body):
+            counts.update(tokenize(text))
+    else:
+        for block_type, lines in scan_blocks(md_content):
+            if block_type is BlockType.CODE:
+                continue
+            for node in text_to_textnodes(" ".join(lines)):
+                if node.text_type is not TextType.CODE:
+                    counts.update(tokenize(node.text))
+    return {"title": extract_title(md_content) or "", "terms": dict(counts)}
+
+
+def _node_texts(node):
+    # code blocks render as <pre><code>, code spans as <code>
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag == "code":
+            continue
+        if node.children:
+            stack.extend(node.children)
+        elif node.tag == "img":
+            yield node.props["alt"]
+        elif node.value:
+            yield node.value
+
+
+def shard_name(term):
+    """Name of the shard holding ``term``: its first two characters.
+
+    Non-ASCII prefixes are hex encoded to keep file names and URLs plain.
+    """
+    prefix = term[:2]
+    if prefix.isascii():
+        return prefix
+    return prefix.encode("utf-8").hex()
+
+
+class SearchIndex:
+    """Inverted index of the site's pages, written as sharded JSON files.
+
+    ``docs.json`` lists [url, title] by document id and ``<shard>.json``
+    maps each term to a flat [doc, count, doc, count, ...] posting list.
+    The per-page term counts are persisted, so a build only tokenizes the
+    pages it renders and rewrites just the shards whose terms changed.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self.clear()
+        self.load()
+
+    def load(self):
+        data = load_state(self.path, self.VERSION)
+        if data is not None:
+            self.pages = data["pages"]
+            self.next_id = data["next_id"]
+            self.free_ids = data["free_ids"]
+            # shards of pages recorded by a build that failed before writing
+            self.dirty_shards = set(data["dirty_shards"])
+            self.docs_dirty = data["docs_dirty"]
+
+    def save(self):
+        save_state(
+            self.path,
+            self.VERSION,
+            {
+                "pages": self.pages,
+                "next_id": self.next_id,
+                "free_ids": self.free_ids,
+                "dirty_shards": sorted(self.dirty_shards),
+                "docs_dirty": self.docs_dirty,
+            },
+        )
+
+    def clear(self):
+        self.pages = {}
+        self.next_id = 0
+        self.free_ids = []
+        self.dirty_shards = set()
+        self.docs_dirty = True
+
+    def update(self, rel_path, url, data):
+        """Record the ``page_terms`` of a page published at ``url``."""
+        old = self.pages.get(rel_path)
+        if old is None:
+            doc_id = self.free_ids.pop() if self.free_ids else self._new_id()
+            old_terms = {}
+        else:
+            doc_id = old["id"]
+            old_terms = old["terms"]
+
+        terms = data["terms"]
+        for term in old_terms.keys() | terms.keys():
+            if old_terms.get(term) != terms.get(term):
+                self.dirty_shards.add(shard_name(term))
+
+        if old is None or old["url"] != url or old["title"] != data["title"]:
+            self.docs_dirty = True
+        self.pages[rel_path] = {
+            "id": doc_id,
+            "url": url,
+            "title": data["title"],
+            "terms": terms,
+        }
+
+    def _new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def retain(self, rel_paths):
+        """Drop pages that are no longer in the content tree."""
+        for rel_path in set(self.pages) - set(rel_paths):
+            page = self.pages.pop(rel_path)
+            self.dirty_shards.update(shard_name(term) for term in page["terms"])
+            self.free_ids.append(page["id"])
+            self.docs_dirty = True
+
+    def write(self, out_dir, dry_run=False):
+        """Write the changed (or missing) index files into ``out_dir``.
+
+        Returns the names of the files written or removed.
+        """
+        shards = {shard_name(term) for page in self.pages.values() for term in page["terms"]}
+        stale = {
+            shard
+            for shard in shards
+            if not os.path.exists(os.path.join(out_dir, f"{shard}.json"))
+        }
+        to_write = (self.dirty_shards & shards) | stale
+        to_remove = self.dirty_shards - shards
+
+        postings = {shard: {} for shard in to_write}
+        for page in sorted(self.pages.values(), key=lambda page: page["id"]):
+            for term, count in page["terms"].items():
+                shard = postings.get(shard_name(term))
+                if shard is not None:
+                    shard.setdefault(term, []).extend((page["id"], count))
+
+        files = {}
+        for shard, terms in postings.items():
+            files[f"{shard}.json"] = dict(sorted(terms.items()))
+        if self.docs_dirty or not os.path.exists(os.path.join(out_dir, "docs.json")):
+            docs = [None] * self.next_id
+            for page in self.pages.values():
+                docs[page["id"]] = [page["url"], page["title"]]
+            files["docs.json"] = docs
+
+        changed = sorted(files) + sorted(f"{shard}.json" for shard in to_remove)
+        script_path = os.path.join(out_dir, "search.js")
+        if not os.path.exists(script_path):
+            changed.append("search.js")
+        if dry_run:
+            return changed
+
+        os.makedirs(out_dir, exist_ok=True)
+        for name, value in files.items():
+            with open(os.path.join(out_dir, name), "w") as f:
+                json.dump(value, f, separators=(",", ":"), ensure_ascii=False)
+        for shard in to_remove:
+            path = os.path.join(out_dir, f"{shard}.json")
+            if os.path.exists(path):
+                os.remove(path)
+        if not os.path.exists(script_path):
+            with open(script_path, "w") as f:
+                f.write(SEARCH_SCRIPT)
+
+        self.dirty_shards = set()
+        self.docs_dirty = False
+        return changed
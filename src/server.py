@@ -0,0 +1,655 @@
+import email.utils
+import functools
+import io
+import os
+import posixpath
+import selectors
+import socket
+import threading
+import time
+import traceback
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import HTTPServer, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from generator import render_page
+from template import Template
+
+RELOAD_PATH = "/__livereload"
+
+# Injected before </body> of every HTML page served in watch mode
+RELOAD_SCRIPT = (
+    "<script>"
+    f'new EventSource("{RELOAD_PATH}").onmessage = () => location.reload();'
+    "</script>"
+)
+
+
+class FileCache:
+    """Thread-safe LRU of small file contents, validated by size and mtime.
+
+    Each lookup passes the file's current ``os.stat`` result, so a file
+    rewritten by a rebuild is never served stale.
+    """
+
+    def __init__(self, max_bytes=32 * 2**20, max_file_size=256 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, path, st):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                return None
+            size, mtime_ns, data = entry
+            if size != st.st_size or mtime_ns != st.st_mtime_ns:
+                return None
+            self.entries.move_to_end(path)
+            return data
+
+    def put(self, path, st, data):
+        if len(data) > self.max_file_size:
+            return
+
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.size -= len(old[2])
+            self.entries[path] = (st.st_size, st.st_mtime_ns, data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def etag(st):
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+class StaticHandler(SimpleHTTPRequestHandler):
+    """Serve files over keep-alive connections with conditional requests.
+
+    Every file response carries an ``ETag`` (from size and mtime) and a
+    ``Last-Modified`` header, and a matching ``If-None-Match`` or
+    ``If-Modified-Since`` gets an empty ``304``. Files smaller than
+    ``sendfile_threshold`` are served from the shared ``file_cache`` when
+    there is one; everything else goes out with ``os.sendfile``.
+
+    On a server that can ``park`` connections, an idle keep-alive
+    connection is handed back to the server between requests instead of
+    holding a worker thread.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # a request stalled mid-read gives its worker back after this long
+    timeout = 30
+    sendfile_threshold = 64 * 1024
+    file_cache = None
+
+    parked = False
+
+    def handle(self):
+        self.parked = False
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if hasattr(self.server, "park") and not self.request_pending():
+                # the server calls resume once the next request arrives
+                self.parked = True
+                return
+            self.handle_one_request()
+
+    def resume(self):
+        """Handle the next requests of a parked connection."""
+        try:
+            self.handle()
+        finally:
+            self.finish()
+
+    def finish(self):
+        if not self.parked:
+            super().finish()
+
+    def request_pending(self):
+        """Whether the next request has started arriving, without blocking."""
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            # let the next read report it
+            return True
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def send_head(self):
+        url_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, "index.html")
+            if not url_path.endswith("/") or not os.path.isfile(index):
+                # trailing-slash redirects and directory listings
+                return super().send_head()
+            path = index
+
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            st = os.fstat(f.fileno())
+            tag = etag(st)
+            if self.not_modified(tag, st):
+                f.close()
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", tag)
+                self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+                self.end_headers()
+                return None
+
+            body = f
+            length = st.st_size
+            if self.file_cache is not None and st.st_size < self.sendfile_threshold:
+                data = self.file_cache.get(path, st)
+                if data is None:
+                    data = f.read()
+                    self.file_cache.put(path, st, data)
+                f.close()
+                body = io.BytesIO(data)
+                length = len(data)
+
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Length", str(length))
+            self.send_header("ETag", tag)
+            self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+            # always revalidate, which is cheap with the ETag
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return body
+        except Exception:
+            f.close()
+            raise
+
+    def not_modified(self, tag, st):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+            return "*" in tags or tag in tags
+
+        # rendered pages have no single mtime and only compare ETags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None or st is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if since is None or since.tzinfo is None:
+            return False
+        # HTTP dates have one-second resolution
+        return int(st.st_mtime) <= since.timestamp()
+
+    def copyfile(self, source, outputfile):
+        if isinstance(source, io.BufferedReader):
+            # the headers are already on the socket, so the kernel can send
+            # the file straight from the page cache
+            outputfile.flush()
+            self.connection.sendfile(source)
+        else:
+            super().copyfile(source, outputfile)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PageRenderer:
+    """Render markdown pages on request, keeping an LRU of the results.
+
+    A request path is mapped to its source under ``content_dir`` the same
+    way a build maps sources to outputs, so ``/blog/post/`` and
+    ``/blog/post/index.html`` both come from ``blog/post/index.md``. Each
+    cached page remembers the stat of its source and the template's mtime
+    and is re-rendered when either changes.
+    """
+
+    def __init__(self, content_dir, template_path, max_pages=256, minify=False):
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.max_pages = max_pages
+        self.minify = minify
+        self.template = None
+        self.template_mtime_ns = None
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def resolve(self, url_path):
+        """Map a URL path to ("page", source) or ("redirect", location).
+
+        Returns None when no markdown source matches.
+        """
+        url_path = urllib.parse.unquote(url_path.split("?", 1)[0].split("#", 1)[0])
+        # drop empty, "." and ".." segments so requests can't leave the root
+        parts = [
+            part
+            for part in posixpath.normpath(url_path).split("/")
+            if part and part not in (".", "..")
+        ]
+        base = os.path.join(self.content_dir, *parts)
+
+        if url_path.endswith("/"):
+            source = os.path.join(base, "index.md")
+        elif url_path.endswith(".html"):
+            source = base[: -len(".html")] + ".md"
+        else:
+            source = base + ".md"
+            if not os.path.isfile(source) and os.path.isfile(
+                os.path.join(base, "index.md")
+            ):
+                # relative links in the page need the trailing slash
+                return "redirect", url_path + "/"
+
+        if os.path.isfile(source):
+            return "page", source
+        return None
+
+    def _load_template(self):
+        mtime_ns = os.stat(self.template_path).st_mtime_ns
+        with self.lock:
+            if mtime_ns != self.template_mtime_ns:
+                self.template = Template.from_file(
+                    self.template_path, minify=self.minify
+                )
+                self.template_mtime_ns = mtime_ns
+            return self.template, mtime_ns
+
+    def render(self, source):
+        """Return (page bytes, ETag) for a markdown source."""
+        template, template_mtime_ns = self._load_template()
+        st = os.stat(source)
+        version = (st.st_size, st.st_mtime_ns, template_mtime_ns)
+
+        with self.lock:
+            cached = self.pages.get(source)
+            if cached is not None and cached[0] == version:
+                self.pages.move_to_end(source)
+                return cached[1], cached[2]
+
+        with open(source, "r") as f:
+            md_content = f.read()
+        page, _ = render_page(md_content, template)
+        body = page.encode("utf-8")
+        tag = f'"{st.st_size:x}-{st.st_mtime_ns:x}-{template_mtime_ns:x}"'
+
+        with self.lock:
+            self.pages[source] = (version, body, tag)
+            self.pages.move_to_end(source)
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        return body, tag
+
+
+class OnDemandHandler(StaticHandler):
+    """Render pages from markdown when requested; serve other files as is.
+
+    Paths that don't map to a markdown source fall through to static file
+    serving from the handler's directory.
+    """
+
+    renderer = None
+
+    def send_head(self):
+        resolved = self.renderer.resolve(self.path)
+        if resolved is None:
+            return super().send_head()
+
+        kind, target = resolved
+        if kind == "redirect":
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", target)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        try:
+            body, tag = self.renderer.render(target)
+        except Exception:
+            body = traceback.format_exc().encode("utf-8")
+            self.send_response(HTTPStatus.INTERNAL_SERVER_ERROR)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return io.BytesIO(body)
+
+        if self.not_modified(tag, None):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", tag)
+            self.end_headers()
+            return None
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", tag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        return io.BytesIO(body)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer handling connections on a fixed pool of worker threads.
+
+    Unlike ThreadingHTTPServer it never starts more than ``threads``
+    threads, however many clients connect; extra connections wait in the
+    listen backlog and the pool's queue.
+
+    A worker only holds a connection while a request is being handled.
+    Idle keep-alive connections are parked on a selector watched by one
+    more thread, which hands a connection back to the pool when its next
+    request arrives and closes it after ``idle_timeout`` seconds.
+    """
+
+    request_queue_size = 128
+    idle_timeout = 30
+
+    def __init__(self, address, handler, threads=16):
+        super().__init__(address, handler)
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="http"
+        )
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+        self.closed = False
+
+        self.idle = selectors.DefaultSelector()
+        self.parking = []
+        self.parking_lock = threading.Lock()
+        # written to when a connection is parked, to wake the selector
+        self._wakeup, self._wakeup_write = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._wakeup_write.setblocking(False)
+        self.idle.register(self._wakeup, selectors.EVENT_READ)
+        self.idle_thread = threading.Thread(
+            target=self._watch_idle, name="http-idle", daemon=True
+        )
+        self.idle_thread.start()
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address, handler=None):
+        with self.connections_lock:
+            self.connections.add(request)
+        try:
+            if handler is None:
+                handler = self.finish_request(request, client_address)
+            else:
+                handler.resume()
+        except Exception:
+            handler = None
+            self.handle_error(request, client_address)
+        finally:
+            with self.connections_lock:
+                self.connections.discard(request)
+
+        if handler is not None and handler.parked:
+            self.park(handler)
+        else:
+            self.shutdown_request(request)
+
+    def park(self, handler):
+        """Watch an idle connection until its next request arrives."""
+        with self.parking_lock:
+            if self.closed:
+                handler.parked = False
+                handler.finish()
+                self.shutdown_request(handler.request)
+                return
+            self.parking.append(handler)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wakeup_write.send(b"\0")
+        except (BlockingIOError, OSError):
+            # the selector is already due to wake up, or gone
+            pass
+
+    def _watch_idle(self):
+        while not self.closed:
+            ready = self.idle.select(timeout=1)
+            now = time.monotonic()
+            for key, _ in ready:
+                if key.data is None:
+                    try:
+                        while self._wakeup.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                handler, _ = key.data
+                self.idle.unregister(key.fileobj)
+                try:
+                    self.executor.submit(
+                        self._process_request,
+                        handler.request,
+                        handler.client_address,
+                        handler,
+                    )
+                except RuntimeError:
+                    # shutting down
+                    self._drop(handler)
+
+            with self.parking_lock:
+                parked, self.parking = self.parking, []
+            for handler in parked:
+                self.idle.register(
+                    handler.request, selectors.EVENT_READ, (handler, now)
+                )
+
+            for key in list(self.idle.get_map().values()):
+                if key.data is not None and now - key.data[1] > self.idle_timeout:
+                    self.idle.unregister(key.fileobj)
+                    self._drop(key.data[0])
+
+        for key in list(self.idle.get_map().values()):
+            if key.data is not None:
+                self._drop(key.data[0])
+        self.idle.close()
+        self._wakeup.close()
+        self._wakeup_write.close()
+
+    def _drop(self, handler):
+        handler.parked = False
+        try:
+            handler.finish()
+        except OSError:
+            pass
+        self.shutdown_request(handler.request)
+
+    def server_close(self):
+        super().server_close()
+        with self.parking_lock:
+            self.closed = True
+            parked, self.parking = self.parking, []
+        for handler in parked:
+            self._drop(handler)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        # wake workers blocked on connections mid-request, which would
+        # otherwise hold up interpreter exit until they time out
+        with self.connections_lock:
+            for request in self.connections:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self._wake()
+        self.idle_thread.join()
+
+
+class PreviewServer:
+    """Serve ``directory`` for previews, in a background thread.
+
+    With a PageRenderer, pages are rendered from markdown on request and
+    ``directory`` only needs to hold the static files.
+    """
+
+    def __init__(
+        self,
+        directory,
+        port,
+        host="",
+        threads=16,
+        cache_bytes=32 * 2**20,
+        renderer=None,
+    ):
+        attrs = {"file_cache": FileCache(cache_bytes) if cache_bytes else None}
+        if renderer is not None:
+            attrs["renderer"] = renderer
+            handler = type("BoundOnDemandHandler", (OnDemandHandler,), attrs)
+        else:
+            handler = type("BoundStaticHandler", (StaticHandler,), attrs)
+        self.httpd = PooledHTTPServer(
+            (host, port), functools.partial(handler, directory=directory), threads
+        )
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ReloadChannel:
+    """Lets request threads block until the next successful rebuild."""
+
+    def __init__(self):
+        self.version = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        """Wait for a version newer than ``version``; returns the latest one."""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.version != version or self.closed, timeout
+            )
+            return self.version
+
+
+class LiveReloadHandler(StaticHandler):
+    channel = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == RELOAD_PATH:
+            self.send_events()
+            return
+
+        html_path = self.html_file(path)
+        if html_path is None:
+            super().do_GET()
+            return
+
+        with open(html_path, "rb") as f:
+            body = f.read()
+        body = body.replace(b"</body>", RELOAD_SCRIPT.encode() + b"</body>", 1)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def html_file(self, path):
+        fs_path = self.translate_path(path)
+        if os.path.isdir(fs_path):
+            if not path.endswith("/"):
+                # let the base handler issue the trailing-slash redirect
+                return None
+            fs_path = os.path.join(fs_path, "index.html")
+
+        if fs_path.endswith(".html") and os.path.isfile(fs_path):
+            return fs_path
+        return None
+
+    def send_events(self):
+        # read the version first so a rebuild finishing while the headers
+        # are in flight still reaches this client
+        version = self.channel.version
+        # the stream has no length, so it ends when the connection does
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+
+        try:
+            while not self.channel.closed:
+                latest = self.channel.wait(version, timeout=15)
+                if latest != version:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = latest
+                else:
+                    # comment line keeps proxies from closing an idle stream
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class LiveReloadServer:
+    """Serve ``directory`` in a background thread and push reloads to browsers."""
+
+    def __init__(self, directory, port, host=""):
+        self.channel = ReloadChannel()
+        handler = type(
+            "BoundLiveReloadHandler", (LiveReloadHandler,), {"channel": self.channel}
+        )
+        self.httpd = ThreadingHTTPServer(
+            (host, port), functools.partial(handler, directory=directory)
+        )
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread.start()
+
+    def reload(self):
+        self.channel.notify()
+
+    def stop(self):
+        self.channel.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,220 @@
+import heapq
+import os
+import re
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from utils import extract_title
+
+# Limits of a single sitemap file per the sitemaps.org protocol
+MAX_URLS = 50_000
+MAX_BYTES = 50 * 2**20
+
+SITEMAP_NAME = "sitemap.xml"
+SITEMAP_PART_PATTERN = re.compile(r"^sitemap-(\d+)\.xml$")
+
+SITEMAP_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+SITEMAP_FOOTER = "</urlset>\n"
+
+
+def format_time(timestamp):
+    """W3C datetime of a POSIX timestamp, as used by sitemaps and Atom."""
+    return (
+        datetime.fromtimestamp(int(timestamp), timezone.utc)
+        .isoformat()
+        .replace("+00:00", "Z")
+    )
+
+
+class SitemapWriter:
+    """Stream sitemap entries to ``out_dir`` as pages are produced.
+
+    Entries go straight to disk, so memory does not grow with the number of
+    pages. When a file reaches ``max_urls`` entries (or ``max_bytes``) the
+    next one is started; if more than one was needed, ``sitemap.xml`` is
+    written as a sitemap index pointing at ``sitemap-1.xml``,
+    ``sitemap-2.xml``, ... Otherwise the single file is ``sitemap.xml``.
+
+    Files are written under temporary names and only put in place by
+    ``close``; used as a context manager, an exception discards them and
+    leaves the previous sitemap untouched.
+    """
+
+    def __init__(self, out_dir, base_url, max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+        self.out_dir = out_dir
+        self.base_url = base_url.rstrip("/")
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        self.parts = []
+        self.count = 0
+        self._file = None
+        self._urls = 0
+        self._bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, url, mtime):
+        """Add the site path ``url``, last modified at ``mtime``."""
+        entry = (
+            f"<url><loc>{escape(self.base_url + url)}</loc>"
+            f"<lastmod>{format_time(mtime)}</lastmod></url>\n"
+        ).encode()
+
+        if self._file is not None and (
+            self._urls >= self.max_urls
+            or self._bytes + len(entry) + len(SITEMAP_FOOTER) > self.max_bytes
+        ):
+            self._finish_part()
+        if self._file is None:
+            self._start_part()
+
+        self._file.write(entry)
+        self._urls += 1
+        self._bytes += len(entry)
+        self.count += 1
+
+    def _start_part(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"sitemap-{len(self.parts) + 1}.xml.tmp")
+        self.parts.append(path)
+        self._file = open(path, "wb")
+        self._file.write(SITEMAP_HEADER.encode())
+        self._urls = 0
+        self._bytes = len(SITEMAP_HEADER)
+
+    def _finish_part(self):
+        self._file.write(SITEMAP_FOOTER.encode())
+        self._file.close()
+        self._file = None
+
+    def close(self):
+        """Put the sitemap files in place; returns their names."""
+        if self._file is None and not self.parts:
+            # an empty sitemap is still a valid one
+            self._start_part()
+        if self._file is not None:
+            self._finish_part()
+
+        names = []
+        if len(self.parts) == 1:
+            os.replace(self.parts[0], os.path.join(self.out_dir, SITEMAP_NAME))
+            names.append(SITEMAP_NAME)
+        else:
+            now = format_time(datetime.now(timezone.utc).timestamp())
+            index_path = os.path.join(self.out_dir, f"{SITEMAP_NAME}.tmp")
+            with open(index_path, "w") as f:
+                f.write(
+                    '<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                )
+                for path in self.parts:
+                    name = os.path.basename(path)[: -len(".tmp")]
+                    os.replace(path, os.path.join(self.out_dir, name))
+                    names.append(name)
+                    f.write(
+                        f"<sitemap><loc>{escape(f'{self.base_url}/{name}')}</loc>"
+                        f"<lastmod>{now}</lastmod></sitemap>\n"
+                    )
+                f.write("</sitemapindex>\n")
+            os.replace(index_path, os.path.join(self.out_dir, SITEMAP_NAME))
+            names.insert(0, SITEMAP_NAME)
+
+        # parts left over from an earlier, larger site
+        for name in os.listdir(self.out_dir):
+            if SITEMAP_PART_PATTERN.match(name) and name not in names:
+                os.remove(os.path.join(self.out_dir, name))
+        self.parts = []
+        return names
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for path in self.parts:
+            if os.path.exists(path):
+                os.remove(path)
+        self.parts = []
+
+
+class FeedWriter:
+    """Atom feed of the ``size`` most recently modified pages.
+
+    Pages are offered as they are produced and only the newest ``size`` are
+    kept, on a min-heap keyed by mtime, so memory stays bounded however
+    many pages the site has. Their titles are read with ``extract_title``
+    when the feed is written.
+
+    Atom requires an author; ``author`` names the feed's, and defaults to
+    ``title``. Entries inherit it.
+    """
+
+    def __init__(
+        self, out_dir, base_url, title, size=20, name="feed.xml", author=None
+    ):
+        self.out_dir = out_dir
+        self.base_url = base_url.rstrip("/")
+        self.title = title
+        self.author = author or title
+        self.size = size
+        self.name = name
+        self.heap = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def add(self, url, mtime, md_path):
+        item = (mtime, url, md_path)
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:
+            heapq.heapreplace(self.heap, item)
+
+    def close(self):
+        """Write the feed, newest page first; returns its name."""
+        entries = sorted(self.heap, reverse=True)
+        updated = entries[0][0] if entries else 0
+        feed_url = f"{self.base_url}/{self.name}"
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        tmp_path = os.path.join(self.out_dir, f"{self.name}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+                f"<title>{escape(self.title)}</title>\n"
+                f"<id>{escape(feed_url)}</id>\n"
+                f'<link rel="self" href={quoteattr(feed_url)}/>\n'
+                f"<link href={quoteattr(self.base_url + '/')}/>\n"
+                f"<updated>{format_time(updated)}</updated>\n"
+                f"<author><name>{escape(self.author)}</name></author>\n"
+            )
+            for mtime, url, md_path in entries:
+                with open(md_path, "r") as md:
+                    title = extract_title(md) or url
+                link = self.base_url + url
+                f.write(
+                    "<entry>"
+                    f"<title>{escape(title)}</title>"
+                    f"<id>{escape(link)}</id>"
+                    f"<link href={quoteattr(link)}/>"
+                    f"<updated>{format_time(mtime)}</updated>"
+                    "</entry>\n"
+                )
+            f.write("</feed>\n")
+        os.replace(tmp_path, os.path.join(self.out_dir, self.name))
+        self.heap = []
+        return self.name
@@ -0,0 +1,84 @@
+import re
+
+from minify import minify_html
+
+SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Template:
+    """A page template pre-split into literal segments and ``{{ Slot }}`` slots.
+
+    The template text is scanned once; rendering a page is a single join of
+    the literal segments with the slot values, so neither the template nor
+    the inserted content is ever re-scanned.
+
+    With ``minify`` the literal segments are minified once, here, and node
+    values are serialized minified.
+
+    With an AssetMap, href and src attributes pointing at static files are
+    rewritten to the fingerprinted copies; ``asset_urls`` records which.
+    """
+
+    def __init__(self, text, path=None, minify=False, assets=None):
+        self.path = path
+        self.minify = minify
+        self.parts = []
+        self.slots = {}
+        self.asset_urls = {}
+
+        last_index = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.parts.append(text[last_index : match.start()])
+            self.slots.setdefault(match.group(1), []).append(len(self.parts))
+            # keep the placeholder so unknown slots render unchanged
+            self.parts.append(match.group(0))
+            last_index = match.end()
+        self.parts.append(text[last_index:])
+
+        if assets is not None:
+            for idx in range(0, len(self.parts), 2):
+                self.parts[idx] = assets.rewrite_html(self.parts[idx], self.asset_urls)
+
+        if minify:
+            last = len(self.parts) - 1
+            for idx in range(0, len(self.parts), 2):
+                self.parts[idx] = minify_html(
+                    self.parts[idx], strip_start=idx == 0, strip_end=idx == last
+                )
+
+    @classmethod
+    def from_file(cls, path, minify=False, assets=None):
+        with open(path, "r") as f:
+            return cls(f.read(), path=path, minify=minify, assets=assets)
+
+    def _fill(self, values):
+        parts = self.parts.copy()
+        for name, value in values.items():
+            for idx in self.slots.get(name, ()):
+                parts[idx] = value
+        return parts
+
+    def render(self, **values):
+        return "".join(self._fill(values))
+
+    def write(self, write, **values):
+        """Stream the rendered page to ``write``.
+
+        Values may be strings or HTML nodes; nodes are serialized straight
+        into ``write`` without building the page body as one string.
+        """
+        for part in self._fill(values):
+            if isinstance(part, str):
+                write(part)
+            else:
+                part.write_html(write, minify=self.minify)
+
+    def __repr__(self):
+        return f"Template(path={self.path}, slots={sorted(self.slots)})"
+
+
+def load_template(template, minify=False, assets=None):
+    """Accept either a template path or an already compiled Template."""
+    if isinstance(template, Template):
+        return template
+    return Template.from_file(template, minify=minify, assets=assets)
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import unittest
+
+from assets import AssetMap
+
+
+class TestAssetMap(unittest.TestCase):
+    def setUp(self):
+        self.assets = AssetMap(
+            {
+                "index.css": {"name": "index.0123abcd.css"},
+                os.path.join("images", "a b.png"): {
+                    "name": os.path.join("images", "a b.4567ef01.png")
+                },
+            }
+        )
+
+    def test_url_for(self):
+        self.assertEqual(self.assets.url_for("/index.css"), "/index.0123abcd.css")
+        self.assertEqual(
+            self.assets.url_for("/index.css?v=2#top"), "/index.0123abcd.css?v=2#top"
+        )
+        self.assertEqual(
+            self.assets.url_for("/images/a%20b.png"), "/images/a%20b.4567ef01.png"
+        )
+        self.assertIsNone(self.assets.url_for("index.css"))
+        self.assertIsNone(self.assets.url_for("//cdn.example.com/index.css"))
+        self.assertIsNone(self.assets.url_for("/missing.css"))
+        self.assertEqual(self.assets.rewrite("/missing.css"), "/missing.css")
+
+    def test_rewrite_html(self):
+        used = {}
+        html = (
+            '<link href="/index.css" rel="stylesheet" />'
+            "<img src=/index.css><a HREF='/other.css'>x</a>"
+        )
+        self.assertEqual(
+            self.assets.rewrite_html(html, used),
+            '<link href="/index.0123abcd.css" rel="stylesheet" />'
+            "<img src=\"/index.0123abcd.css\"><a HREF='/other.css'>x</a>",
+        )
+        self.assertEqual(used, {"/index.css": "/index.0123abcd.css"})
+
+    def test_fingerprint_follows_mapping(self):
+        other = AssetMap({"index.css": {"name": "index.89abcdef.css"}})
+        self.assertNotEqual(self.assets.fingerprint, other.fingerprint)
+        same = AssetMap({"index.css": {"name": "index.89abcdef.css"}})
+        self.assertEqual(same.fingerprint, other.fingerprint)
+
+    def test_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(self.assets.write(tmp), ["assets.json", "_headers"])
+            with open(os.path.join(tmp, "assets.json")) as f:
+                self.assertEqual(json.load(f), self.assets.urls)
+            with open(os.path.join(tmp, "_headers")) as f:
+                self.assertEqual(
+                    f.read(),
+                    "/images/a%20b.4567ef01.png\n"
+                    "  Cache-Control: public, max-age=31536000, immutable\n"
+                    "/index.0123abcd.css\n"
+                    "  Cache-Control: public, max-age=31536000, immutable\n",
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from bench import (
+    bench_memory,
+    bench_stages,
+    generate_corpus,
+    load_results,
+    previous_result,
+    save_result,
+)
+from generator import markdown_to_html_node
+
+SHAPE = {
+    "pages": 6,
+    "paragraphs": 4,
+    "paragraph_words": 30,
+    "list_items": 5,
+    "code_lines": 3,
+    "link_density": 0.05,
+    "image_density": 0.02,
+}
+
+
+class TestBenchMemory(unittest.TestCase):
+    def test_slotted_nodes_are_smaller(self):
+        for result in bench_memory(2000):
+            with self.subTest(node=result["node"]):
+                self.assertLess(result["after"], result["before"])
+
+
+class TestBenchStages(unittest.TestCase):
+    def test_corpus_is_deterministic_and_renders(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = generate_corpus(os.path.join(tmp, "a"), SHAPE, seed=3)
+            second = generate_corpus(os.path.join(tmp, "b"), SHAPE, seed=3)
+            self.assertEqual(len(first), SHAPE["pages"])
+
+            for a, b in zip(first, second):
+                with open(a) as fa, open(b) as fb:
+                    md = fa.read()
+                    self.assertEqual(md, fb.read())
+                html = markdown_to_html_node(md).to_html()
+                self.assertIn("<ol>", html)
+                self.assertIn("<pre><code>", html)
+
+    def test_stage_report(self):
+        result = bench_stages(SHAPE)
+        self.assertEqual(result["pages"], SHAPE["pages"])
+        self.assertGreater(result["bytes"], 0)
+        for stage in ("read", "text_to_textnodes", "to_html", "template_fill", "write"):
+            self.assertGreater(result["stages"][stage]["seconds"], 0)
+
+    def test_results_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.jsonl")
+            self.assertEqual(load_results(path), [])
+
+            save_result({"shape": SHAPE, "commit": "a"}, path)
+            save_result({"shape": {"pages": 1}, "commit": "b"}, path)
+            results = load_results(path)
+            self.assertEqual(previous_result(results, SHAPE)["commit"], "a")
+            self.assertIsNone(previous_result(results, {"pages": 2}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from blocks import block_to_block_type, BlockType
+from blocks import block_to_block_type, BlockType, scan_blocks, split_block_lines
 
 
 class TestBlockToBlockType(unittest.TestCase):
@@ -64,5 +64,65 @@ class TestBlockToBlockType(unittest.TestCase):
         self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
 
+class TestScanBlocks(unittest.TestCase):
+    def test_types_and_lines(self):
+        md = """
+        # Title
+
+        Some **text**
+        over two lines
+
+        ```
+        code
+        ```
+
+        > quoted
+        > more
+
+        - a
+        - b
+
+        1. one
+        2. two
+        """
+        self.assertEqual(
+            list(scan_blocks(md)),
+            [
+                (BlockType.HEADING, ["# Title"]),
+                (BlockType.PARAGRAPH, ["Some **text**", "over two lines"]),
+                (BlockType.CODE, ["```", "code", "```"]),
+                (BlockType.QUOTE, ["> quoted", "> more"]),
+                (BlockType.UNORDERED_LIST, ["- a", "- b"]),
+                (BlockType.ORDERED_LIST, ["1. one", "2. two"]),
+            ],
+        )
+
+    def test_long_ordered_list(self):
+        lines = [f"{i}. item" for i in range(1, 1001)]
+        self.assertEqual(
+            list(scan_blocks("\n".join(lines))), [(BlockType.ORDERED_LIST, lines)]
+        )
+
+    def test_out_of_order_list_is_paragraph(self):
+        [(block_type, _)] = scan_blocks("1. a\n3. b")
+        self.assertEqual(block_type, BlockType.PARAGRAPH)
+
+    def test_whitespace_only_line_does_not_split(self):
+        self.assertEqual(list(split_block_lines("a\n   \nb\n\nc")), [["a", "b"], ["c"]])
+
+    def test_crlf_and_file_lines(self):
+        self.assertEqual(list(split_block_lines("a\r\n\r\nb")), [["a"], ["b"]])
+        self.assertEqual(
+            list(split_block_lines(["- x\n", "- y\n", "\n", "z\n"])),
+            [["- x", "- y"], ["z"]],
+        )
+
+    def test_agrees_with_block_to_block_type(self):
+        md = "# h\n\n```\nx\n```\n\n> q\nnot\n\n-x\n\n2. a\n\n1. a\n2.b"
+        for block_type, lines in scan_blocks(md):
+            with self.subTest(lines=lines):
+                self.assertEqual(block_to_block_type("\n".join(lines)), block_type)
+
+
 if __name__ == "__main__":
     unittest.main()
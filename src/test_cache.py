@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+
+from cache import BlockCache, ParseCache
+from generator import PARSER_VERSION, generate_page, markdown_to_html_node
+from linkgraph import page_references
+from template import Template
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self.tmp.name, "parse"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        key = self.cache.key("# hi", PARSER_VERSION)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "<div>hi</div>")
+        self.assertEqual(self.cache.get(key), "<div>hi</div>")
+
+    def test_key_covers_source_and_options(self):
+        key = self.cache.key("# hi", "1")
+        self.assertEqual(key, self.cache.key("# hi", "1"))
+        self.assertNotEqual(key, self.cache.key("# hi!", "1"))
+        self.assertNotEqual(key, self.cache.key("# hi", "2"))
+        self.assertNotEqual(key, self.cache.key("# hi", "1", "minify"))
+
+    def test_no_temporary_files_left_behind(self):
+        self.cache.put(self.cache.key("a"), "x")
+        for _, _, path in self.cache.entries():
+            self.assertFalse(os.path.basename(path).startswith(".tmp-"))
+        self.assertEqual(len(self.cache.entries()), 1)
+
+    def test_evict_least_recently_used(self):
+        keys = [self.cache.key(str(i)) for i in range(4)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "x" * 100)
+            path = self.cache._path(key)
+            os.utime(path, ns=(10**9 * i, 10**9 * i))
+
+        # touch the oldest entry so it becomes the most recently used
+        self.cache.get(keys[0])
+
+        self.cache.max_bytes = 250
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNone(self.cache.get(keys[2]))
+        self.assertIsNotNone(self.cache.get(keys[3]))
+
+    def test_evict_empty_cache(self):
+        self.assertEqual(self.cache.evict(), 0)
+
+    def test_generate_page_hits_cache(self):
+        src = os.path.join(self.tmp.name, "page.md")
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(src, "w") as f:
+            f.write("# Title\n\nsome **bold** text")
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+        outputs = []
+        statuses = []
+        for name in ("a.html", "b.html"):
+            dest = os.path.join(self.tmp.name, name)
+            statuses.append(generate_page(src, template, dest, cache=self.cache))
+            with open(dest) as f:
+                outputs.append(f.read())
+
+        self.assertEqual(statuses, ["miss", "hit"])
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn("<b>bold</b>", outputs[0])
+
+
+    def test_extracted_values_are_cached(self):
+        src = os.path.join(self.tmp.name, "page.md")
+        with open(src, "w") as f:
+            f.write("# Title\n\n[a link](/a)")
+        template = Template("{{ Content }}")
+        calls = []
+
+        def references(md_content, body):
+            calls.append(body is not None)
+            return page_references(md_content)
+
+        extracted = []
+        for name in ("a.html", "b.html"):
+            extract = {"references": references}
+            dest = os.path.join(self.tmp.name, name)
+            generate_page(src, template, dest, cache=self.cache, extract=extract)
+            extracted.append(extract["references"])
+
+        # the first render hands its nodes over, the second needs neither
+        self.assertEqual(calls, [True])
+        # values come back from the cache as JSON
+        self.assertEqual([list(value) for value in extracted], [[["/a"], []]] * 2)
+
+
+class TestBlockCache(unittest.TestCase):
+    DISCLAIMER = "> Opinions are my own, **not** my employer's."
+
+    def test_repeated_blocks_render_once(self):
+        cache = BlockCache()
+        pages = [f"# Page {i}\n\n{self.DISCLAIMER}" for i in range(3)]
+        html = [markdown_to_html_node(md, cache).to_html() for md in pages]
+
+        self.assertEqual(html, [markdown_to_html_node(md).to_html() for md in pages])
+        # three distinct headings, one shared quote
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(len(cache), 4)
+        self.assertAlmostEqual(cache.hit_rate(), 1 / 3)
+
+    def test_bounded_lru(self):
+        cache = BlockCache(max_entries=2)
+        for key in ("a", "b", "a", "c"):
+            if cache.get(key) is None:
+                cache.put(key, key.upper())
+
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+    def test_large_blocks_are_not_cached(self):
+        cache = BlockCache(max_block_size=10)
+        markdown_to_html_node("a paragraph well over ten characters", cache)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.misses, 0)
+
+    def test_persisted_across_builds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.pickle")
+            cache = BlockCache()
+            markdown_to_html_node(self.DISCLAIMER, cache)
+            cache.save(path, PARSER_VERSION)
+
+            reloaded = BlockCache()
+            reloaded.load(path, PARSER_VERSION)
+            html = markdown_to_html_node(self.DISCLAIMER, reloaded).to_html()
+            self.assertEqual(reloaded.hits, 1)
+            self.assertIn("<b>not</b>", html)
+
+            stale = BlockCache()
+            stale.load(path, PARSER_VERSION + "-old")
+            self.assertEqual(len(stale), 0)
+
+    def test_load_missing_file(self):
+        cache = BlockCache()
+        cache.load("/nonexistent/blocks.pickle", PARSER_VERSION)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
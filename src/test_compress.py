@@ -0,0 +1,103 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from compress import compress_tree
+
+
+class TestCompressTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("index.html", "<p>hello world</p>\n" * 100)
+        self.write("blog/post.html", "<p>a post</p>\n" * 100)
+        self.write("tiny.css", "body {}")
+        self.write("random.js", os.urandom(1024))
+        self.write("image.png", "not compressible by extension " * 20)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, data):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+
+    def exists(self, rel_path):
+        return os.path.exists(os.path.join(self.root, rel_path))
+
+    def test_writes_gz_siblings(self):
+        compressed, unchanged, skipped, removed, state = compress_tree(self.root)
+
+        self.assertEqual(compressed, ["blog/post.html", "index.html"])
+        self.assertEqual(unchanged, [])
+        self.assertEqual(skipped, ["random.js"])
+        self.assertEqual(removed, [])
+        self.assertFalse(self.exists("tiny.css.gz"))
+        self.assertFalse(self.exists("image.png.gz"))
+        self.assertFalse(self.exists("random.js.gz"))
+        self.assertEqual(set(state), {"blog/post.html", "index.html", "random.js"})
+
+        with gzip.open(os.path.join(self.root, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>hello world</p>\n" * 100)
+        src = os.stat(os.path.join(self.root, "index.html"))
+        gz = os.stat(os.path.join(self.root, "index.html.gz"))
+        self.assertEqual(src.st_mtime_ns, gz.st_mtime_ns)
+
+    def test_unchanged_files_are_skipped(self):
+        *_, state = compress_tree(self.root)
+        self.write("index.html", "<p>changed</p>\n" * 100)
+
+        compressed, unchanged, skipped, _, _ = compress_tree(self.root, previous=state)
+        self.assertEqual(compressed, ["index.html"])
+        self.assertEqual(unchanged, ["blog/post.html", "random.js"])
+        self.assertEqual(skipped, [])
+
+    def test_unchanged_files_are_not_hashed(self):
+        *_, state = compress_tree(self.root)
+        with mock.patch("compress.hash_file", side_effect=AssertionError):
+            compressed, unchanged, _, _, _ = compress_tree(self.root, previous=state)
+        self.assertEqual(compressed, [])
+        self.assertEqual(unchanged, ["blog/post.html", "index.html", "random.js"])
+
+    def test_level_change_recompresses(self):
+        *_, state = compress_tree(self.root, level=6)
+        compressed, unchanged, _, _, _ = compress_tree(
+            self.root, previous=state, level=9
+        )
+        self.assertEqual(compressed, ["blog/post.html", "index.html"])
+        self.assertEqual(unchanged, [])
+
+    def test_output_is_deterministic(self):
+        compress_tree(self.root)
+        with open(os.path.join(self.root, "index.html.gz"), "rb") as f:
+            first = f.read()
+        compress_tree(self.root)
+        with open(os.path.join(self.root, "index.html.gz"), "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_stale_siblings_are_removed(self):
+        *_, state = compress_tree(self.root)
+        os.remove(os.path.join(self.root, "blog", "post.html"))
+        self.write("index.html", os.urandom(1024))
+
+        compressed, _, skipped, removed, state = compress_tree(
+            self.root, previous=state
+        )
+        self.assertEqual(compressed, [])
+        self.assertEqual(skipped, ["index.html"])
+        self.assertEqual(removed, ["blog/post.html.gz"])
+        self.assertFalse(self.exists("blog/post.html.gz"))
+        self.assertFalse(self.exists("index.html.gz"))
+
+    def test_dry_run_writes_nothing(self):
+        compressed, _, _, _, _ = compress_tree(self.root, dry_run=True)
+        self.assertEqual(compressed, ["blog/post.html", "index.html"])
+        self.assertFalse(self.exists("index.html.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+import os
+import tempfile
+import types
+import unittest
+
+from file_manage import discover_files, fingerprint_tree, iter_files, sync_tree
+
+
+class TestIterFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "root")
+        for rel_path in ("b.md", "a.md", "z/c.md", "z/img.png", "d/e/f.md", "d/.hidden"):
+            path = os.path.join(self.root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(rel_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rel(self, entries):
+        return [os.path.relpath(entry.path, self.root) for entry in entries]
+
+    def test_is_lazy_and_ordered(self):
+        entries = iter_files(self.root)
+        self.assertIsInstance(entries, types.GeneratorType)
+        self.assertEqual(
+            self.rel(entries),
+            ["a.md", "b.md", "d/.hidden", "d/e/f.md", "z/c.md", "z/img.png"],
+        )
+
+    def test_include_and_exclude(self):
+        self.assertEqual(
+            self.rel(iter_files(self.root, include=["*.md"], exclude=["z"])),
+            ["a.md", "b.md", "d/e/f.md"],
+        )
+        self.assertEqual(
+            self.rel(iter_files(self.root, exclude=[".*", "d/e"])),
+            ["a.md", "b.md", "z/c.md", "z/img.png"],
+        )
+
+    def test_symlink_policies(self):
+        os.symlink(os.path.join(self.root, "z"), os.path.join(self.root, "link"))
+        os.symlink(os.path.join(self.root, "a.md"), os.path.join(self.root, "alias.md"))
+        # a loop back to the root must not recurse forever
+        os.symlink(self.root, os.path.join(self.root, "d", "loop"))
+
+        default = self.rel(iter_files(self.root, include=["*.md"]))
+        self.assertEqual(default, ["a.md", "alias.md", "b.md", "d/e/f.md", "z/c.md"])
+
+        followed = self.rel(iter_files(self.root, include=["*.md"], symlinks="follow"))
+        self.assertEqual(
+            followed, ["a.md", "alias.md", "b.md", "d/e/f.md", "link/c.md"]
+        )
+
+        skipped = self.rel(iter_files(self.root, include=["*.md"], symlinks="skip"))
+        self.assertEqual(skipped, ["a.md", "b.md", "d/e/f.md", "z/c.md"])
+
+        # without a filter, symlinked directories must not pass for files
+        unfiltered = self.rel(iter_files(self.root))
+        self.assertNotIn("link", unfiltered)
+        self.assertNotIn("d/loop", unfiltered)
+        self.assertIn("alias.md", unfiltered)
+
+    def test_unknown_symlink_policy(self):
+        with self.assertRaises(ValueError):
+            list(iter_files(self.root, symlinks="maybe"))
+
+    def test_discover_files_is_repeatable(self):
+        first = discover_files(self.root)
+        self.assertEqual(discover_files(self.root), first)
+        self.assertEqual(len(first), 6)
+
+    def test_discover_files_missing_dir(self):
+        with self.assertRaises(Exception):
+            discover_files(os.path.join(self.tmp.name, "missing"))
+
+
+class TestSyncTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "public")
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png-bytes")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_first_sync_copies_everything(self):
+        copied, unchanged, removed, synced = sync_tree(self.src, self.dest)
+        self.assertEqual(copied, ["images/a.png", "index.css"])
+        self.assertEqual(unchanged, [])
+        self.assertEqual(removed, [])
+        self.assertEqual(synced, {"images/a.png", "index.css"})
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body {}")
+
+    def test_second_sync_copies_nothing(self):
+        _, _, _, synced = sync_tree(self.src, self.dest)
+        copied, unchanged, _, _ = sync_tree(self.src, self.dest, previous=synced)
+        self.assertEqual(copied, [])
+        self.assertEqual(unchanged, ["images/a.png", "index.css"])
+
+    def test_changed_file_is_copied(self):
+        sync_tree(self.src, self.dest)
+        self.write(os.path.join(self.src, "index.css"), "body { color: red }")
+        copied, _, _, _ = sync_tree(self.src, self.dest)
+        self.assertEqual(copied, ["index.css"])
+        self.assertEqual(
+            self.read(os.path.join(self.dest, "index.css")), "body { color: red }"
+        )
+
+    def test_checksum_ignores_touched_files(self):
+        sync_tree(self.src, self.dest)
+        path = os.path.join(self.src, "index.css")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        copied, _, _, _ = sync_tree(self.src, self.dest, checksum=True)
+        self.assertEqual(copied, [])
+        # the mtime was refreshed so a plain stat comparison now agrees
+        copied, _, _, _ = sync_tree(self.src, self.dest)
+        self.assertEqual(copied, [])
+
+    def test_orphans_are_removed_but_unsynced_files_kept(self):
+        _, _, _, synced = sync_tree(self.src, self.dest)
+        self.write(os.path.join(self.dest, "index.html"), "<p>generated</p>")
+        os.remove(os.path.join(self.src, "images", "a.png"))
+
+        _, _, removed, synced = sync_tree(self.src, self.dest, previous=synced)
+        self.assertEqual(removed, ["images/a.png"])
+        self.assertEqual(synced, {"index.css"})
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_hardlink_mode(self):
+        sync_tree(self.src, self.dest, mode="hardlink")
+        src_stat = os.stat(os.path.join(self.src, "index.css"))
+        dest_stat = os.stat(os.path.join(self.dest, "index.css"))
+        self.assertEqual(src_stat.st_ino, dest_stat.st_ino)
+
+    def test_switching_from_hardlink_to_copy_keeps_source_intact(self):
+        sync_tree(self.src, self.dest, mode="hardlink")
+        self.write(os.path.join(self.src, "new.txt"), "x")
+        # replace the linked file so it is recopied in copy mode
+        os.remove(os.path.join(self.src, "index.css"))
+        self.write(os.path.join(self.src, "index.css"), "fresh")
+
+        sync_tree(self.src, self.dest, mode="copy")
+        self.assertEqual(self.read(os.path.join(self.src, "index.css")), "fresh")
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "fresh")
+
+    def test_reflink_mode_falls_back_to_copy(self):
+        copied, _, _, _ = sync_tree(self.src, self.dest, mode="reflink")
+        self.assertEqual(len(copied), 2)
+        self.assertEqual(
+            self.read(os.path.join(self.dest, "images", "a.png")), "png-bytes"
+        )
+
+    def test_dry_run_writes_nothing(self):
+        copied, _, _, _ = sync_tree(self.src, self.dest, dry_run=True)
+        self.assertEqual(len(copied), 2)
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            sync_tree(self.src, self.dest, mode="symlink")
+
+
+class TestFingerprintTree(unittest.TestCase):
+    setUp = TestSyncTree.setUp
+    tearDown = TestSyncTree.tearDown
+    write = TestSyncTree.write
+    read = TestSyncTree.read
+
+    def test_fingerprinted_copies(self):
+        self.write(os.path.join(self.src, "robots.txt"), "User-agent: *")
+        written, unchanged, removed, state = fingerprint_tree(self.src, self.dest)
+
+        css = "index.62368a1a.css"
+        self.assertEqual(written, [os.path.join("images", "a.ea803343.png"), css])
+        self.assertEqual((unchanged, removed), ([], []))
+        self.assertEqual(sorted(state), [os.path.join("images", "a.png"), "index.css"])
+        self.assertEqual(state["index.css"]["name"], css)
+        self.assertEqual(self.read(os.path.join(self.dest, css)), "body {}")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "robots.txt")))
+
+    def test_changed_file_gets_a_new_name(self):
+        _, _, _, state = fingerprint_tree(self.src, self.dest)
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        written, unchanged, removed, state = fingerprint_tree(
+            self.src, self.dest, previous=state
+        )
+
+        self.assertEqual(written, [state["index.css"]["name"]])
+        self.assertEqual(unchanged, [os.path.join("images", "a.ea803343.png")])
+        self.assertEqual(removed, ["index.62368a1a.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, removed[0])))
+
+    def test_dry_run_writes_nothing(self):
+        written, _, _, _ = fingerprint_tree(self.src, self.dest, dry_run=True)
+        self.assertEqual(len(written), 2)
+        self.assertFalse(os.path.exists(self.dest))
+
+
+if __name__ == "__main__":
+    unittest.main()
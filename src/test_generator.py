@@ -1,6 +1,23 @@
+import os
+import shutil
+import tempfile
+import tracemalloc
 import unittest
 
-from generator import markdown_to_html_node
+import generator
+from cache import BlockCache
+from generator import (
+    BuildError,
+    generate_page,
+    generate_pages_recursive,
+    markdown_to_html_node,
+)
+from images import ImageIndex
+from linkgraph import LinkGraph
+from manifest import BuildManifest
+from search import SearchIndex, page_terms
+from sitemap import SitemapWriter
+from template import Template
 
 
 class TestMarkdownToHTMLNode(unittest.TestCase):
@@ -79,5 +96,272 @@ class TestMarkdownToHTMLNode(unittest.TestCase):
         )
 
 
+class TestGeneratePagesRecursive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+        for i in range(6):
+            self.write_page(f"section{i % 2}/page{i}.md", f"# Page {i}\n\nbody **{i}**")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_page(self, rel_path, text):
+        path = os.path.join(self.content, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read_tree(self, root):
+        pages = {}
+        for dirpath, _, files in os.walk(root):
+            for file in files:
+                path = os.path.join(dirpath, file)
+                with open(path) as f:
+                    pages[os.path.relpath(path, root)] = f.read()
+        return pages
+
+    def test_parallel_output_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        serial_generated, _, _ = generate_pages_recursive(
+            self.content, self.template, serial
+        )
+        parallel_generated, _, _ = generate_pages_recursive(
+            self.content, self.template, parallel, jobs=3
+        )
+
+        self.assertEqual(
+            [os.path.relpath(p, serial) for p in serial_generated],
+            [os.path.relpath(p, parallel) for p in parallel_generated],
+        )
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_block_cache_counts_worker_hits(self):
+        for i in range(6):
+            self.write_page(f"section{i % 2}/page{i}.md", f"# Page {i}\n\nfooter")
+
+        for jobs, io_workers in ((1, 0), (2, 0), (1, 2), (2, 2)):
+            with self.subTest(jobs=jobs, io_workers=io_workers):
+                block_cache = BlockCache()
+                generate_pages_recursive(
+                    self.content,
+                    self.template,
+                    os.path.join(self.tmp.name, f"public{jobs}-{io_workers}"),
+                    jobs=jobs,
+                    io_workers=io_workers,
+                    block_cache=block_cache,
+                )
+                self.assertEqual(block_cache.hits + block_cache.misses, 12)
+                self.assertGreaterEqual(block_cache.hits, 6 - jobs)
+
+    def test_image_change_only_rerenders_dependents(self):
+        images_dir = os.path.join(os.path.dirname(__file__), "..", "static", "images")
+        static = os.path.join(self.tmp.name, "static")
+        os.makedirs(os.path.join(static, "images"))
+        shutil.copy(os.path.join(images_dir, "tom.png"), os.path.join(static, "images"))
+        self.write_page("section0/page0.md", "# Page 0\n\n![tom](/images/tom.png)")
+
+        public = os.path.join(self.tmp.name, "public")
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        links = LinkGraph()
+        images = ImageIndex(static)
+        images.scan()
+
+        def build():
+            return generate_pages_recursive(
+                self.content,
+                self.template,
+                public,
+                manifest=manifest,
+                images=images,
+                links=links,
+            )
+
+        build()
+        with open(os.path.join(public, "section0", "page0.html")) as f:
+            self.assertIn('width="928" height="468"', f.read())
+
+        shutil.copy(
+            os.path.join(images_dir, "rivendell.png"),
+            os.path.join(static, "images", "tom.png"),
+        )
+        images.scan()
+        generated, skipped, _ = build()
+
+        self.assertEqual(
+            [os.path.relpath(path, public) for path in generated],
+            [os.path.join("section0", "page0.html")],
+        )
+        self.assertEqual(len(skipped), 5)
+        with open(os.path.join(public, "section0", "page0.html")) as f:
+            self.assertIn('width="1344" height="896"', f.read())
+
+    def test_search_index_follows_changed_pages(self):
+        public = os.path.join(self.tmp.name, "public")
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        search = SearchIndex()
+
+        def build():
+            return generate_pages_recursive(
+                self.content, self.template, public, manifest=manifest, search=search
+            )
+
+        build()
+        self.assertEqual(len(search.pages), 6)
+        # pages missing from the index are rendered even when fresh
+        del search.pages[os.path.join("section0", "page0.md")]
+        self.write_page("section1/page1.md", "# Renamed\n\nplankton")
+        generated, skipped, _ = build()
+
+        self.assertEqual(len(generated), 2)
+        self.assertEqual(len(skipped), 4)
+        page = search.pages[os.path.join("section1", "page1.md")]
+        self.assertEqual(page["url"], "/section1/page1.html")
+        self.assertEqual(page["title"], "Renamed")
+        self.assertEqual(page["terms"], {"renamed": 1, "plankton": 1})
+
+    def test_sitemap_lists_skipped_pages(self):
+        public = os.path.join(self.tmp.name, "public")
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        for _ in range(2):
+            with SitemapWriter(public, "https://example.com") as sitemap:
+                generate_pages_recursive(
+                    self.content, self.template, public, manifest=manifest, sitemap=sitemap
+                )
+            self.assertEqual(sitemap.count, 6)
+
+    def test_parser_version_change_regenerates_pages(self):
+        public = os.path.join(self.tmp.name, "public")
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+
+        def build():
+            return generate_pages_recursive(
+                self.content, self.template, public, manifest=manifest
+            )
+
+        build()
+        self.assertEqual(len(build()[1]), 6)
+        version = generator.PARSER_VERSION
+        generator.PARSER_VERSION = version + "-next"
+        try:
+            generated, skipped, _ = build()
+        finally:
+            generator.PARSER_VERSION = version
+        self.assertEqual((len(generated), len(skipped)), (6, 0))
+
+    def test_generation_order_is_sorted(self):
+        public = os.path.join(self.tmp.name, "public")
+        generated, _, _ = generate_pages_recursive(self.content, self.template, public)
+        rel = [os.path.relpath(p, public) for p in generated]
+        self.assertEqual(rel, sorted(rel))
+
+    def test_failures_are_aggregated(self):
+        self.write_page("broken/a.md", "unclosed *italic")
+        self.write_page("broken/b.md", "unclosed `code")
+        public = os.path.join(self.tmp.name, "public")
+
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                with self.assertRaises(BuildError) as ctx:
+                    generate_pages_recursive(
+                        self.content, self.template, public, jobs=jobs
+                    )
+
+                failed = [os.path.basename(path) for path, _ in ctx.exception.failures]
+                self.assertEqual(failed, ["a.md", "b.md"])
+                self.assertIn("unclosed delimiter", ctx.exception.report())
+                # the healthy pages are still written
+                self.assertEqual(len(self.read_tree(public)), 6)
+
+
+class TestStreamedPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "page.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self, template, threshold, extract=None):
+        dest = os.path.join(self.tmp.name, "out", f"page{threshold}.html")
+        generate_page(
+            self.source, template, dest, extract=extract, stream_threshold=threshold
+        )
+        with open(dest) as f:
+            return f.read()
+
+    def test_matches_buffered_output(self):
+        with open(self.source, "w") as f:
+            f.write(
+                "intro\n\n# The Title\n\n"
+                "```\ncode  block\n```\n\n"
+                "> quote *a*\r\n> more\n\n"
+                "- one\n- [two](/two)\n\n   \n1. x\n2. y"
+            )
+
+        for minify in (False, True):
+            with self.subTest(minify=minify):
+                template = Template(
+                    "<title>{{ Title }}</title>\n<main> {{ Content }} </main>",
+                    minify=minify,
+                )
+                extracted = {"search": page_terms}
+                streamed = self.generate(template, 0, extracted)
+                self.assertEqual(streamed, self.generate(template, 1 << 20))
+                self.assertIn("<title>The Title</title>", streamed)
+                self.assertEqual(extracted["search"]["title"], "The Title")
+
+    def test_title_matches_buffered_output(self):
+        # str.splitlines also breaks on form feeds and other separators
+        with open(self.source, "w") as f:
+            f.write("intro\x0c# Hidden\u2028more\n\n# Title")
+
+        template = Template("<title>{{ Title }}</title>")
+        streamed = self.generate(template, 0)
+        self.assertEqual(streamed, self.generate(template, 1 << 20))
+        self.assertEqual(streamed, "<title>Hidden</title>")
+
+    def test_failure_keeps_previous_page(self):
+        with open(self.source, "w") as f:
+            f.write("# Title\n\n" + "a paragraph\n\n" * 1000 + "unclosed *italic")
+        out = os.path.join(self.tmp.name, "out")
+        dest = os.path.join(out, "page.html")
+        os.makedirs(out)
+        with open(dest, "w") as f:
+            f.write("previous")
+
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        with self.assertRaises(ValueError):
+            generate_page(self.source, template, dest, stream_threshold=0)
+        self.assertEqual(os.listdir(out), ["page.html"])
+        with open(dest) as f:
+            self.assertEqual(f.read(), "previous")
+
+    def test_memory_follows_largest_block(self):
+        block = "Some **bold** text and a [link](/somewhere) in a paragraph.\n"
+        with open(self.source, "w") as f:
+            f.write("# Large\n\n")
+            for i in range(5000):
+                f.write(f"## Section {i}\n\n{block * 3}\n")
+        size = os.path.getsize(self.source)
+
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        dest = os.path.join(self.tmp.name, "page.html")
+        # warm up one-off allocations, such as regex and interned names
+        generate_page(self.source, template, dest, stream_threshold=0)
+        tracemalloc.start()
+        try:
+            generate_page(self.source, template, dest, stream_threshold=0)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, size / 10)
+
+
 if __name__ == "__main__":
     unittest.main()
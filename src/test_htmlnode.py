@@ -1,6 +1,6 @@
 import unittest
 
-from htmlnode import HTMLNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -41,6 +41,17 @@ class TestHTMLNode(unittest.TestCase):
         self.assertIn('href="url"', html)
         self.assertIn('class="foo"', html)
 
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode(), ParentNode("div", []), LeafNode("b", "x")):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_tags_are_interned(self):
+        level = 2
+        self.assertIs(HTMLNode(f"h{level}").tag, HTMLNode("h2").tag)
+
+    def test_empty_props_are_shared(self):
+        self.assertIsNone(HTMLNode(props={}).props)
+
     def test_to_html_not_implemented(self):
         node = HTMLNode()
         with self.assertRaises(NotImplementedError):
@@ -159,5 +170,50 @@ class TestParentNode(unittest.TestCase):
         self.assertIn("'data': 'val'", repr(node))
 
 
+class TestStreamingSerializer(unittest.TestCase):
+    def test_iter_html_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("ul", [ParentNode("li", [LeafNode("b", "x")])]),
+                LeafNode(None, "tail"),
+            ],
+            {"id": "root"},
+        )
+        self.assertEqual(
+            "".join(node.iter_html()),
+            '<div id="root"><ul><li><b>x</b></li></ul>tail</div>',
+        )
+
+    def test_deep_tree_does_not_hit_recursion_limit(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 1 + 5000 * len("<span></span>"))
+
+    def test_write_html_batches_chunks(self):
+        node = ParentNode("ul", [LeafNode("li", str(i)) for i in range(100)])
+        writes = []
+        node.write_html(writes.append, buffer_size=64)
+        self.assertGreater(len(writes), 1)
+        self.assertEqual("".join(writes), node.to_html())
+
+    def test_write_html_empty_children(self):
+        writes = []
+        ParentNode("div", []).write_html(writes.append)
+        self.assertEqual(writes, ["<div></div>"])
+
+    def test_errors_are_raised_while_streaming(self):
+        node = ParentNode("div", [ParentNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.write_html(lambda chunk: None)
+
+        node = ParentNode("div", [LeafNode("b", None)])
+        with self.assertRaises(ValueError):
+            list(node.iter_html())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,124 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from images import ImageIndex, read_image_size
+
+
+def png_bytes(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + struct.pack(">I", len(ihdr))
+        + chunk
+        + struct.pack(">I", zlib.crc32(chunk))
+    )
+
+
+def gif_bytes(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00\x00\x00"
+
+
+def jpeg_bytes(width, height, exif_size=0):
+    segments = b"\xff\xd8"
+    # APP0 (JFIF) and a large APP1 (EXIF) before the frame header
+    segments += b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    segments += b"\xff\xe1" + struct.pack(">H", exif_size + 2) + b"\x00" * exif_size
+    # DHT shares the SOF range and must be skipped
+    segments += b"\xff\xc4" + struct.pack(">H", 4) + b"\x00\x00"
+    segments += (
+        b"\xff\xff\xc0"
+        + struct.pack(">HBHHB", 11, 8, height, width, 1)
+        + b"\x01\x11\x00"
+    )
+    return segments + b"\xff\xd9"
+
+
+class TestReadImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def size_of(self, data):
+        path = os.path.join(self.tmp.name, "image")
+        with open(path, "wb") as f:
+            f.write(data)
+        return read_image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size_of(png_bytes(640, 480)), (640, 480))
+
+    def test_gif(self):
+        self.assertEqual(self.size_of(gif_bytes(32, 16)), (32, 16))
+
+    def test_jpeg_skips_segments(self):
+        self.assertEqual(self.size_of(jpeg_bytes(1920, 1080, 60000)), (1920, 1080))
+
+    def test_unknown_or_truncated(self):
+        self.assertIsNone(self.size_of(b"not an image"))
+        self.assertIsNone(self.size_of(jpeg_bytes(10, 10)[:32]))
+
+    def test_real_images(self):
+        static = os.path.join(os.path.dirname(__file__), "..", "static", "images")
+        self.assertEqual(
+            read_image_size(os.path.join(static, "tolkien.png")), (1026, 388)
+        )
+
+
+class TestImageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.cache = os.path.join(self.tmp.name, "images.json")
+        self.write("images/a.png", png_bytes(100, 50))
+        self.write("photos/b.jpg", jpeg_bytes(300, 200))
+        self.write("index.css", b"body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, data):
+        path = os.path.join(self.static, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def test_scan_and_lookup(self):
+        index = ImageIndex(self.static)
+        self.assertEqual(index.scan(), 2)
+        self.assertEqual(index.lookup("/images/a.png"), (100, 50))
+        self.assertEqual(index.lookup("/photos/b.jpg"), (300, 200))
+        self.assertIsNone(index.lookup("/index.css"))
+        self.assertIsNone(index.lookup("https://example.com/a.png"))
+
+    def test_cached_across_runs(self):
+        index = ImageIndex(self.static, self.cache)
+        index.scan()
+        index.save()
+        fingerprint = index.fingerprint
+
+        again = ImageIndex(self.static, self.cache)
+        self.assertEqual(again.scan(), 0)
+        self.assertEqual(again.lookup("/images/a.png"), (100, 50))
+        self.assertEqual(again.fingerprint, fingerprint)
+
+        # a copy has the same hash, so its header isn't read either
+        self.write("images/copy.png", png_bytes(100, 50))
+        self.assertEqual(again.scan(), 0)
+        self.assertEqual(again.lookup("/images/copy.png"), (100, 50))
+
+        self.write("images/a.png", png_bytes(10, 5))
+        path = os.path.join(self.static, "images", "a.png")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+        self.assertEqual(again.scan(), 1)
+        self.assertEqual(again.lookup("/images/a.png"), (10, 5))
+        self.assertNotEqual(again.fingerprint, fingerprint)
+
+
+if __name__ == "__main__":
+    unittest.main()
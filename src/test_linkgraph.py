@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+
+from assets import AssetMap
+from linkgraph import LinkGraph, page_references, page_url, resolve_url
+
+
+class FakeImageIndex:
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+
+    def lookup(self, url):
+        return self.dimensions.get(url)
+
+
+class TestReferences(unittest.TestCase):
+    def test_page_references(self):
+        md = (
+            "# Title\n\n"
+            "See [one](/one) and ![pic](/images/a.png).\n\n"
+            "```\n[not a link](/code)\n```\n\n"
+            "- [two](two.html)\n- [](/empty)"
+        )
+        self.assertEqual(
+            page_references(md), (["/one", "two.html"], ["/images/a.png"])
+        )
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.md"), "/")
+        self.assertEqual(
+            page_url(os.path.join("blog", "post", "index.md")), "/blog/post/"
+        )
+        self.assertEqual(page_url("about.md"), "/about.html")
+
+    def test_resolve_url(self):
+        self.assertEqual(resolve_url("/blog/post/", "../other/"), "/blog/other/")
+        self.assertEqual(resolve_url("/blog/post/", "img.png"), "/blog/post/img.png")
+        self.assertEqual(resolve_url("/about.html", "/a/./b#frag"), "/a/b")
+        self.assertIsNone(resolve_url("/", "https://example.com/"))
+        self.assertIsNone(resolve_url("/", "mailto:me@example.com"))
+        self.assertIsNone(resolve_url("/", "#top"))
+
+
+class TestLinkGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = LinkGraph()
+        self.index = FakeImageIndex({"/images/a.png": (10, 20)})
+        self.graph.update("index.md", ["/blog/post", "/about.html"], [], self.index)
+        self.graph.update(
+            os.path.join("blog", "post", "index.md"),
+            ["../../", "/missing"],
+            ["/images/a.png"],
+            self.index,
+        )
+        self.graph.update(
+            "about.md", ["/index.css"], ["/images/b.png", "images/a.png"], self.index
+        )
+
+    def test_dependents(self):
+        post = os.path.join("blog", "post", "index.md")
+        self.assertEqual(self.graph.dependents("/"), [post])
+        # about.md's relative image is rendered without dimensions
+        self.assertEqual(self.graph.dependents("/images/a.png"), [post])
+        self.assertEqual(self.graph.dependents("/about.html"), ["index.md"])
+
+    def test_assets_changed(self):
+        post = os.path.join("blog", "post", "index.md")
+        self.assertFalse(self.graph.assets_changed(post, self.index))
+        self.assertFalse(self.graph.assets_changed("index.md", FakeImageIndex({})))
+
+        resized = FakeImageIndex({"/images/a.png": (30, 20)})
+        self.assertTrue(self.graph.assets_changed(post, resized))
+        # an image that appears gets its dimensions added
+        appeared = FakeImageIndex({"/images/b.png": (1, 1)})
+        self.assertTrue(self.graph.assets_changed("about.md", appeared))
+        self.assertTrue(self.graph.assets_changed("unknown.md", self.index))
+
+    def test_fingerprints_changed(self):
+        v1 = AssetMap({"doc.pdf": {"name": "doc.1111.pdf"}})
+        v2 = AssetMap({"doc.pdf": {"name": "doc.2222.pdf"}})
+        self.graph.update("doc.md", ["/doc.pdf", "doc.pdf"], [], assets=v1)
+        self.graph.update("other.md", ["/other.pdf"], [], assets=v1)
+
+        self.assertFalse(self.graph.assets_changed("doc.md", assets=v1))
+        self.assertTrue(self.graph.assets_changed("doc.md", assets=v2))
+        self.assertFalse(self.graph.assets_changed("other.md", assets=v2))
+        # the linked file appearing gives the link a fingerprint
+        v3 = AssetMap({"other.pdf": {"name": "other.3333.pdf"}})
+        self.assertTrue(self.graph.assets_changed("other.md", assets=v3))
+
+    def test_broken_links(self):
+        post = os.path.join("blog", "post", "index.md")
+        self.assertEqual(
+            self.graph.broken_links(files={"/index.css"}),
+            [(post, "/missing")],
+        )
+
+        self.graph.retain(["index.md", "about.md"])
+        self.assertEqual(
+            self.graph.broken_links(files={"/index.css"}),
+            [("index.md", "/blog/post")],
+        )
+
+    def test_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.graph.path = os.path.join(tmp, "links.json")
+            self.graph.save()
+            loaded = LinkGraph(self.graph.path)
+            self.assertEqual(loaded.pages, self.graph.pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
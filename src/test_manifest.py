@@ -0,0 +1,138 @@
+import os
+import tempfile
+import unittest
+
+from generator import generate_pages_recursive
+from manifest import BuildManifest, hash_file, load_state, open_atomic, save_state
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, ".cache", "manifest.json")
+
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nhello")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nbody")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self):
+        manifest = BuildManifest(self.manifest_path)
+        result = generate_pages_recursive(
+            self.content, self.template, self.public, manifest=manifest
+        )
+        manifest.save()
+        return result
+
+    def test_first_build_generates_everything(self):
+        generated, skipped, removed = self.build()
+        self.assertEqual(len(generated), 2)
+        self.assertEqual(skipped, [])
+        self.assertEqual(removed, [])
+        self.assertTrue(os.path.exists(self.manifest_path))
+
+    def test_unchanged_build_skips_everything(self):
+        self.build()
+        generated, skipped, removed = self.build()
+        self.assertEqual(generated, [])
+        self.assertEqual(len(skipped), 2)
+
+    def test_only_changed_source_is_regenerated(self):
+        self.build()
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Post\n\nedited body")
+        generated, skipped, _ = self.build()
+        self.assertEqual(generated, [os.path.join(self.public, "blog", "post.html")])
+        self.assertEqual(skipped, [os.path.join(self.public, "index.html")])
+
+    def test_touched_but_identical_source_is_skipped(self):
+        self.build()
+        post = os.path.join(self.content, "blog", "post.md")
+        st = os.stat(post)
+        os.utime(post, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        generated, _, _ = self.build()
+        self.assertEqual(generated, [])
+
+    def test_template_change_regenerates_everything(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        generated, skipped, _ = self.build()
+        self.assertEqual(len(generated), 2)
+        self.assertEqual(skipped, [])
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.public, "index.html"))
+        generated, _, _ = self.build()
+        self.assertEqual(generated, [os.path.join(self.public, "index.html")])
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        _, _, removed = self.build()
+        out = os.path.join(self.public, "blog", "post.html")
+        self.assertEqual(removed, [out])
+        self.assertFalse(os.path.exists(out))
+        # the section it was the last page of goes too
+        self.assertFalse(os.path.exists(os.path.dirname(out)))
+        self.assertTrue(os.path.isdir(self.public))
+
+    def test_search_indexed_is_persisted(self):
+        manifest = BuildManifest(self.manifest_path)
+        self.assertFalse(manifest.search_indexed)
+        manifest.search_indexed = True
+        manifest.save()
+        self.assertTrue(BuildManifest(self.manifest_path).search_indexed)
+
+    def test_corrupt_manifest_is_ignored(self):
+        os.makedirs(os.path.dirname(self.manifest_path))
+        self.write(self.manifest_path, "{not json")
+        manifest = BuildManifest(self.manifest_path)
+        self.assertEqual(manifest.entries, {})
+
+    def test_state_round_trip(self):
+        path = os.path.join(self.root, "state", "index.json")
+        save_state(path, 2, {"pages": {"a.md": [1, 2]}})
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["index.json"])
+        self.assertEqual(
+            load_state(path, 2), {"version": 2, "pages": {"a.md": [1, 2]}}
+        )
+        self.assertIsNone(load_state(path, 3))
+        self.assertIsNone(load_state(os.path.join(self.root, "missing.json"), 2))
+        self.write(path, "[]")
+        self.assertIsNone(load_state(path, 2))
+
+    def test_overlapping_saves_use_their_own_temporary_files(self):
+        path = os.path.join(self.root, "state.json")
+        with open_atomic(path) as f:
+            f.write('{"version": 1, "writer": "first"}')
+            # a second writer, such as the watcher, finishing in between
+            save_state(path, 1, {"writer": "second"})
+            self.assertEqual(load_state(path, 1)["writer"], "second")
+        self.assertEqual(load_state(path, 1)["writer"], "first")
+        self.assertEqual(
+            sorted(os.listdir(self.root)), ["content", "state.json", "template.html"]
+        )
+
+    def test_hash_file(self):
+        path = os.path.join(self.root, "a.txt")
+        self.write(path, "abc")
+        self.assertEqual(
+            hash_file(path),
+            "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from minify import format_attribute, minify_html
+from template import Template
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_whitespace_around_block_tags_is_dropped(self):
+        text = "<html>\n  <body>\n    <p>Hello   <b>big</b>\n   world</p>\n  </body>\n</html>\n"
+        self.assertEqual(
+            minify_html(text),
+            "<html><body><p>Hello <b>big</b> world</p></body></html>",
+        )
+
+    def test_preserved_elements_are_untouched(self):
+        text = '<pre class="x">  a\n    b</pre>\n<script>if (a<b) {  go() }</script>'
+        self.assertEqual(
+            minify_html(text),
+            '<pre class=x>  a\n    b</pre><script>if (a<b) {  go() }</script>',
+        )
+
+    def test_attribute_quotes(self):
+        self.assertEqual(
+            minify_html('<a href="/blog/" title="two words" data-x="">'),
+            '<a href=/blog/ title="two words" data-x="">',
+        )
+        # rel=stylesheet/> would make the slash part of the value
+        self.assertEqual(
+            minify_html('<link rel="stylesheet"/>'), '<link rel="stylesheet"/>'
+        )
+
+    def test_fragment_edges_keep_one_space(self):
+        self.assertEqual(
+            minify_html("Hello   ", strip_start=False, strip_end=False), "Hello "
+        )
+        self.assertEqual(minify_html("  <!-- note -->  "), "<!-- note -->")
+
+    def test_unicode_spaces_are_kept(self):
+        self.assertEqual(
+            minify_html("<p>\xa010\xa0km  and a\u3000b\xa0</p>"),
+            "<p>\xa010\xa0km and a\u3000b\xa0</p>",
+        )
+
+    def test_format_attribute(self):
+        self.assertEqual(format_attribute("href", "/a"), 'href="/a"')
+        self.assertEqual(format_attribute("href", "/a", minify=True), "href=/a")
+        self.assertEqual(format_attribute("alt", "a b", minify=True), 'alt="a b"')
+
+
+class TestMinifiedSerialization(unittest.TestCase):
+    def test_nodes(self):
+        node = ParentNode(
+            "div",
+            [
+                LeafNode(None, "some   spaced\n text "),
+                LeafNode("a", "a   link", {"href": "/x", "title": "a title"}),
+                ParentNode("pre", [LeafNode("code", "keep   this\n  indent\n")]),
+                LeafNode("code", "inline   code"),
+            ],
+            {"class": "body"},
+        )
+        self.assertEqual(
+            node.to_html(minify=True),
+            '<div class=body>some spaced text <a href=/x title="a title">a link</a>'
+            "<pre><code>keep   this\n  indent\n</code></pre>"
+            "<code>inline   code</code></div>",
+        )
+        # the default output is unchanged
+        self.assertIn('<div class="body">some   spaced\n text ', node.to_html())
+
+    def test_nodes_keep_unicode_spaces(self):
+        node = ParentNode("p", [LeafNode(None, "10\xa0km  and a\u3000b")])
+        self.assertEqual(node.to_html(minify=True), "<p>10\xa0km and a\u3000b</p>")
+
+    def test_template(self):
+        template = Template(
+            '<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n'
+            '  <body class="page">\n    {{ Content }}\n  </body>\n</html>\n',
+            minify=True,
+        )
+        content = ParentNode("p", [LeafNode(None, "hi   there")])
+
+        chunks = []
+        template.write(chunks.append, Title="T", Content=content)
+        self.assertEqual(
+            "".join(chunks),
+            "<html><head><title>T</title></head><body class=page><p>hi there</p>"
+            "</body></html>",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import pipeline
+from generator import BuildError, generate_pages_recursive
+from pipeline import run_pipeline
+from template import Template
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+        for i in range(8):
+            self.write_page(f"s{i % 3}/p{i}.md", f"# Page {i}\n\n- item _{i}_")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_page(self, rel_path, text):
+        path = os.path.join(self.content, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read_tree(self, root):
+        pages = {}
+        for dirpath, _, files in os.walk(root):
+            for file in files:
+                path = os.path.join(dirpath, file)
+                with open(path) as f:
+                    pages[os.path.relpath(path, root)] = f.read()
+        return pages
+
+    def test_matches_synchronous_build(self):
+        expected_dir = os.path.join(self.tmp.name, "sync")
+        expected, _, _ = generate_pages_recursive(
+            self.content, self.template, expected_dir
+        )
+
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                out = os.path.join(self.tmp.name, f"async{jobs}")
+                generated, _, _ = generate_pages_recursive(
+                    self.content, self.template, out, jobs=jobs, io_workers=3
+                )
+                self.assertEqual(
+                    [os.path.relpath(p, out) for p in generated],
+                    [os.path.relpath(p, expected_dir) for p in expected],
+                )
+                self.assertEqual(self.read_tree(out), self.read_tree(expected_dir))
+
+    def test_large_pages_are_streamed(self):
+        expected_dir = os.path.join(self.tmp.name, "sync")
+        generate_pages_recursive(self.content, self.template, expected_dir)
+
+        threshold = pipeline.STREAM_THRESHOLD
+        pipeline.STREAM_THRESHOLD = 0
+        try:
+            for jobs in (1, 2):
+                with self.subTest(jobs=jobs):
+                    out = os.path.join(self.tmp.name, f"async{jobs}")
+                    generate_pages_recursive(
+                        self.content, self.template, out, jobs=jobs, io_workers=2
+                    )
+                    self.assertEqual(
+                        self.read_tree(out), self.read_tree(expected_dir)
+                    )
+        finally:
+            pipeline.STREAM_THRESHOLD = threshold
+
+    def test_small_queue_and_lazy_input(self):
+        out = os.path.join(self.tmp.name, "out")
+        consumed = []
+
+        def pages():
+            for i in range(20):
+                consumed.append(i)
+                src = os.path.join(self.content, "s0", "p0.md")
+                yield (f"p{i}.md", src, os.path.join(out, f"p{i}.html"))
+
+        settings = {
+            "template": Template("{{ Content }}"),
+            "cache": None,
+            "block_cache": None,
+            "images": None,
+            "assets": None,
+            "extract": {},
+            "profile": True,
+        }
+        results = run_pipeline(pages(), settings, io_workers=2, queue_size=1)
+
+        # results come as pages finish, without reading ahead of them
+        first = next(results)
+        self.assertLess(len(consumed), 20)
+        results = [first, *results]
+        self.assertEqual(consumed, list(range(20)))
+        self.assertEqual([args[0] for args, _ in results], [f"p{i}.md" for i in range(20)])
+        for _, result in results:
+            self.assertIsNone(result["error"])
+            self.assertEqual(
+                [stage for stage, _, _ in result["timings"]], ["read", "render", "write"]
+            )
+        self.assertEqual(len(os.listdir(out)), 20)
+
+    def test_reads_overlap(self):
+        read = pipeline._read
+        lock = threading.Lock()
+        active = []
+        peak = 0
+
+        def slow_read(path):
+            nonlocal peak
+            with lock:
+                active.append(path)
+                peak = max(peak, len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(path)
+            return read(path)
+
+        pipeline._read = slow_read
+        try:
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                os.path.join(self.tmp.name, "out"),
+                io_workers=4,
+            )
+        finally:
+            pipeline._read = read
+        self.assertGreater(peak, 1)
+        self.assertLessEqual(peak, 4)
+
+    def test_errors_are_reported_per_page(self):
+        self.write_page("s0/broken.md", "unclosed `code")
+        out = os.path.join(self.tmp.name, "out")
+        with self.assertRaises(BuildError) as ctx:
+            generate_pages_recursive(self.content, self.template, out, io_workers=2)
+
+        [(path, error)] = ctx.exception.failures
+        self.assertTrue(path.endswith("broken.md"))
+        self.assertIn("unclosed delimiter", error)
+        self.assertEqual(len(self.read_tree(out)), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+
+from generator import generate_page, generate_pages_recursive
+from profiler import BuildProfiler, StageTimer
+
+PAGE_STAGES = [
+    "read",
+    "block split",
+    "block classify",
+    "inline parse",
+    "serialize",
+    "template fill",
+    "write",
+]
+
+
+class TestStageTimer(unittest.TestCase):
+    def test_laps_are_consecutive(self):
+        timings = []
+        timer = StageTimer(timings)
+        timer.lap("a")
+        timer.lap("b")
+        self.assertEqual([stage for stage, _, _ in timings], ["a", "b"])
+        (_, start_a, dur_a), (_, start_b, _) = timings
+        self.assertAlmostEqual(start_a + dur_a, start_b)
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        os.makedirs(self.content)
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        for name, body in (("short", "hi"), ("long", "- item **x**\n" * 200)):
+            with open(os.path.join(self.content, f"{name}.md"), "w") as f:
+                f.write(f"# {name}\n\n{body}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_staged_render_matches_streaming_render(self):
+        src = os.path.join(self.content, "long.md")
+        plain = os.path.join(self.tmp.name, "plain.html")
+        staged = os.path.join(self.tmp.name, "staged.html")
+        timings = []
+        generate_page(src, self.template, plain)
+        generate_page(src, self.template, staged, timings=timings)
+
+        with open(plain) as a, open(staged) as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertEqual([stage for stage, _, _ in timings], PAGE_STAGES)
+
+    def test_build_records_pages_and_trace(self):
+        profiler = BuildProfiler()
+        with profiler.span("generate pages"):
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                os.path.join(self.tmp.name, "public"),
+                profiler=profiler,
+            )
+        profiler.count("asset copied", 3)
+
+        self.assertEqual(len(profiler.pages), 2)
+        self.assertEqual(set(profiler.stage_totals()), set(PAGE_STAGES))
+        self.assertTrue(profiler.slowest_pages(1)[0][1].endswith("long.md"))
+
+        trace_path = os.path.join(self.tmp.name, "trace", "trace.json")
+        profiler.write_trace(trace_path)
+        with open(trace_path) as f:
+            trace = json.load(f)
+
+        events = trace["traceEvents"]
+        self.assertEqual(sum(1 for e in events if e.get("cat") == "page"), 14)
+        self.assertIn("generate pages", {e["name"] for e in events})
+        self.assertIn(
+            {"name": "asset copied", "value": 3},
+            [
+                {"name": e["name"], "value": e["args"]["value"]}
+                for e in events
+                if e["ph"] == "C"
+            ],
+        )
+        self.assertTrue(all(e["ts"] >= 0 for e in events))
+
+        summary = profiler.summary()
+        self.assertIn("Slowest 2 pages", summary)
+        self.assertIn("asset copied", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+
+from generator import markdown_to_html_node
+from search import SearchIndex, page_terms, shard_name
+
+
+class TestPageTerms(unittest.TestCase):
+    def test_page_terms(self):
+        md = (
+            "# Static Sites\n\n"
+            "Build a **static** site with [Python](https://python.org) "
+            "and `ignored_code`.\n\n"
+            "```\nmore ignored code\n```\n\n"
+            "![diagram of the site](/images/site.png)"
+        )
+        data = page_terms(md)
+        self.assertEqual(data["title"], "Static Sites")
+        self.assertEqual(
+            data["terms"],
+            {"static": 2, "sites": 1, "build": 1, "site": 2, "python": 1, "diagram": 1},
+        )
+
+    def test_terms_from_rendered_body(self):
+        md = (
+            "# Static Sites\n\n"
+            "Build a **static** site with [Python](https://python.org) "
+            "and `ignored_code`.\n\n"
+            "```\nmore ignored code\n```\n\n"
+            "> quoted ![diagram of the site](/images/site.png)\n\n"
+            "1. first\n2. second"
+        )
+        self.assertEqual(page_terms(md, markdown_to_html_node(md)), page_terms(md))
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("python"), "py")
+        self.assertEqual(shard_name("x1"), "x1")
+        self.assertEqual(shard_name("élan"), "c3a96c")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.tmp.name, "search")
+        self.index = SearchIndex(os.path.join(self.tmp.name, "search.json"))
+        self.index.update("a.md", "/a.html", {"title": "A", "terms": {"python": 2, "site": 1}})
+        self.index.update("b.md", "/b.html", {"title": "B", "terms": {"python": 1, "rust": 3}})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.out, name)) as f:
+            return json.load(f)
+
+    def test_write(self):
+        written = self.index.write(self.out)
+        self.assertEqual(
+            written, ["docs.json", "py.json", "ru.json", "si.json", "search.js"]
+        )
+        self.assertEqual(self.read("docs.json"), [["/a.html", "A"], ["/b.html", "B"]])
+        self.assertEqual(self.read("py.json"), {"python": [0, 2, 1, 1]})
+        self.assertEqual(self.read("ru.json"), {"rust": [1, 3]})
+        self.assertEqual(self.index.write(self.out), [])
+
+    def test_only_changed_shards_are_rewritten(self):
+        self.index.write(self.out)
+        self.index.update("b.md", "/b.html", {"title": "B", "terms": {"python": 1, "go": 1}})
+        self.assertEqual(self.index.write(self.out), ["go.json", "ru.json"])
+        self.assertFalse(os.path.exists(os.path.join(self.out, "ru.json")))
+        self.assertEqual(self.read("go.json"), {"go": [1, 1]})
+
+    def test_removed_page_frees_its_id(self):
+        self.index.write(self.out)
+        self.index.retain(["b.md"])
+        self.assertEqual(
+            self.index.write(self.out), ["docs.json", "py.json", "si.json"]
+        )
+        self.assertEqual(self.read("docs.json"), [None, ["/b.html", "B"]])
+        self.assertEqual(self.read("py.json"), {"python": [1, 1]})
+
+        self.index.update("c.md", "/c.html", {"title": "C", "terms": {"go": 1}})
+        self.assertEqual(self.index.pages["c.md"]["id"], 0)
+
+    def test_persisted_with_pending_shards(self):
+        self.index.save()
+        loaded = SearchIndex(self.index.path)
+        self.assertEqual(loaded.pages, self.index.pages)
+        self.assertEqual(
+            loaded.write(self.out, dry_run=True), self.index.write(self.out)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
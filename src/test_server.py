@@ -0,0 +1,278 @@
+import http.client
+import os
+import tempfile
+import unittest
+
+from server import (
+    RELOAD_PATH,
+    RELOAD_SCRIPT,
+    FileCache,
+    LiveReloadServer,
+    PageRenderer,
+    PreviewServer,
+)
+
+
+class TestLiveReloadServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "index.html"), "w") as f:
+            f.write("<html><body><p>hi</p></body></html>")
+        with open(os.path.join(self.tmp.name, "index.css"), "w") as f:
+            f.write("body {}")
+
+        self.server = LiveReloadServer(self.tmp.name, 0, host="127.0.0.1")
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def get(self, path):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return conn, response
+
+    def test_html_gets_reload_script(self):
+        conn, response = self.get("/")
+        body = response.read().decode()
+        conn.close()
+        self.assertEqual(response.status, 200)
+        self.assertIn(RELOAD_SCRIPT + "</body>", body)
+
+    def test_other_files_are_untouched(self):
+        conn, response = self.get("/index.css")
+        self.assertEqual(response.read(), b"body {}")
+        conn.close()
+
+    def test_reload_event_is_pushed(self):
+        conn, response = self.get(RELOAD_PATH)
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+        self.server.reload()
+        self.assertEqual(response.fp.readline(), b"data: reload\n")
+        conn.close()
+
+
+class TestPreviewServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.write("index.html", b"<p>home</p>")
+        self.write("big.bin", os.urandom(300 * 1024))
+
+        self.server = PreviewServer(self.tmp.name, 0, host="127.0.0.1", threads=4)
+        self.server.start()
+        self.conn = self.connect()
+
+    def tearDown(self):
+        self.conn.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.tmp.name, name), "wb") as f:
+            f.write(data)
+
+    def connect(self):
+        return http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+
+    def get(self, path, headers=None, conn=None):
+        conn = conn or self.conn
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        return response, response.read()
+
+    def test_keep_alive_and_etag(self):
+        response, body = self.get("/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, b"<p>home</p>")
+        self.assertEqual(response.getheader("Content-Type"), "text/html")
+        tag = response.getheader("ETag")
+        last_modified = response.getheader("Last-Modified")
+
+        # same connection, conditional requests
+        sock = self.conn.sock
+        response, body = self.get("/index.html", {"If-None-Match": tag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(body, b"")
+        response, _ = self.get("/", {"If-Modified-Since": last_modified})
+        self.assertEqual(response.status, 304)
+        response, _ = self.get("/", {"If-None-Match": '"other"'})
+        self.assertEqual(response.status, 200)
+        self.assertIs(self.conn.sock, sock)
+
+    def test_idle_connections_do_not_hold_workers(self):
+        # more open keep-alive connections than the server has threads
+        conns = [self.connect() for _ in range(6)]
+        try:
+            for _ in range(2):
+                for conn in conns:
+                    response, body = self.get("/", conn=conn)
+                    self.assertEqual(body, b"<p>home</p>")
+        finally:
+            for conn in conns:
+                conn.close()
+
+    def test_changed_file_is_not_served_from_cache(self):
+        response, _ = self.get("/index.html")
+        tag = response.getheader("ETag")
+        # the second request is answered from the file cache
+        self.get("/index.html")
+
+        path = os.path.join(self.tmp.name, "index.html")
+        self.write("index.html", b"<p>rebuilt</p>")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+
+        response, body = self.get("/index.html", {"If-None-Match": tag})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, b"<p>rebuilt</p>")
+
+    def test_large_file_is_sent_whole(self):
+        with open(os.path.join(self.tmp.name, "big.bin"), "rb") as f:
+            expected = f.read()
+        response, body = self.get("/big.bin")
+        self.assertEqual(int(response.getheader("Content-Length")), len(expected))
+        self.assertEqual(body, expected)
+        # the connection is still usable afterwards
+        self.assertEqual(self.get("/")[1], b"<p>home</p>")
+
+    def test_missing_file_and_redirect(self):
+        response, _ = self.get("/missing.html")
+        self.assertEqual(response.status, 404)
+        os.mkdir(os.path.join(self.tmp.name, "blog"))
+        response, _ = self.get("/blog")
+        self.assertEqual(response.status, 301)
+
+    def test_idle_connections_dont_block_others(self):
+        idle = [self.connect() for _ in range(2)]
+        try:
+            for conn in idle:
+                self.get("/", conn=conn)
+            self.assertEqual(self.get("/")[1], b"<p>home</p>")
+        finally:
+            for conn in idle:
+                conn.close()
+
+
+class TestOnDemandServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post")
+        self.write(os.path.join(self.content, "about.md"), "# About")
+        self.write(os.path.join(self.content, "broken.md"), "unclosed *italic")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+
+        self.renderer = PageRenderer(self.content, self.template)
+        self.server = PreviewServer(
+            self.static, 0, host="127.0.0.1", threads=2, renderer=self.renderer
+        )
+        self.server.start()
+        self.conn = http.client.HTTPConnection(
+            "127.0.0.1", self.server.port, timeout=5
+        )
+
+    def tearDown(self):
+        self.conn.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def touch(self, path):
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+
+    def get(self, path, headers=None):
+        self.conn.request("GET", path, headers=headers or {})
+        response = self.conn.getresponse()
+        return response, response.read().decode()
+
+    def test_paths_map_to_sources(self):
+        for path, title in [
+            ("/", "Home"),
+            ("/index.html", "Home"),
+            ("/blog/post/", "Post"),
+            ("/blog/post/index.html", "Post"),
+            ("/about", "About"),
+            ("/about.html", "About"),
+        ]:
+            with self.subTest(path=path):
+                response, body = self.get(path)
+                self.assertEqual(response.status, 200)
+                self.assertIn(f"<h1>{title}</h1>", body)
+
+        response, _ = self.get("/blog/post")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader("Location"), "/blog/post/")
+
+        response, _ = self.get("/../template.html")
+        self.assertEqual(response.status, 404)
+
+    def test_static_files_fall_through(self):
+        response, body = self.get("/index.css")
+        self.assertEqual(body, "body {}")
+        response, _ = self.get("/missing.html")
+        self.assertEqual(response.status, 404)
+
+    def test_cache_is_invalidated_by_source_and_template(self):
+        response, _ = self.get("/about")
+        tag = response.getheader("ETag")
+        response, _ = self.get("/about", {"If-None-Match": tag})
+        self.assertEqual(response.status, 304)
+
+        source = os.path.join(self.content, "about.md")
+        self.write(source, "# About us")
+        self.touch(source)
+        response, body = self.get("/about", {"If-None-Match": tag})
+        self.assertEqual(response.status, 200)
+        self.assertIn("<h1>About us</h1>", body)
+
+        self.write(self.template, "<main>{{ Content }}</main>")
+        self.touch(self.template)
+        _, body = self.get("/about")
+        self.assertEqual(body, "<main><div><h1>About us</h1></div></main>")
+
+    def test_lru_is_bounded(self):
+        self.renderer.max_pages = 2
+        for path in ("/", "/about", "/blog/post/"):
+            self.get(path)
+        self.assertEqual(
+            [os.path.relpath(path, self.content) for path in self.renderer.pages],
+            ["about.md", os.path.join("blog", "post", "index.md")],
+        )
+
+    def test_render_errors_are_reported(self):
+        response, body = self.get("/broken")
+        self.assertEqual(response.status, 500)
+        self.assertIn("unclosed delimiter", body)
+        # the connection survives the error
+        self.assertEqual(self.get("/")[0].status, 200)
+
+
+class TestFileCache(unittest.TestCase):
+    def test_bounded_and_validated(self):
+        cache = FileCache(max_bytes=10, max_file_size=6)
+        st = os.stat(__file__)
+        cache.put("a", st, b"aaaaa")
+        cache.put("b", st, b"bbbbb")
+        cache.put("huge", st, b"x" * 7)
+        self.assertEqual(cache.get("a", st), b"aaaaa")
+
+        cache.put("c", st, b"ccccc")
+        self.assertIsNone(cache.get("b", st))
+        self.assertIsNone(cache.get("huge", st))
+        self.assertEqual(cache.size, 10)
+
+        # a different size or mtime misses
+        self.assertIsNone(cache.get("a", os.stat(os.path.dirname(__file__))))
+
+
+if __name__ == "__main__":
+    unittest.main()
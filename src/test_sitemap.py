@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from sitemap import FeedWriter, SitemapWriter, format_time
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+
+class TestSitemapWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def locations(self, name):
+        tree = ET.parse(os.path.join(self.out, name))
+        return [loc.text for loc in tree.iter(f"{SITEMAP_NS}loc")]
+
+    def test_single_file(self):
+        with SitemapWriter(self.out, "https://example.com/") as sitemap:
+            sitemap.add("/", 0)
+            sitemap.add("/a&b.html", 86400)
+
+        self.assertEqual(os.listdir(self.out), ["sitemap.xml"])
+        self.assertEqual(
+            self.locations("sitemap.xml"),
+            ["https://example.com/", "https://example.com/a&b.html"],
+        )
+
+    def test_split_with_index(self):
+        # a leftover part from an earlier, larger build
+        with open(os.path.join(self.out, "sitemap-4.xml"), "w") as f:
+            f.write("old")
+
+        with SitemapWriter(self.out, "https://example.com", max_urls=2) as sitemap:
+            for i in range(5):
+                sitemap.add(f"/{i}.html", 0)
+
+        self.assertEqual(
+            sorted(os.listdir(self.out)),
+            ["sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml", "sitemap.xml"],
+        )
+        self.assertEqual(
+            self.locations("sitemap.xml"),
+            [f"https://example.com/sitemap-{i}.xml" for i in (1, 2, 3)],
+        )
+        self.assertEqual(
+            self.locations("sitemap-3.xml"), ["https://example.com/4.html"]
+        )
+
+    def test_split_by_size(self):
+        with SitemapWriter(self.out, "https://example.com", max_bytes=300) as sitemap:
+            for i in range(3):
+                sitemap.add(f"/{i}.html", 0)
+        self.assertIn("sitemap-2.xml", os.listdir(self.out))
+
+    def test_failure_keeps_previous_sitemap(self):
+        with open(os.path.join(self.out, "sitemap.xml"), "w") as f:
+            f.write("previous")
+
+        with self.assertRaises(RuntimeError):
+            with SitemapWriter(self.out, "https://example.com") as sitemap:
+                sitemap.add("/", 0)
+                raise RuntimeError
+
+        self.assertEqual(os.listdir(self.out), ["sitemap.xml"])
+        with open(os.path.join(self.out, "sitemap.xml")) as f:
+            self.assertEqual(f.read(), "previous")
+
+
+class TestFeedWriter(unittest.TestCase):
+    def test_keeps_most_recent_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with FeedWriter(
+                tmp, "https://example.com", "Site", size=2, author="A & B"
+            ) as feed:
+                for i in range(5):
+                    md_path = os.path.join(tmp, f"{i}.md")
+                    with open(md_path, "w") as f:
+                        f.write(f"# Page {i}\n\ntext")
+                    feed.add(f"/{i}.html", 1000 * (i % 3), md_path)
+
+            root = ET.parse(os.path.join(tmp, "feed.xml")).getroot()
+            self.assertEqual(root.find(f"{ATOM_NS}title").text, "Site")
+            self.assertEqual(
+                root.find(f"{ATOM_NS}author/{ATOM_NS}name").text, "A & B"
+            )
+            self.assertEqual(root.find(f"{ATOM_NS}updated").text, format_time(2000))
+            self.assertEqual(
+                [entry.find(f"{ATOM_NS}title").text for entry in root.iter(f"{ATOM_NS}entry")],
+                ["Page 2", "Page 4"],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from assets import AssetMap
+from htmlnode import LeafNode, ParentNode
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_fills_slots(self):
+        template = Template("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.assertEqual(
+            template.render(Title="Hi", Content="<p>x</p>"),
+            "<title>Hi</title><body><p>x</p></body>",
+        )
+
+    def test_repeated_slot(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render(Title="a"), "a|a")
+
+    def test_slot_whitespace_is_flexible(self):
+        template = Template("[{{Title}}][{{  Title  }}]")
+        self.assertEqual(template.render(Title="t"), "[t][t]")
+
+    def test_unknown_and_missing_slots_are_left_untouched(self):
+        template = Template("{{ Title }} {{ Other }}")
+        self.assertEqual(template.render(Content="x"), "{{ Title }} {{ Other }}")
+
+    def test_inserted_values_are_not_rescanned(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(
+            template.render(Title="T", Content="literal {{ Title }}"),
+            "<h1>T</h1>literal {{ Title }}",
+        )
+
+    def test_no_slots(self):
+        template = Template("plain text")
+        self.assertEqual(template.parts, ["plain text"])
+        self.assertEqual(template.render(Title="x"), "plain text")
+
+    def test_write_streams_nodes(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}!")
+        node = ParentNode("div", [LeafNode("b", "hi")])
+        writes = []
+        template.write(writes.append, Title="T", Content=node)
+        self.assertEqual("".join(writes), "<title>T</title><div><b>hi</b></div>!")
+
+    def test_load_template(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("<p>{{ Content }}</p>")
+
+            template = load_template(path)
+            self.assertEqual(template.path, path)
+            self.assertEqual(template.render(Content="x"), "<p>x</p>")
+            self.assertIs(load_template(template), template)
+
+    def test_asset_urls_are_rewritten(self):
+        assets = AssetMap({"index.css": {"name": "index.0123abcd.css"}})
+        template = Template(
+            '<link href="/index.css"><a href="/">{{ Title }}</a>', assets=assets
+        )
+        self.assertEqual(
+            template.render(Title='href="/index.css"'),
+            '<link href="/index.0123abcd.css"><a href="/">href="/index.css"</a>',
+        )
+        self.assertEqual(template.asset_urls, {"/index.css": "/index.0123abcd.css"})
+
+
+if __name__ == "__main__":
+    unittest.main()
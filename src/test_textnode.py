@@ -44,6 +44,12 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("hello", TextType.PLAIN)
         self.assertEqual(repr(node2), "TextNode(hello, plain, None)")
 
+    def test_slots(self):
+        node = TextNode("foo", TextType.PLAIN)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.other = 1
+
 
 if __name__ == "__main__":
     unittest.main()
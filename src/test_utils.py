@@ -1,3 +1,7 @@
+import os
+
+from assets import AssetMap
+from images import ImageIndex
 from textnode import TextNode, TextType
 from utils import (
     extract_markdown_images,
@@ -63,6 +67,47 @@ class TestTextNodeToHtmlNode(unittest.TestCase):
             html_node.props, {"src": "http://img.url/img.png", "alt": "Example image"}
         )
 
+    def test_image_with_index(self):
+        static = os.path.join(os.path.dirname(__file__), "..", "static")
+        images = ImageIndex(static)
+        images.scan()
+
+        node = TextNode("Tolkien", TextType.IMAGE, url="/images/tolkien.png")
+        self.assertEqual(
+            text_node_to_html_node(node, images).to_html(),
+            '<img src="/images/tolkien.png" alt="Tolkien" width="1026" height="388" '
+            'loading="lazy" decoding="async"></img>',
+        )
+
+        # unknown images are still lazy loaded, just without dimensions
+        node = TextNode("remote", TextType.IMAGE, url="https://example.com/a.png")
+        self.assertEqual(
+            text_node_to_html_node(node, images).props,
+            {
+                "src": "https://example.com/a.png",
+                "alt": "remote",
+                "loading": "lazy",
+                "decoding": "async",
+            },
+        )
+
+        # relative URLs aren't resolved against the page
+        node = TextNode("Tolkien", TextType.IMAGE, url="images/tolkien.png")
+        self.assertNotIn("width", text_node_to_html_node(node, images).props)
+
+    def test_asset_urls(self):
+        assets = AssetMap({"doc.pdf": {"name": "doc.0123abcd.pdf"}})
+        link = TextNode("doc", TextType.LINK, url="/doc.pdf#page=2")
+        image = TextNode("img", TextType.IMAGE, url="/doc.pdf")
+        self.assertEqual(
+            text_node_to_html_node(link, assets=assets).props,
+            {"href": "/doc.0123abcd.pdf#page=2"},
+        )
+        self.assertEqual(
+            text_node_to_html_node(image, assets=assets).props["src"],
+            "/doc.0123abcd.pdf",
+        )
+
     def test_plain_text2(self):
         node = TextNode("Just plain", TextType.PLAIN)
         html_node = text_node_to_html_node(node)
@@ -541,6 +586,54 @@ class TestTextToTextNodes(unittest.TestCase):
         ]
         self.assertEqual(nodes, expected)
 
+    def test_code_span_shields_other_delimiters(self):
+        nodes = text_to_textnodes("use `a*b_c` and **bold**")
+        expected = [
+            TextNode("use ", TextType.PLAIN),
+            TextNode("a*b_c", TextType.CODE),
+            TextNode(" and ", TextType.PLAIN),
+            TextNode("bold", TextType.BOLD),
+        ]
+        self.assertEqual(nodes, expected)
+
+    def test_unclosed_delimiter_raises(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("an *unclosed emphasis")
+
+    def test_image_with_empty_alt_is_dropped(self):
+        nodes = text_to_textnodes("a ![](pic.png) b")
+        expected = [TextNode("a ", TextType.PLAIN), TextNode(" b", TextType.PLAIN)]
+        self.assertEqual(nodes, expected)
+
+    def test_delimiters_inside_link_text_are_not_split(self):
+        nodes = text_to_textnodes("[**x**](u) and ![_y_](v)")
+        expected = [
+            TextNode("**x**", TextType.LINK, "u"),
+            TextNode(" and ", TextType.PLAIN),
+            TextNode("_y_", TextType.IMAGE, "v"),
+        ]
+        self.assertEqual(nodes, expected)
+
+    def test_matches_chained_split_passes(self):
+        samples = [
+            "plain",
+            "![i](a.png)[l](b) *x* **y** `z` _w_",
+            "a [l](u(1)) ![i [n]](p) tail",
+            "**bold** then *it* then `code`",
+            "x![a](b)[c](d)![e](f)y",
+        ]
+        for text in samples:
+            with self.subTest(text=text):
+                nodes = [TextNode(text, TextType.PLAIN)]
+                nodes = split_nodes_image(nodes)
+                nodes = split_nodes_link(nodes)
+                nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+                nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+                nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+                nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+                nodes = [node for node in nodes if node.text != ""]
+                self.assertEqual(text_to_textnodes(text), nodes)
+
 
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_multiple_blocks(self):
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from watch import PollingWatcher
+
+
+class TestPollingWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.page = os.path.join(self.root, "content", "index.md")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.page, "# hi")
+        self.write(self.template, "{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def watcher(self):
+        return PollingWatcher(
+            [os.path.join(self.root, "content"), self.template],
+            interval=0.01,
+            debounce=0.05,
+        )
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher().poll(), set())
+
+    def test_detects_added_modified_and_removed(self):
+        watcher = self.watcher()
+        new_page = os.path.join(self.root, "content", "blog", "post.md")
+        self.write(new_page, "# post")
+        self.write(self.template, "<main>{{ Content }}</main>")
+        os.remove(self.page)
+        self.assertEqual(watcher.poll(), {new_page, self.template, self.page})
+        self.assertEqual(watcher.poll(), set())
+
+    def test_changes_debounces_a_burst(self):
+        watcher = self.watcher()
+
+        def burst():
+            for i in range(3):
+                self.write(os.path.join(self.root, "content", f"p{i}.md"), "x")
+                time.sleep(0.02)
+
+        thread = threading.Thread(target=burst)
+        thread.start()
+        changed = next(watcher.changes())
+        thread.join()
+        self.assertEqual(
+            changed, {os.path.join(self.root, "content", f"p{i}.md") for i in range(3)}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
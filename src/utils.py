@@ -1,43 +1,84 @@
 import re
+from blocks import split_block_lines
 from textnode import TextType, TextNode
 from htmlnode import LeafNode
 
 
 def markdown_to_blocks(markdown):
-    markdown = markdown.strip()
-    raw_blocks = re.split(r"(?:\r?\n){2,}", markdown)
-    blocks = []
-    for block in raw_blocks:
-        lines = block.splitlines()
-        stripped_lines = [line.strip() for line in lines]
-        stripped_lines = [line for line in stripped_lines if line != ""]
-
-        if not stripped_lines:
-            continue
+    return ["\n".join(lines) for lines in split_block_lines(markdown)]
 
-        is_unordered = all(line.startswith("- ") for line in stripped_lines)
-        is_ordered = all(re.match(r"^\d+\. ", line) for line in stripped_lines)
 
-        if is_unordered or is_ordered:
-            blocks.append("\n".join(stripped_lines))
-        else:
-            blocks.append("\n".join(stripped_lines))
-    return blocks
+IMAGE_PATTERN = re.compile(
+    r"!\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(((?:[^\(\)]|\([^\(\)]*\))*)\)"
+)
+LINK_PATTERN = re.compile(
+    r"(?<!\!)\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(((?:[^\(\)]|\([^\(\)]*\))*)\)"
+)
+
+# Applied in this order: code spans win over bold, bold over italic
+INLINE_DELIMITERS = (
+    ("`", TextType.CODE),
+    ("**", TextType.BOLD),
+    ("_", TextType.ITALIC),
+    ("*", TextType.ITALIC),
+)
 
 
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.PLAIN)]
+    """Tokenize inline markdown into TextNodes in a single sweep.
+
+    Produces the same nodes as chaining ``split_nodes_image``,
+    ``split_nodes_link`` and the ``split_nodes_delimiter`` passes, but
+    appends straight into one output list instead of rebuilding the node
+    list once per pass.
+    """
+    nodes = []
+    last_index = 0
+    for match in IMAGE_PATTERN.finditer(text):
+        _tokenize_links(text, last_index, match.start(), nodes)
+        if match.group(1):
+            nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))
+        last_index = match.end()
+
+    _tokenize_links(text, last_index, len(text), nodes)
+    return nodes
 
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
 
-    nodes = [node for node in nodes if node.text != ""]
+def _tokenize_links(text, start, end, nodes):
+    last_index = start
+    for match in LINK_PATTERN.finditer(text, start, end):
+        if match.start() > last_index:
+            _tokenize_delimiters(text[last_index : match.start()], nodes)
+        if match.group(1):
+            nodes.append(TextNode(match.group(1), TextType.LINK, match.group(2)))
+        last_index = match.end()
 
-    return nodes
+    if end > last_index:
+        _tokenize_delimiters(text[last_index:end], nodes)
+
+
+def _tokenize_delimiters(text, nodes, level=0):
+    # skip delimiters that don't occur so plain prose costs a few `in` checks
+    while level < len(INLINE_DELIMITERS) and INLINE_DELIMITERS[level][0] not in text:
+        level += 1
+
+    if level == len(INLINE_DELIMITERS):
+        nodes.append(TextNode(text, TextType.PLAIN))
+        return
+
+    delimiter, text_type = INLINE_DELIMITERS[level]
+    parts = text.split(delimiter)
+    if len(parts) % 2 == 0:
+        raise ValueError("Invalid markdown: unclosed delimiter")
+
+    for i, part in enumerate(parts):
+        if part == "":
+            continue
+
+        if i % 2 == 0:
+            _tokenize_delimiters(part, nodes, level + 1)
+        else:
+            nodes.append(TextNode(part, text_type))
 
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -65,7 +106,7 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return new_nodes
 
 
-def split_nodes_image(old_nodes):
+def _split_nodes_pattern(old_nodes, pattern, text_type):
     new_nodes = []
 
     for node in old_nodes:
@@ -74,93 +115,56 @@ def split_nodes_image(old_nodes):
             continue
 
         text = node.text
-        images = extract_markdown_images(text)
-        if not images:
-            new_nodes.append(node)
-            continue
-
-        # Use re.finditer to get positions of the images in the text
-        pattern = r"!\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(((?:[^\(\)]|\([^\(\)]*\))*)\)"
-        matches = list(re.finditer(pattern, text))
-
         last_index = 0
-        for match, (alt_text, url) in zip(matches, images):
+        for match in pattern.finditer(text):
             start, end = match.start(), match.end()
 
-            # Text before the image
+            # Text before the match
             if start > last_index:
-                before_text = text[last_index:start]
-                if before_text:
-                    new_nodes.append(TextNode(before_text, TextType.PLAIN))
+                new_nodes.append(TextNode(text[last_index:start], TextType.PLAIN))
 
-            # Image node itself
-            new_nodes.append(TextNode(alt_text, TextType.IMAGE, url))
+            # The image/link node itself
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
 
             last_index = end
 
-        # Remaining text after the last image
-        if last_index < len(text):
-            remaining = text[last_index:]
-            if remaining:
-                new_nodes.append(TextNode(remaining, TextType.PLAIN))
-
-    return new_nodes
-
-
-def split_nodes_link(old_nodes):
-    new_nodes = []
-    for node in old_nodes:
-        if node.text_type is not TextType.PLAIN:
+        if last_index == 0:
             new_nodes.append(node)
             continue
 
-        text = node.text
-        links = extract_markdown_links(text)
-        if not links:
-            new_nodes.append(node)
-            continue
-
-        # Use re.finditer to get positions of the links in the text
-        pattern = (
-            r"(?<!\!)\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(((?:[^\(\)]|\([^\(\)]*\))*)\)"
-        )
-        matches = list(re.finditer(pattern, text))
-
-        last_index = 0
-        for match, (link_text, url) in zip(matches, links):
-            start, end = match.start(), match.end()
+        # Remaining text after the last match
+        if last_index < len(text):
+            new_nodes.append(TextNode(text[last_index:], TextType.PLAIN))
 
-            # Text before the link
-            if start > last_index:
-                before_text = text[last_index:start]
-                if before_text:
-                    new_nodes.append(TextNode(before_text, TextType.PLAIN))
+    return new_nodes
 
-            # The link node itself
-            new_nodes.append(TextNode(link_text, TextType.LINK, url))
 
-            last_index = end
+def split_nodes_image(old_nodes):
+    return _split_nodes_pattern(old_nodes, IMAGE_PATTERN, TextType.IMAGE)
 
-        # Any remaining text after the last link
-        if last_index < len(text):
-            remaining = text[last_index:]
-            if remaining:
-                new_nodes.append(TextNode(remaining, TextType.PLAIN))
 
-    return new_nodes
+def split_nodes_link(old_nodes):
+    return _split_nodes_pattern(old_nodes, LINK_PATTERN, TextType.LINK)
 
 
 def extract_markdown_images(text):
-    pattern = r"!\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(((?:[^\(\)]|\([^\(\)]*\))*)\)"
-    return re.findall(pattern, text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
-    pattern = r"(?<!\!)\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(((?:[^\(\)]|\([^\(\)]*\))*)\)"
-    return re.findall(pattern, text)
+    return LINK_PATTERN.findall(text)
+
 
+def text_node_to_html_node(text_node, images=None, assets=None):
+    """Convert a TextNode to a LeafNode.
 
-def text_node_to_html_node(text_node):
+    With an ImageIndex, images get their intrinsic ``width`` and ``height``
+    (when known) so the browser can reserve their space, and are loaded
+    lazily and decoded off the main thread. Only site-absolute image URLs
+    are looked up: rendered blocks are shared between pages, so a relative
+    URL has no single page to resolve against. With an AssetMap, links and
+    images pointing at static files use their fingerprinted URLs.
+    """
 
     match text_node.text_type:
         case TextType.BOLD:
@@ -170,9 +174,22 @@ def text_node_to_html_node(text_node):
         case TextType.CODE:
             return LeafNode("code", text_node.text)
         case TextType.LINK:
-            return LeafNode("a", text_node.text, {"href": text_node.url})
+            href = text_node.url
+            if assets is not None:
+                href = assets.rewrite(href)
+            return LeafNode("a", text_node.text, {"href": href})
         case TextType.IMAGE:
-            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+            src = text_node.url
+            if assets is not None:
+                src = assets.rewrite(src)
+            props = {"src": src, "alt": text_node.text}
+            if images is not None:
+                size = images.lookup(text_node.url)
+                if size is not None:
+                    props["width"], props["height"] = size
+                props["loading"] = "lazy"
+                props["decoding"] = "async"
+            return LeafNode("img", "", props)
         case TextType.PLAIN:
             return LeafNode(None, text_node.text)
         case _:
@@ -182,9 +199,16 @@ def text_node_to_html_node(text_node):
 
 
 def extract_title(markdown):
-    lines = markdown.splitlines()
-    for line in lines:
-        match = re.match(r"^#\s+(.+)", line.strip())
-        if match:
-            return match.group(1).strip()
+    """Return the text of the first ``# `` heading, or None.
+
+    ``markdown`` may also be an iterable of lines, which is only consumed
+    up to the title. Either way lines are split like ``split_block_lines``
+    does, so a page gets the same title whether it is streamed or not.
+    """
+    raw_lines = markdown.split("\n") if isinstance(markdown, str) else markdown
+    for raw_line in raw_lines:
+        for line in raw_line.splitlines():
+            match = re.match(r"^#\s+(.+)", line.strip())
+            if match:
+                return match.group(1).strip()
     return None
@@ -0,0 +1,67 @@
+import os
+import time
+
+
+class PollingWatcher:
+    """Detect file changes by periodically comparing stat snapshots.
+
+    Polling needs no platform-specific dependencies. Bursts of changes (an
+    editor writing several files, a ``git checkout``) are debounced: once a
+    change is seen, polling continues until the tree has been quiet for
+    ``debounce`` seconds and everything that changed is reported at once.
+    """
+
+    def __init__(self, paths, interval=0.5, debounce=0.3):
+        self.paths = paths
+        self.interval = interval
+        self.debounce = debounce
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        """Map every watched file to its (mtime_ns, size)."""
+        state = {}
+        for path in self.paths:
+            if os.path.isfile(path):
+                self._stat_into(state, path)
+                continue
+
+            for root, dirs, files in os.walk(path):
+                for file in files:
+                    self._stat_into(state, os.path.join(root, file))
+        return state
+
+    def _stat_into(self, state, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            # deleted between listing and stat
+            return
+        state[path] = (st.st_mtime_ns, st.st_size)
+
+    def poll(self):
+        """Return the set of paths added, removed or modified since last poll."""
+        current = self.snapshot()
+        changed = {
+            path
+            for path in current.keys() | self.state.keys()
+            if current.get(path) != self.state.get(path)
+        }
+        self.state = current
+        return changed
+
+    def changes(self):
+        """Yield a set of changed paths for every debounced burst of changes."""
+        while True:
+            time.sleep(self.interval)
+            changed = self.poll()
+            if not changed:
+                continue
+
+            while True:
+                time.sleep(self.debounce)
+                more = self.poll()
+                if not more:
+                    break
+                changed |= more
+
+            yield changed